@@ -27,7 +27,7 @@ export async function createCanvas(data: {
   tool_list: ToolInfo[]
 
   system_prompt: string
-}): Promise<{ id: string }> {
+}): Promise<{ id: string; job_id: string }> {
   const response = await fetch('/api/canvas/create', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
@@ -30,7 +30,8 @@ export const sendMessages = async (payload: {
     }),
   })
   const data = await response.json()
-  return data as Message[]
+  // The run is queued as a job, results arrive over the websocket
+  return data as { status: string; job_id: string }
 }
 
 export const cancelChat = async (sessionId: string) => {
@@ -20,7 +20,8 @@ export const sendMagicGenerate = async (payload: {
     }),
   })
   const data = await response.json()
-  return data as Message[]
+  // The run is queued as a job, results arrive over the websocket
+  return data as { status: string; job_id: string }
 }
 
 export const cancelMagicGenerate = async (sessionId: string) => {
@@ -42,6 +42,7 @@ import { ModelInfo, ToolInfo } from '@/api/model'
 import { Button } from '@/components/ui/button'
 import { Share2 } from 'lucide-react'
 import { useAuth } from '@/contexts/AuthContext'
+import { useSocket } from '@/contexts/socket'
 import { useQueryClient } from '@tanstack/react-query'
 import MixedContent, { MixedContentImages, MixedContentText } from './Message/MixedContent'
 
@@ -63,6 +64,7 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
   const [session, setSession] = useState<Session | null>(null)
   const { initCanvas, setInitCanvas } = useConfigs()
   const { authStatus } = useAuth()
+  const { socketManager, connected } = useSocket()
   const [showShareDialog, setShowShareDialog] = useState(false)
   const queryClient = useQueryClient()
 
@@ -436,14 +438,22 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
     [sessionId, scrollToBottom, authStatus.is_logged_in, queryClient]
   )
 
-  const handleError = useCallback((data: TEvents['Socket::Session::Error']) => {
-    setPending(false)
-    toast.error('Error: ' + data.error, {
-      closeButton: true,
-      duration: 3600 * 1000,
-      style: { color: 'red' },
-    })
-  }, [])
+  const handleError = useCallback(
+    (data: TEvents['Socket::Session::Error']) => {
+      // Errors of other sessions are shown by the NotificationPanel
+      if (data.session_id !== sessionId) {
+        return
+      }
+
+      setPending(false)
+      toast.error('Error: ' + data.error, {
+        closeButton: true,
+        duration: 3600 * 1000,
+        style: { color: 'red' },
+      })
+    },
+    [sessionId]
+  )
 
   const handleInfo = useCallback((data: TEvents['Socket::Session::Info']) => {
     toast.info(data.info, {
@@ -531,6 +541,16 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
     initChat()
   }, [sessionId, initChat])
 
+  // Join the session / canvas rooms so the server sends us their events
+  useEffect(() => {
+    if (!socketManager || !connected || !sessionId) {
+      return
+    }
+    const subscription = { session_id: sessionId, canvas_id: canvasId }
+    void socketManager.subscribe(subscription)
+    return () => socketManager.unsubscribe(subscription)
+  }, [socketManager, connected, sessionId, canvasId])
+
   const onSelectSession = (sessionId: string) => {
     setSession(sessionList.find((s) => s.id === sessionId) || null)
     window.history.pushState(
@@ -555,10 +575,20 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
   }
 
   const onSendMessages = useCallback(
-    (data: Message[], configs: { textModel: Model; toolList: ToolInfo[] }) => {
+    async (
+      data: Message[],
+      configs: { textModel: Model; toolList: ToolInfo[] }
+    ) => {
       setPending('text')
       setMessages(data)
 
+      // Be in the session room before the server starts streaming, the first
+      // session_update / tool confirmation events would be dropped otherwise
+      await socketManager?.subscribe({
+        session_id: sessionId!,
+        canvas_id: canvasId,
+      })
+
       sendMessages({
         sessionId: sessionId!,
         canvasId: canvasId,
@@ -579,7 +609,7 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
 
       scrollToBottom()
     },
-    [canvasId, sessionId, searchSessionId, scrollToBottom]
+    [socketManager, canvasId, sessionId, searchSessionId, scrollToBottom]
   )
 
   const handleCancelChat = useCallback(() => {
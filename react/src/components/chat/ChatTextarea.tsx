@@ -8,7 +8,7 @@ import {
   TCanvasAddImagesToChatEvent,
   TMaterialAddImagesToChatEvent,
 } from '@/lib/event'
-import { cn, dataURLToFile } from '@/lib/utils'
+import { cn, dataURLToFile, thumbnailUrl } from '@/lib/utils'
 import { Message, MessageContent, Model } from '@/types/types'
 import { ModelInfo, ToolInfo } from '@/api/model'
 import { useMutation } from '@tanstack/react-query'
@@ -422,7 +422,7 @@ const ChatTextarea: React.FC<ChatTextareaProps> = ({
               >
                 <img
                   key={image.file_id}
-                  src={`/api/file/${image.file_id}`}
+                  src={thumbnailUrl(`/api/file/${image.file_id}`, 128)}
                   alt="Uploaded image"
                   className="w-full h-full object-cover rounded-md"
                   draggable={false}
@@ -1,5 +1,6 @@
 import { Button } from '@/components/ui/button'
 import { useCanvas } from '@/contexts/canvas'
+import { thumbnailUrl } from '@/lib/utils'
 import { useTranslation } from 'react-i18next'
 import { PhotoView } from 'react-photo-view'
 
@@ -35,7 +36,7 @@ const MessageImage = ({ content }: MessageImageProps) => {
         <div className="relative group cursor-pointer">
           <img
             className="w-full h-auto max-h-[140px] object-cover rounded-md border border-border hover:scale-105 transition-transform duration-300"
-            src={content.image_url.url}
+            src={thumbnailUrl(content.image_url.url, 512)}
             alt="Image"
           />
 
@@ -6,6 +6,7 @@ import { useTranslation } from 'react-i18next'
 import { toast } from 'sonner'
 import { Button } from '../ui/button'
 import { formatDate } from '@/utils/formatDate'
+import { thumbnailUrl } from '@/lib/utils'
 import CanvasDeleteDialog from './CanvasDeleteDialog'
 
 type CanvasCardProps = {
@@ -62,7 +63,7 @@ const CanvasCard: React.FC<CanvasCardProps> = ({
       >
         {canvas.thumbnail ? (
           <img
-            src={canvas.thumbnail}
+            src={thumbnailUrl(canvas.thumbnail, 512)}
             alt={canvas.name}
             className="w-full h-40 object-cover rounded-lg"
           />
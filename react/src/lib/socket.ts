@@ -1,7 +1,13 @@
 import * as ISocket from '@/types/socket'
+import { Message } from '@/types/types'
 import { io, Socket } from 'socket.io-client'
 import { eventBus } from './event'
 
+export interface SocketSubscription {
+  session_id?: string
+  canvas_id?: string
+}
+
 export interface SocketConfig {
   serverUrl?: string
   autoConnect?: boolean
@@ -13,6 +19,13 @@ export class SocketIOManager {
   private reconnectAttempts = 0
   private maxReconnectAttempts = 5
   private reconnectDelay = 1000
+  // Server message list per session, rebuilt from messages_delta events
+  private messageLogs = new Map<
+    string,
+    { epoch?: string; seq: number; messages: Message[] }
+  >()
+  // Rooms joined on the server, restored after a reconnect
+  private subscriptions = new Map<string, SocketSubscription>()
 
   constructor(private config: SocketConfig = {}) {
     if (config.autoConnect !== false) {
@@ -40,6 +53,10 @@ export class SocketIOManager {
         console.log('✅ Socket.IO connected:', this.socket?.id)
         this.connected = true
         this.reconnectAttempts = 0
+        // Events sent while we were away are replayed by the resync
+        this.subscriptions.forEach((subscription) => {
+          void this.join(subscription)
+        })
         resolve(true)
       })
 
@@ -123,8 +140,18 @@ export class SocketIOManager {
         eventBus.emit('Socket::Session::VideoGenerated', data)
         break
       case ISocket.SessionEventType.AllMessages:
+        if (data.seq !== undefined) {
+          this.messageLogs.set(session_id, {
+            epoch: data.epoch,
+            seq: data.seq,
+            messages: data.messages,
+          })
+        }
         eventBus.emit('Socket::Session::AllMessages', data)
         break
+      case ISocket.SessionEventType.MessagesDelta:
+        this.handleMessagesDelta(data)
+        break
       case ISocket.SessionEventType.Done:
         eventBus.emit('Socket::Session::Done', data)
         break
@@ -142,6 +169,76 @@ export class SocketIOManager {
     }
   }
 
+  private handleMessagesDelta(data: ISocket.SessionMessagesDeltaEvent) {
+    const { session_id } = data
+    const log = this.messageLogs.get(session_id) ?? { seq: 0, messages: [] }
+
+    // A first delta starting from scratch is fine without a known epoch
+    const sameEpoch =
+      log.epoch === data.epoch ||
+      (log.epoch === undefined && data.base_seq === 0)
+    if (!sameEpoch || log.seq !== data.base_seq) {
+      // Missed an update or the server log was recreated, ask for a replay
+      this.resync(session_id)
+      return
+    }
+
+    const messages = [...log.messages.slice(0, data.start), ...data.messages]
+    this.messageLogs.set(session_id, {
+      epoch: data.epoch,
+      seq: data.seq,
+      messages,
+    })
+    eventBus.emit('Socket::Session::AllMessages', {
+      type: ISocket.SessionEventType.AllMessages,
+      session_id,
+      epoch: data.epoch,
+      seq: data.seq,
+      messages,
+    })
+  }
+
+  // Ask the server for the messages / pending confirmations we don't have
+  private resync(session_id: string) {
+    const log = this.messageLogs.get(session_id)
+    this.socket?.emit('resync_messages', {
+      session_id,
+      epoch: log?.epoch,
+      last_seq: log?.seq ?? 0,
+    })
+  }
+
+  // Join the rooms, then resync: events emitted before the join are not lost
+  private async join(subscription: SocketSubscription) {
+    if (!this.socket || !this.connected) {
+      // Joined (and resynced) by the connect handler
+      return
+    }
+    try {
+      await this.socket.timeout(5000).emitWithAck('subscribe', subscription)
+    } catch (error) {
+      console.warn('⚠️ Socket.IO subscribe not acknowledged:', error)
+    }
+    if (subscription.session_id) {
+      this.resync(subscription.session_id)
+    }
+  }
+
+  // Receive session_update events of a session / canvas, resolves once joined
+  subscribe(subscription: SocketSubscription): Promise<void> {
+    const key = `${subscription.session_id ?? ''}:${subscription.canvas_id ?? ''}`
+    this.subscriptions.set(key, subscription)
+    return this.join(subscription)
+  }
+
+  unsubscribe(subscription: SocketSubscription) {
+    const key = `${subscription.session_id ?? ''}:${subscription.canvas_id ?? ''}`
+    this.subscriptions.delete(key)
+    if (this.socket && this.connected) {
+      this.socket.emit('unsubscribe', subscription)
+    }
+  }
+
   ping(data: unknown) {
     if (this.socket && this.connected) {
       this.socket.emit('ping', data)
@@ -16,3 +16,12 @@ export function dataURLToFile(dataURL: string, filename: string) {
   }
   return new File([u8arr], filename, { type: mime })
 }
+
+// Resized copy of an /api/file image, the server snaps `width` up to a bucket
+// and caches the result. Other URLs (data URLs, remote images) are returned as is
+export function thumbnailUrl(url: string, width: number) {
+  if (!/\/api\/file\/[^/?#]+$/.test(url)) {
+    return url
+  }
+  return `${url}?w=${width}`
+}
@@ -13,6 +13,7 @@ export enum SessionEventType {
   ToolCallArguments = 'tool_call_arguments',
   ToolCallResult = 'tool_call_result',
   AllMessages = 'all_messages',
+  MessagesDelta = 'messages_delta',
   ToolCallProgress = 'tool_call_progress',
   ToolCallPendingConfirmation = 'tool_call_pending_confirmation',
   ToolCallConfirmed = 'tool_call_confirmed',
@@ -71,6 +72,17 @@ export interface SessionToolCallResultEvent extends SessionBaseEvent {
 export interface SessionAllMessagesEvent extends SessionBaseEvent {
   type: SessionEventType.AllMessages
   messages: Message[]
+  epoch?: string
+  seq?: number
+}
+// Replace messages from `start` on, valid only if the last applied seq is `base_seq` of the same `epoch`
+export interface SessionMessagesDeltaEvent extends SessionBaseEvent {
+  type: SessionEventType.MessagesDelta
+  epoch: string
+  seq: number
+  base_seq: number
+  start: number
+  messages: Message[]
 }
 export interface SessionToolCallProgressEvent extends SessionBaseEvent {
   type: SessionEventType.ToolCallProgress
@@ -104,6 +116,7 @@ export type SessionUpdateEvent =
   | SessionImageGeneratedEvent
   | SessionVideoGeneratedEvent
   | SessionAllMessagesEvent
+  | SessionMessagesDeltaEvent
   | SessionDoneEvent
   | SessionErrorEvent
   | SessionInfoEvent
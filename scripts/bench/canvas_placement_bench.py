@@ -0,0 +1,75 @@
+"""
+Canvas element placement: ElementRowIndex vs the old sort-and-scan function
+
+    python scripts/bench/canvas_placement_bench.py [--old-rev REV]
+
+The old find_next_best_element_position is loaded from server/utils/canvas.py
+at REV (default: the first commit of the repository).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, os.path.join(REPO_DIR, 'server'))
+
+
+def load_old_function(rev: str):
+    source = subprocess.run(
+        ['git', 'show', f'{rev}:server/utils/canvas.py'],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    # The old module imported db_service without using it in the placement code
+    source = source.replace('from services.db_service import db_service', '')
+    namespace = {}
+    exec(source, namespace)
+    return namespace['find_next_best_element_position']
+
+
+async def main(rev: str) -> None:
+    from utils.canvas import ElementRowIndex, find_next_best_element_position as new
+
+    old = load_old_function(rev)
+    random.seed(0)
+
+    # Same answer on random layouts built by the old function
+    mismatches = 0
+    for _ in range(2000):
+        elements = []
+        for _ in range(random.randint(0, 30)):
+            x, y = await old({'elements': elements})
+            width, height = random.choice([(100, 100), (200, 150), (50, 300)])
+            elements.append({'type': 'image', 'x': x, 'y': y, 'width': width, 'height': height})
+        if await old({'elements': elements}) != await new({'elements': elements}):
+            mismatches += 1
+    print(f'mismatches on 2000 random layouts: {mismatches}')
+
+    index = ElementRowIndex()
+    elements = []
+    t = time.perf_counter()
+    for _ in range(100_000):
+        x, y = index.next_position()
+        element = {'type': 'image', 'x': x, 'y': y, 'width': 100, 'height': random.randint(50, 150)}
+        index.add(element)
+        elements.append(element)
+    print(f'100k incremental placements: {time.perf_counter() - t:.2f}s')
+
+    t = time.perf_counter()
+    await old({'elements': elements[:5000]})
+    print(f'old function, one call at 5k elements: {time.perf_counter() - t:.2f}s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--old-rev', default=None)
+    args = parser.parse_args()
+    rev = args.old_rev or subprocess.run(
+        ['git', 'rev-list', '--max-parents=0', 'HEAD'],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+    ).stdout.split()[0]
+    asyncio.run(main(rev))
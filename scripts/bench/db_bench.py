@@ -0,0 +1,99 @@
+"""
+DatabaseService throughput and latency
+
+    python scripts/bench/db_bench.py [--server-dir PATH] [--label NAME]
+
+Point --server-dir at the server/ directory of another checkout to compare
+with older code, e.g. `git worktree add /tmp/old <rev>` and
+`--server-dir /tmp/old/server --label old`.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'server')
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run(label: str) -> None:
+    from services.db_service import db_service as db
+
+    if hasattr(db, 'initialize'):
+        await db.initialize()
+    await db.create_canvas('c1', 'bench')
+    await db.create_chat_session('s1', 'm', 'p', 'c1')
+    msg = json.dumps({'role': 'user', 'content': 'x' * 300})
+    n = 1000
+
+    t = time.perf_counter()
+    for _ in range(n):
+        await db.create_message('s1', 'user', msg)
+    sequential = n / (time.perf_counter() - t)
+
+    semaphore = asyncio.Semaphore(32)
+
+    async def insert_one():
+        async with semaphore:
+            await db.create_message('s1', 'user', msg)
+
+    t = time.perf_counter()
+    results = await asyncio.gather(*(insert_one() for _ in range(n)), return_exceptions=True)
+    errors = sum(isinstance(r, Exception) for r in results)
+    concurrent = (n - errors) / (time.perf_counter() - t)
+
+    doc = {
+        'elements': [{'id': f'e{i}', 'type': 'image', 'x': i, 'y': i, 'fileId': f'f{i}'} for i in range(200)],
+        'appState': {},
+        'files': {f'f{i}': {'id': f'f{i}', 'dataURL': f'/api/file/f{i}.png', 'mimeType': 'image/png'} for i in range(200)},
+    }
+    await db.save_canvas_data('c1', json.dumps(doc))
+    idle = []
+    for _ in range(500):
+        t = time.perf_counter()
+        await db.get_canvas_data('c1')
+        idle.append((time.perf_counter() - t) * 1000)
+
+    # Canvas reads while 8 writers insert messages
+    busy = []
+
+    async def writer():
+        nonlocal errors
+        for _ in range(100):
+            try:
+                await db.create_message('s1', 'user', msg)
+            except Exception:
+                errors += 1
+
+    async def reader():
+        for _ in range(100):
+            t = time.perf_counter()
+            await db.get_canvas_data('c1')
+            busy.append((time.perf_counter() - t) * 1000)
+
+    await asyncio.gather(*(writer() for _ in range(8)), *(reader() for _ in range(4)))
+
+    print(f"{label}: inserts/s sequential {sequential:.0f}, concurrent(32) {concurrent:.0f} | "
+          f"canvas read p50 {percentile(idle, 0.5):.2f}ms p95 {percentile(idle, 0.95):.2f}ms | "
+          f"under writes p50 {percentile(busy, 0.5):.2f}ms p95 {percentile(busy, 0.95):.2f}ms | "
+          f"'database is locked' errors {errors}")
+    if hasattr(db, 'close'):
+        await db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--server-dir', default=SERVER_DIR)
+    parser.add_argument('--label', default='current')
+    args = parser.parse_args()
+    os.environ['USER_DATA_DIR'] = tempfile.mkdtemp()
+    sys.path.insert(0, os.path.abspath(args.server_dir))
+    asyncio.run(run(args.label))
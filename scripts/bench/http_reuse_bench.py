@@ -0,0 +1,61 @@
+"""
+TCP connections opened for one remote generation through HttpClient
+
+    python scripts/bench/http_reuse_bench.py [--server-dir PATH]
+
+A local API counts the connections it accepts while the script makes the
+requests of one generation: a submit, 10 status polls and a download
+through create_aiohttp(), plus 5 calls through the httpx create(). Point
+--server-dir at the server/ directory of another checkout to compare.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'server')
+PORT = 18766
+
+
+async def main() -> None:
+    from aiohttp import web
+    from utils.http_client import HttpClient
+
+    connections = set()
+
+    async def handler(request):
+        connections.add(id(request.transport))
+        return web.json_response({'ok': True})
+
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', PORT).start()
+    base = f'http://127.0.0.1:{PORT}'
+
+    requests = [('post', '/submit')] + [('get', '/status')] * 10 + [('get', '/download')]
+    for method, path in requests:
+        async with HttpClient.create_aiohttp() as session:
+            async with session.request(method, base + path) as response:
+                await response.json()
+    aiohttp_connections = len(connections)
+
+    connections.clear()
+    for _ in range(5):
+        async with HttpClient.create() as client:
+            (await client.get(base + '/status')).json()
+
+    print(f'aiohttp: {len(requests)} requests over {aiohttp_connections} connections, '
+          f'httpx: 5 requests over {len(connections)} connections')
+    if hasattr(HttpClient, 'close_all'):
+        await HttpClient.close_all()
+    await runner.cleanup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--server-dir', default=SERVER_DIR)
+    sys.path.insert(0, os.path.abspath(parser.parse_args().server_dir))
+    asyncio.run(main())
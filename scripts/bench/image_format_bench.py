@@ -0,0 +1,50 @@
+"""
+Encode time and file size of each image_output_format
+
+    python scripts/bench/image_format_bench.py [--size 1024]
+
+Saves one RGBA test image (noise over a gradient, closer to a generated
+image than plain noise) through save_generated_image in every format.
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'server'))
+
+
+def test_image(size: int) -> bytes:
+    from PIL import Image
+
+    gradient = Image.linear_gradient('L').resize((size, size))
+    noise = Image.effect_noise((size, size), 32)
+    image = Image.merge('RGBA', (gradient, noise, gradient.rotate(90), Image.new('L', (size, size), 255)))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def main(size: int) -> None:
+    from utils.image_processing import IMAGE_OUTPUT_FORMATS, resolve_output_format, save_generated_image
+
+    data = test_image(size)
+    out_dir = tempfile.mkdtemp()
+    for output_format in IMAGE_OUTPUT_FORMATS:
+        if resolve_output_format(output_format) != output_format:
+            print(f'{output_format}: not supported by this Pillow build')
+            continue
+        t = time.perf_counter()
+        _, _, _, extension = save_generated_image(data, f'{out_dir}/{output_format}', {'prompt': 'x'}, output_format)
+        elapsed = time.perf_counter() - t
+        kb = os.path.getsize(f'{out_dir}/{output_format}.{extension}') / 1024
+        print(f'{output_format}: {elapsed:.2f}s, {kb:.0f}KB')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=1024)
+    main(parser.parse_args().size)
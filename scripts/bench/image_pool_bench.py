@@ -0,0 +1,79 @@
+"""
+Event loop lag while generated images are saved, inline vs the image process pool
+
+    python scripts/bench/image_pool_bench.py
+
+Four 2048x2048 images are saved concurrently while a coroutine ticks every
+10ms (a stand-in for a streaming session). The script also re-runs
+server/main.py the way a spawned pool worker does (as __mp_main__) and lists
+the server modules that got imported, which should be none.
+"""
+
+import asyncio
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'server'))
+sys.path.insert(0, SERVER_DIR)
+
+# What multiprocessing.spawn does with the parent's entry script in every worker
+WORKER_IMPORT_CHECK = """
+import runpy, sys
+runpy.run_path('main.py', run_name='__mp_main__')
+print(sorted(m for m in sys.modules if m.split('.')[0] in ('app', 'services', 'routers', 'tools')))
+"""
+
+
+async def ticker(lags):
+    while True:
+        t = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - t - 0.01)
+
+
+async def measure(label, save_all):
+    lags = []
+    tick = asyncio.create_task(ticker(lags))
+    t = time.perf_counter()
+    await save_all()
+    elapsed = time.perf_counter() - t
+    # Let the ticker see the last stall
+    await asyncio.sleep(0.05)
+    tick.cancel()
+    print(f'{label}: 4 saves in {elapsed:.2f}s, max event loop lag {max(lags, default=0) * 1000:.0f}ms')
+
+
+async def main() -> None:
+    from PIL import Image
+    from utils.image_processing import run_image_task, save_generated_image, shutdown_image_executor, start_image_executor
+
+    buffer = io.BytesIO()
+    Image.effect_noise((2048, 2048), 64).convert('RGB').save(buffer, 'JPEG')
+    data = buffer.getvalue()
+    out_dir = tempfile.mkdtemp()
+
+    async def inline():
+        async def save(i):
+            await asyncio.sleep(0)
+            save_generated_image(data, f'{out_dir}/inline{i}', {'prompt': 'x'})
+        await asyncio.gather(*(save(i) for i in range(4)))
+
+    async def pooled():
+        await asyncio.gather(*(
+            run_image_task(save_generated_image, data, f'{out_dir}/pool{i}', {'prompt': 'x'}) for i in range(4)
+        ))
+
+    start_image_executor()
+    await measure('inline (old)', inline)
+    await measure('process pool', pooled)
+    shutdown_image_executor()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
+    result = subprocess.run([sys.executable, '-c', WORKER_IMPORT_CHECK], cwd=SERVER_DIR, capture_output=True, text=True)
+    print('server modules imported by a pool worker:', result.stdout.strip() or result.stderr.strip())
@@ -0,0 +1,124 @@
+"""
+Other sessions' responsiveness during OpenAI image generations
+
+    python scripts/bench/openai_image_bench.py [--old-rev REV]
+
+A fake OpenAI images API (in its own thread, 1.5s per response) serves three
+concurrent generations while a coroutine ticks every 10ms to stand in for a
+streaming session. Runs the provider at REV (default: the first commit of the
+repository) and the current one, with n=1 and n=2.
+"""
+
+import argparse
+import asyncio
+import base64
+import importlib.util
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, os.path.join(REPO_DIR, 'server'))
+
+PORT = 18911
+DELAY = 1.5
+
+
+def start_fake_api(image_b64: str) -> None:
+    from aiohttp import web
+
+    async def handler(request):
+        await asyncio.sleep(DELAY)
+        if request.content_type == 'application/json':
+            n = (await request.json()).get('n', 1)
+        else:
+            n = int((await request.post()).get('n', 1))
+        return web.json_response({'created': 0, 'data': [{'b64_json': image_b64}] * n})
+
+    def run() -> None:
+        # Own loop, so a blocked client loop doesn't stall the API
+        loop = asyncio.new_event_loop()
+        app = web.Application()
+        app.router.add_post('/v1/images/generations', handler)
+        app.router.add_post('/v1/images/edits', handler)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', PORT).start())
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    time.sleep(0.5)
+
+
+def load_old_provider(rev: str):
+    source = subprocess.run(
+        ['git', 'show', f'{rev}:server/tools/image_providers/openai_provider.py'],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    path = os.path.join(tempfile.mkdtemp(), 'old_openai_provider.py')
+    with open(path, 'w') as f:
+        f.write(source)
+    spec = importlib.util.spec_from_file_location('tools.image_providers.old_openai_provider', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.OpenAIImageProvider()
+
+
+async def ticker(stop: asyncio.Event):
+    """Another session streaming a token every 10ms"""
+    ticks, max_gap, last = 0, 0.0, time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(0.01)
+        now = time.perf_counter()
+        ticks, max_gap, last = ticks + 1, max(max_gap, now - last), now
+    return ticks, max_gap
+
+
+async def run(label: str, generate, **kwargs) -> None:
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(stop))
+    t = time.perf_counter()
+    results = await asyncio.gather(*(generate('a red square', 'openai/gpt-image-1', **kwargs) for _ in range(3)))
+    elapsed = time.perf_counter() - t
+    stop.set()
+    ticks, max_gap = await tick
+    images = [len(r) if isinstance(r, list) else 1 for r in results]
+    print(f'{label}: 3 generations in {elapsed:.2f}s, other session ticked {ticks} times, '
+          f'max stall {max_gap * 1000:.0f}ms, images per call {images}')
+
+
+async def main(rev: str) -> None:
+    from services.config_service import FILES_DIR, config_service
+    from tools.image_providers.openai_provider import OpenAIImageProvider
+    from utils.image_processing import shutdown_image_executor, start_image_executor
+
+    os.makedirs(FILES_DIR, exist_ok=True)
+    config_service.app_config['openai'] = {'api_key': 'sk-test', 'url': f'http://127.0.0.1:{PORT}/v1'}
+    start_image_executor()
+    await run('old provider', load_old_provider(rev).generate)
+    provider = OpenAIImageProvider()
+    await run('AsyncOpenAI', provider.generate_images, num_images=1)
+    await run('AsyncOpenAI n=2', provider.generate_images, num_images=2)
+    shutdown_image_executor()
+
+
+if __name__ == '__main__':
+    os.environ.setdefault('USER_DATA_DIR', tempfile.mkdtemp())
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--old-rev', default=None)
+    args = parser.parse_args()
+    rev = args.old_rev or subprocess.run(
+        ['git', 'rev-list', '--max-parents=0', 'HEAD'],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+    ).stdout.split()[0]
+
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), 'red').save(buffer, 'PNG')
+    start_fake_api(base64.b64encode(buffer.getvalue()).decode())
+    asyncio.run(main(rev))
@@ -0,0 +1,52 @@
+"""
+Cost of session events with N connected sockets, broadcast vs rooms
+
+    python scripts/bench/socket_rooms_bench.py
+
+Connects N sockets to the server's socket.io instance (engine.io transport
+stubbed out), subscribes one of them to the session and sends 1000 session
+events with WEBSOCKET_ROUTING=broadcast (the old behaviour) and =rooms.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'server'))
+
+
+async def main() -> None:
+    import services.websocket_service as websocket_service
+    from services.websocket_state import active_connections, add_connection, session_room, sio
+
+    packets = 0
+
+    async def send_eio_packet(eio_sid, eio_packet):
+        nonlocal packets
+        packets += 1
+
+    sio._send_eio_packet = send_eio_packet
+
+    for n in (1, 10, 50, 200):
+        while len(active_connections) < n:
+            i = len(active_connections)
+            sid = await sio.manager.connect(f'eio{i}', '/')
+            add_connection(sid)
+            if i == 0:
+                await sio.enter_room(sid, session_room('s1'))
+        results = []
+        for routing in ('broadcast', 'rooms'):
+            websocket_service.WEBSOCKET_ROUTING = routing
+            packets = 0
+            t = time.perf_counter()
+            for _ in range(1000):
+                await websocket_service._emit_session_update('s1', None, {'type': 'delta', 'text': 'tok'})
+            # Let the per-recipient send tasks run
+            await asyncio.sleep(0)
+            results.append(f'{routing} {(time.perf_counter() - t) * 1000:.0f}ms / {packets} packets')
+        print(f'N={n}: ' + ', '.join(results))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
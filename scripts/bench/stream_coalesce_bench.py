@@ -0,0 +1,52 @@
+"""
+Frames sent for a streamed LLM answer, with and without token coalescing
+
+    python scripts/bench/stream_coalesce_bench.py
+
+Simulates one session streaming 1000 delta tokens and 5 tool calls (20
+argument chunks each) with the socket.io emit stubbed out, at 1ms and at
+50ms per token, through SessionEventCoalescer with coalescing off and with
+the default window.
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'server'))
+
+
+async def stream(coalescer, token_interval: float) -> None:
+    for i in range(1000):
+        await coalescer.emit('s1', 'c1', {'type': 'delta', 'text': 'tok '})
+        if i % 200 == 199:
+            call_id = f'call_{i}'
+            await coalescer.emit('s1', 'c1', {'type': 'tool_call', 'id': call_id, 'name': 'generate_image'})
+            for _ in range(20):
+                await coalescer.emit('s1', 'c1', {'type': 'tool_call_arguments', 'id': call_id, 'text': '{"a":1}'})
+        await asyncio.sleep(token_interval)
+    await coalescer.emit('s1', 'c1', {'type': 'done'})
+
+
+async def main() -> None:
+    import services.websocket_service as websocket_service
+
+    frames = []
+
+    async def emit(session_id, canvas_id, event):
+        frames.append(event)
+
+    websocket_service._emit_session_update = emit
+
+    for token_interval in (0.001, 0.05):
+        for label, window_ms in (('off', 0), ('default', websocket_service.STREAM_COALESCE_MS)):
+            frames.clear()
+            coalescer = websocket_service.SessionEventCoalescer(window_ms=window_ms)
+            await stream(coalescer, token_interval)
+            metrics = coalescer.get_metrics()
+            print(f'{token_interval * 1000:.0f}ms/token, coalescing {label}: {metrics["events_in"]} events -> '
+                  f'{len(frames)} frames, added latency avg {metrics["avg_delay_ms"]:.1f}ms max {metrics["max_delay_ms"]:.1f}ms')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+"""
+Status checks and detection lag of the shared task poller vs fixed-interval polling
+
+    python scripts/bench/task_poller_bench.py [--kind jaaz_video] [--scale 10]
+
+Runs 20 simulated tasks of a TASK_POLL_PROFILES kind, finishing between 0.5x
+and 2x the kind's expected duration, on a TaskPoller with all durations
+divided by --scale. Counts status checks and the delay between a task
+finishing and the poller noticing it, and compares the checks with polling
+every min interval (the old provider loops). Times are printed unscaled.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'server'))
+
+
+async def main(kind: str, scale: float) -> None:
+    import services.task_poller as task_poller_module
+    from services.task_poller import TaskPoller
+
+    expected, min_interval, max_interval = task_poller_module.TASK_POLL_PROFILES[kind]
+    task_poller_module.TASK_POLL_PROFILES['bench'] = (expected / scale, min_interval / scale, max_interval / scale)
+    poller = TaskPoller()
+
+    durations = [expected * (0.5 + 1.5 * i / 19) for i in range(20)]
+    checks = 0
+    first_checks = []
+    lags = []
+
+    def make_check(duration: float):
+        started = time.monotonic()
+        finish_at = started + duration / scale
+        polls = 0
+
+        async def check():
+            nonlocal checks, polls
+            checks += 1
+            polls += 1
+            now = time.monotonic()
+            if polls == 1:
+                first_checks.append(now - started)
+            if now >= finish_at:
+                lags.append((now - finish_at) * scale)
+                return 'done'
+            return None
+        return check
+
+    await asyncio.gather(*(
+        poller.wait(f'task{i}', make_check(duration), kind='bench', timeout=10 * expected)
+        for i, duration in enumerate(durations)
+    ))
+    await poller.stop()
+
+    fixed = sum(int(duration / min_interval) + 1 for duration in durations)
+    print(f'{kind} (expected {expected:.0f}s, interval {min_interval:.0f}-{max_interval:.0f}s), '
+          f'20 tasks finishing in {durations[0]:.0f}-{durations[-1]:.0f}s:')
+    print(f'  status checks: {checks}, polling every {min_interval:.0f}s: ~{fixed}')
+    print(f'  first check after {min(first_checks) * scale:.1f}s')
+    print(f'  detected after finishing: avg {sum(lags) / len(lags):.1f}s, max {max(lags):.1f}s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--kind', default='jaaz_video')
+    parser.add_argument('--scale', type=float, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.kind, args.scale))
@@ -0,0 +1,94 @@
+"""
+Parallel video saves on one canvas: downloads under the canvas lock vs two-phase
+
+    python scripts/bench/video_download_overlap.py
+
+A local server streams a 1MB video over ~1s (a slow CDN). Four saves to the
+same canvas run concurrently, first with the download held under the canvas
+lock (the old behaviour), then through save_video_to_canvas. The canvas
+itself is stubbed, only the lock and the download are real.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'server'))
+
+PORT = 18765
+spans = []
+
+
+async def slow_video(request):
+    from aiohttp import web
+
+    start = time.perf_counter()
+    response = web.StreamResponse()
+    await response.prepare(request)
+    for _ in range(10):
+        await response.write(b'\0' * 100_000)
+        await asyncio.sleep(0.1)
+    await response.write_eof()
+    spans.append((start, time.perf_counter()))
+    return response
+
+
+def overlap(spans):
+    """Seconds during which two or more downloads were in flight"""
+    events = sorted([(start, 1) for start, _ in spans] + [(end, -1) for _, end in spans])
+    active, last, total = 0, 0.0, 0.0
+    for t, delta in events:
+        if active >= 2:
+            total += t - last
+        active += delta
+        last = t
+    return total
+
+
+async def main() -> None:
+    from aiohttp import web
+    from services.canvas_cache import canvas_cache
+    from services.canvas_lock_manager import canvas_lock_manager
+    from services.config_service import FILES_DIR
+    from tools.video_generation import video_canvas_utils as vcu
+    from utils.http_client import HttpClient
+
+    os.makedirs(FILES_DIR, exist_ok=True)
+
+    async def new_element(canvas_id, file_id, size):
+        return {'id': file_id, 'type': 'video', 'x': 0, 'y': 0, **size}
+
+    async def append_elements(canvas_id, elements, files):
+        pass
+
+    vcu.generate_new_video_element = new_element
+    canvas_cache.append_elements = append_elements
+
+    app = web.Application()
+    app.router.add_get('/v.mp4', slow_video)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', PORT).start()
+    url = f'http://127.0.0.1:{PORT}/v.mp4'
+
+    async def locked_download():
+        async with canvas_lock_manager.lock_canvas('cv'):
+            await vcu.store_video_asset(url)
+
+    async def two_phase():
+        await vcu.save_video_to_canvas('s', 'cv', url)
+
+    for label, save in (('lock held during download', locked_download), ('two-phase', two_phase)):
+        spans.clear()
+        t = time.perf_counter()
+        await asyncio.gather(*(save() for _ in range(4)))
+        print(f'{label}: 4 videos in {time.perf_counter() - t:.2f}s, downloads overlapping for {overlap(spans):.2f}s')
+    await HttpClient.close_all()
+    await runner.cleanup()
+
+
+if __name__ == '__main__':
+    os.environ.setdefault('USER_DATA_DIR', tempfile.mkdtemp())
+    asyncio.run(main())
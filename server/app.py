@@ -0,0 +1,107 @@
+# app.py
+"""
+FastAPI / socket.io application, started by main.py
+
+Kept out of main.py so that processes re-importing the entry script (image
+process pool workers, uvicorn workers) don't build the whole server.
+"""
+
+import os
+print('Importing websocket_router')
+from routers.websocket_router import *  # DO NOT DELETE THIS LINE, OTHERWISE, WEBSOCKET WILL NOT WORK
+print('Importing routers')
+from routers import config_router, image_router, root_router, workspace, canvas, ssl_test, chat_router, settings, tool_confirmation
+from fastapi.responses import FileResponse
+from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import socketio # type: ignore
+print('Importing websocket_state')
+from services.websocket_state import sio
+print('Importing websocket_service')
+from services.websocket_service import broadcast_init_done
+print('Importing config_service')
+from services.config_service import config_service
+print('Importing tool_service')
+from services.tool_service import tool_service
+print('Importing db_service')
+from services.db_service import db_service
+from services.message_sink import message_sink
+from services.canvas_cache import canvas_cache
+from utils.image_processing import start_image_executor, shutdown_image_executor
+from utils.http_cache import HashedAssetStaticFiles
+from utils.http_client import HttpClient
+from services.langgraph_service.model_cache import text_model_cache
+from services.backplane import backplane
+from services.tool_confirmation_manager import tool_confirmation_manager
+from services.job_scheduler import job_scheduler
+from services.task_poller import task_poller
+
+async def initialize():
+    print('Initializing config_service')
+    await config_service.initialize()
+    print('Initializing broadcast_init_done')
+    await broadcast_init_done()
+
+root_dir = os.path.dirname(__file__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # onstartup
+    # TODO: Check if there will be racing conditions when user send chat request but tools and models are not initialized yet.
+    # 先启动图片进程池，再打开数据库 / HTTP 连接等会创建线程的资源
+    start_image_executor()
+    await db_service.initialize()
+    await backplane.start()
+    await initialize()
+    await tool_service.initialize()
+    message_sink.start()
+    tool_confirmation_manager.start()
+    yield
+    # onshutdown
+    await job_scheduler.stop()
+    await task_poller.stop()
+    await tool_confirmation_manager.stop()
+    await backplane.stop()
+    await message_sink.stop()
+    await canvas_cache.close()
+    await db_service.close()
+    shutdown_image_executor()
+    await text_model_cache.close()
+    await HttpClient.close_all()
+
+print('Creating FastAPI app')
+app = FastAPI(lifespan=lifespan)
+
+# Include routers
+print('Including routers')
+app.include_router(config_router.router)
+app.include_router(settings.router)
+app.include_router(root_router.router)
+app.include_router(canvas.router)
+app.include_router(workspace.router)
+app.include_router(image_router.router)
+app.include_router(ssl_test.router)
+app.include_router(chat_router.router)
+app.include_router(tool_confirmation.router)
+
+# Mount the React build directory
+react_build_dir = os.environ.get('UI_DIST_DIR', os.path.join(
+    os.path.dirname(root_dir), "react", "dist"))
+
+
+# 带 hash 的构建产物按不可变资源缓存，index.html 保持不缓存以便拿到新的 hash
+static_site = os.path.join(react_build_dir, "assets")
+if os.path.exists(static_site):
+    app.mount("/assets", HashedAssetStaticFiles(directory=static_site), name="assets")
+
+
+@app.get("/")
+async def serve_react_app():
+    response = FileResponse(os.path.join(react_build_dir, "index.html"))
+    response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+    response.headers["Pragma"] = "no-cache"
+    response.headers["Expires"] = "0"
+    return response
+
+print('Creating socketio app')
+socket_app = socketio.ASGIApp(sio, other_asgi_app=app, socketio_path='/socket.io')
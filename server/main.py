@@ -1,95 +1,20 @@
 import os
 import sys
 import io
+import argparse
+import multiprocessing
 # Ensure stdout and stderr use utf-8 encoding to prevent emoji logs from crashing python server
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
 sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
-print('Importing websocket_router')
-from routers.websocket_router import *  # DO NOT DELETE THIS LINE, OTHERWISE, WEBSOCKET WILL NOT WORK
-print('Importing routers')
-from routers import config_router, image_router, root_router, workspace, canvas, ssl_test, chat_router, settings, tool_confirmation
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi import FastAPI
-import argparse
-from contextlib import asynccontextmanager
-from starlette.types import Scope
-from starlette.responses import Response
-import socketio # type: ignore
-print('Importing websocket_state')
-from services.websocket_state import sio
-print('Importing websocket_service')
-from services.websocket_service import broadcast_init_done
-print('Importing config_service')
-from services.config_service import config_service
-print('Importing tool_service')
-from services.tool_service import tool_service
-
-async def initialize():
-    print('Initializing config_service')
-    await config_service.initialize()
-    print('Initializing broadcast_init_done')
-    await broadcast_init_done()
-
-root_dir = os.path.dirname(__file__)
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # onstartup
-    # TODO: Check if there will be racing conditions when user send chat request but tools and models are not initialized yet.
-    await initialize()
-    await tool_service.initialize()
-    yield
-    # onshutdown
-
-print('Creating FastAPI app')
-app = FastAPI(lifespan=lifespan)
-
-# Include routers
-print('Including routers')
-app.include_router(config_router.router)
-app.include_router(settings.router)
-app.include_router(root_router.router)
-app.include_router(canvas.router)
-app.include_router(workspace.router)
-app.include_router(image_router.router)
-app.include_router(ssl_test.router)
-app.include_router(chat_router.router)
-app.include_router(tool_confirmation.router)
-
-# Mount the React build directory
-react_build_dir = os.environ.get('UI_DIST_DIR', os.path.join(
-    os.path.dirname(root_dir), "react", "dist"))
 
+if __name__ == "__main__":
+    # Needed by the image process pool in PyInstaller builds, must run before
+    # the server is imported so pool workers return here without building it
+    multiprocessing.freeze_support()
 
-# 无缓存静态文件类
-class NoCacheStaticFiles(StaticFiles):
-    async def get_response(self, path: str, scope: Scope) -> Response:
-        response = await super().get_response(path, scope)
-        if response.status_code == 200:
-            response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-            response.headers["Pragma"] = "no-cache"
-            response.headers["Expires"] = "0"
-        return response
-
-
-static_site = os.path.join(react_build_dir, "assets")
-if os.path.exists(static_site):
-    app.mount("/assets", NoCacheStaticFiles(directory=static_site), name="assets")
-
-
-@app.get("/")
-async def serve_react_app():
-    response = FileResponse(os.path.join(react_build_dir, "index.html"))
-    response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-    return response
-
-print('Creating socketio app')
-socket_app = socketio.ASGIApp(sio, other_asgi_app=app, socketio_path='/socket.io')
+    from app import socket_app
+    from services.backplane import BACKPLANE_URL, LOCAL_STAND_IN_URL
 
-if __name__ == "__main__":
     # bypass localhost request for proxy, fix ollama proxy issue
     _bypass = {"127.0.0.1", "localhost", "::1"}
     current = set(os.environ.get("no_proxy", "").split(",")) | set(
@@ -100,8 +25,21 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('--port', type=int, default=57988,
                         help='Port to run the server on')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WORKERS', 1)),
+                        help='Number of worker processes, more than 1 requires BACKPLANE_URL')
     args = parser.parse_args()
     import uvicorn
     print("🌟Starting server, UI_DIST_DIR:", os.environ.get('UI_DIST_DIR'))
 
-    uvicorn.run(socket_app, host="127.0.0.1", port=args.port)
+    if args.workers > 1 and not BACKPLANE_URL:
+        print("⚠️ --workers > 1 requires BACKPLANE_URL (e.g. redis://localhost:6379/0), starting a single worker")
+        args.workers = 1
+    elif args.workers > 1 and BACKPLANE_URL.startswith(LOCAL_STAND_IN_URL):
+        print(f"⚠️ {LOCAL_STAND_IN_URL} only lives inside one process, starting a single worker")
+        args.workers = 1
+
+    if args.workers > 1:
+        # Workers import the app themselves, each one connects to the backplane
+        uvicorn.run("app:socket_app", host="127.0.0.1", port=args.port, workers=args.workers)
+    else:
+        uvicorn.run(socket_app, host="127.0.0.1", port=args.port)
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Request
 #from routers.agent import chat
-from services.chat_service import handle_chat
+from services.chat_service import submit_chat
+from services.job_scheduler import get_job_user
 from services.db_service import db_service
-import asyncio
+from services.canvas_cache import canvas_cache
+from services.canvas_lock_manager import canvas_lock_manager
 import json
 
 router = APIRouter(prefix="/api/canvas")
@@ -17,19 +19,51 @@ async def create_canvas(request: Request):
     id = data.get('canvas_id')
     name = data.get('name')
 
-    asyncio.create_task(handle_chat(data))
     await db_service.create_canvas(id, name)
-    return {"id": id }
+    job_id = await submit_chat(data, get_job_user(request))
+    return {"id": id, "job_id": job_id}
 
 @router.get("/{id}")
 async def get_canvas(id: str):
-    return await db_service.get_canvas_data(id)
+    await canvas_cache.sync_version(id)
+    canvas = await canvas_cache.get(id)
+    if canvas is None:
+        return None
+    sessions = await db_service.list_sessions(id)
+    return {**canvas, 'sessions': sessions}
 
 @router.post("/{id}/save")
 async def save_canvas(id: str, request: Request):
     payload = await request.json()
     data_str = json.dumps(payload['data'])
-    await db_service.save_canvas_data(id, data_str, payload['thumbnail'])
+    async with canvas_lock_manager.lock_canvas(id):
+        await canvas_cache.replace(id, payload['data'], data_str, payload['thumbnail'])
+    return {"id": id }
+
+def _validate_patch(payload):
+    """检查 patch 请求体：elements 为带 id 的对象列表，files 为对象"""
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Patch body must be a JSON object")
+    elements = payload.get('elements', [])
+    files = payload.get('files', {})
+    if not isinstance(elements, list):
+        raise HTTPException(status_code=400, detail="'elements' must be a list")
+    for i, element in enumerate(elements):
+        if not isinstance(element, dict) or not isinstance(element.get('id'), str) or not element['id']:
+            raise HTTPException(status_code=400, detail=f"elements[{i}] must be an object with a string 'id'")
+    if not isinstance(files, dict) or not all(isinstance(file_data, dict) for file_data in files.values()):
+        raise HTTPException(status_code=400, detail="'files' must be an object of file id -> file data")
+    return elements, files
+
+@router.post("/{id}/patch")
+async def patch_canvas(id: str, request: Request):
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    elements, files = _validate_patch(payload)
+    async with canvas_lock_manager.lock_canvas(id):
+        await canvas_cache.append_elements(id, elements, files)
     return {"id": id }
 
 @router.post("/{id}/rename")
@@ -37,9 +71,13 @@ async def rename_canvas(id: str, request: Request):
     data = await request.json()
     name = data.get('name')
     await db_service.rename_canvas(id, name)
+    canvas_cache.rename(id, name)
+    await canvas_cache.publish_change(id)
     return {"id": id }
 
 @router.delete("/{id}/delete")
 async def delete_canvas(id: str):
+    canvas_cache.invalidate(id)
     await db_service.delete_canvas(id)
+    await canvas_cache.publish_change(id)
     return {"id": id }
\ No newline at end of file
@@ -1,9 +1,9 @@
 #server/routers/chat_router.py
-from fastapi import APIRouter, Request
-from services.chat_service import handle_chat
-from services.magic_service import handle_magic
-from services.stream_service import get_stream_task
-from typing import Dict
+from fastapi import APIRouter, HTTPException, Request
+from services.chat_service import submit_chat
+from services.magic_service import submit_magic
+from services.job_scheduler import job_scheduler, get_job_user
+from typing import Dict, Optional
 
 router = APIRouter(prefix="/api")
 
@@ -12,25 +12,23 @@ async def chat(request: Request):
     """
     Endpoint to handle chat requests.
 
-    Receives a JSON payload from the client, passes it to the chat handler,
-    and returns a success status.
+    Receives a JSON payload from the client and queues it as a chat job.
+    Results stream over the websocket, ending with a `done` event.
 
     Request body:
-        JSON object containing chat data.
+        JSON object containing chat data, optional `priority` (high / normal / low).
 
     Response:
-        {"status": "done"}
+        {"status": "queued", "job_id": str}
     """
     data = await request.json()
-    await handle_chat(data)
-    return {"status": "done"}
+    job_id = await submit_chat(data, get_job_user(request))
+    return {"status": "queued", "job_id": job_id}
 
 @router.post("/cancel/{session_id}")
 async def cancel_chat(session_id: str):
     """
-    Endpoint to cancel an ongoing stream task for a given session_id.
-
-    If the task exists and is not yet completed, it will be cancelled.
+    Endpoint to cancel the queued or running chat job for a given session_id.
 
     Path parameter:
         session_id (str): The ID of the session whose task should be cancelled.
@@ -39,9 +37,7 @@ async def cancel_chat(session_id: str):
         {"status": "cancelled"} if the task was cancelled.
         {"status": "not_found_or_done"} if no such task exists or it is already done.
     """
-    task = get_stream_task(session_id)
-    if task and not task.done():
-        task.cancel()
+    if await job_scheduler.cancel_session(session_id):
         return {"status": "cancelled"}
     return {"status": "not_found_or_done"}
 
@@ -50,25 +46,23 @@ async def magic(request: Request):
     """
     Endpoint to handle magic generation requests.
 
-    Receives a JSON payload from the client, passes it to the magic handler,
-    and returns a success status.
+    Receives a JSON payload from the client and queues it as a magic job.
+    Results stream over the websocket, ending with a `done` event.
 
     Request body:
         JSON object containing magic generation data.
 
     Response:
-        {"status": "done"}
+        {"status": "queued", "job_id": str}
     """
     data = await request.json()
-    await handle_magic(data)
-    return {"status": "done"}
+    job_id = await submit_magic(data, get_job_user(request))
+    return {"status": "queued", "job_id": job_id}
 
 @router.post("/magic/cancel/{session_id}")
 async def cancel_magic(session_id: str) -> Dict[str, str]:
     """
-    Endpoint to cancel an ongoing magic generation task for a given session_id.
-
-    If the task exists and is not yet completed, it will be cancelled.
+    Endpoint to cancel the queued or running magic job for a given session_id.
 
     Path parameter:
         session_id (str): The ID of the session whose task should be cancelled.
@@ -77,8 +71,24 @@ async def cancel_magic(session_id: str) -> Dict[str, str]:
         {"status": "cancelled"} if the task was cancelled.
         {"status": "not_found_or_done"} if no such task exists or it is already done.
     """
-    task = get_stream_task(session_id)
-    if task and not task.done():
-        task.cancel()
+    if await job_scheduler.cancel_session(session_id):
+        return {"status": "cancelled"}
+    return {"status": "not_found_or_done"}
+
+@router.get("/jobs")
+async def list_jobs(session_id: Optional[str] = None):
+    """Jobs known to this worker, queued and running first"""
+    return [job.to_dict() for job in job_scheduler.list_jobs(session_id)]
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_scheduler.lookup(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str) -> Dict[str, str]:
+    if await job_scheduler.cancel_job(job_id):
         return {"status": "cancelled"}
     return {"status": "not_found_or_done"}
@@ -1,17 +1,16 @@
-from fastapi.responses import FileResponse
-from fastapi.concurrency import run_in_threadpool
 from common import DEFAULT_PORT
 from tools.utils.image_canvas_utils import generate_file_id
 from services.config_service import FILES_DIR
 
-from PIL import Image
-from io import BytesIO
 import os
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from typing import Optional
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Request
 import httpx
-import aiofiles
 from mimetypes import guess_type
 from utils.http_client import HttpClient
+from utils.http_cache import immutable_file_response
+from utils.image_processing import run_image_task, save_uploaded_image
+from services.thumbnail_service import thumbnail_service
 
 router = APIRouter(prefix="/api")
 os.makedirs(FILES_DIR, exist_ok=True)
@@ -29,63 +28,22 @@ async def upload_image(file: UploadFile = File(...), max_size_mb: float = 3.0):
         content = await file.read()
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error reading file: {e}")
-    original_size_mb = len(content) / (1024 * 1024)  # Convert to MB
 
-    # Open the image from bytes to get its dimensions
-    with Image.open(BytesIO(content)) as img:
-        width, height = img.size
-        
-        # Check if compression is needed
-        if original_size_mb > max_size_mb:
-            print(f'🦄 Image size ({original_size_mb:.2f}MB) exceeds limit ({max_size_mb}MB), compressing...')
-            
-            # Convert to RGB if necessary (for JPEG compression)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                # Create a white background for transparent images
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Compress the image
-            compressed_content = compress_image(img, max_size_mb)
-            
-            # Save compressed image using Image.save
-            extension = 'jpg'  # Force JPEG for compressed images
-            file_path = os.path.join(FILES_DIR, f'{file_id}.{extension}')
-            
-            # Create new image from compressed content and save
-            with Image.open(BytesIO(compressed_content)) as compressed_img:
-                width, height = compressed_img.size
-                await run_in_threadpool(compressed_img.save, file_path, format='JPEG', quality=95, optimize=True)
-                # compressed_img.save(file_path, format='JPEG', quality=95, optimize=True)
-            
-            final_size_mb = len(compressed_content) / (1024 * 1024)
-            print(f'🦄 Compressed from {original_size_mb:.2f}MB to {final_size_mb:.2f}MB')
-        else:
-            # Determine the file extension from original file
-            mime_type, _ = guess_type(filename)
-            if mime_type and mime_type.startswith('image/'):
-                extension = mime_type.split('/')[-1]
-                # Handle common image format mappings
-                if extension == 'jpeg':
-                    extension = 'jpg'
-            else:
-                extension = 'jpg'  # Default to jpg for unknown types
-            
-            # Save original image using Image.save
-            file_path = os.path.join(FILES_DIR, f'{file_id}.{extension}')
-            
-            # Determine save format based on extension
-            save_format = 'JPEG' if extension.lower() in ['jpg', 'jpeg'] else extension.upper()
-            if save_format == 'JPEG':
-                img = img.convert('RGB')
-            
-            # img.save(file_path, format=save_format)
-            await run_in_threadpool(img.save, file_path, format=save_format)
+    # Determine the file extension from original file
+    mime_type, _ = guess_type(filename)
+    if mime_type and mime_type.startswith('image/'):
+        extension = mime_type.split('/')[-1]
+        # Handle common image format mappings
+        if extension == 'jpeg':
+            extension = 'jpg'
+    else:
+        extension = 'jpg'  # Default to jpg for unknown types
+
+    # Decode / compress / save in the image process pool
+    width, height, extension = await run_image_task(
+        save_uploaded_image, content, os.path.join(FILES_DIR, file_id), extension, max_size_mb
+    )
+    file_path = os.path.join(FILES_DIR, f'{file_id}.{extension}')
 
     # 返回文件信息
     print('🦄upload_image file_path', file_path)
@@ -97,61 +55,29 @@ async def upload_image(file: UploadFile = File(...), max_size_mb: float = 3.0):
     }
 
 
-def compress_image(img: Image.Image, max_size_mb: float) -> bytes:
-    """
-    Compress an image to be under the specified size limit.
-    """
-    # Start with high quality
-    quality = 95
-    
-    while quality > 10:
-        # Save to bytes buffer
-        buffer = BytesIO()
-        img.save(buffer, format='JPEG', quality=quality, optimize=True)
-        
-        # Check size
-        size_mb = len(buffer.getvalue()) / (1024 * 1024)
-        
-        if size_mb <= max_size_mb:
-            return buffer.getvalue()
-        
-        # Reduce quality for next iteration
-        quality -= 10
-    
-    # If still too large, try reducing dimensions
-    original_width, original_height = img.size
-    scale_factor = 0.8
-    
-    while scale_factor > 0.3:
-        new_width = int(original_width * scale_factor)
-        new_height = int(original_height * scale_factor)
-        resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
-        # Try with moderate quality
-        buffer = BytesIO()
-        resized_img.save(buffer, format='JPEG', quality=70, optimize=True)
-        
-        size_mb = len(buffer.getvalue()) / (1024 * 1024)
-        
-        if size_mb <= max_size_mb:
-            return buffer.getvalue()
-        
-        scale_factor -= 0.1
-    
-    # Last resort: very low quality
-    buffer = BytesIO()
-    resized_img.save(buffer, format='JPEG', quality=30, optimize=True)
-    return buffer.getvalue()
-
-
-# 文件下载接口
+# 文件下载接口，传入 w 时返回缩放后的图片（如 ?w=256&format=webp）
+# 文件名是 nanoid，内容不会变化，按不可变资源缓存（ETag / 304 / Range）
 @router.get("/file/{file_id}")
-async def get_file(file_id: str):
+async def get_file(
+    request: Request,
+    file_id: str,
+    w: Optional[int] = Query(None, gt=0),
+    output_format: Optional[str] = Query(None, alias='format'),
+):
     file_path = os.path.join(FILES_DIR, f'{file_id}')
-    print('🦄get_file file_path', file_path)
-    if not os.path.exists(file_path):
+    if not os.path.isfile(file_path):
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(file_path)
+    if w is not None:
+        for _ in range(2):
+            derivative_path = await thumbnail_service.get_derivative(file_id, w, output_format)
+            if derivative_path is None:
+                break
+            try:
+                return immutable_file_response(request, derivative_path)
+            except FileNotFoundError:
+                # 缓存清理在查找和读取之间删除了缩略图，重新生成
+                continue
+    return immutable_file_response(request, file_path)
 
 
 @router.post("/comfyui/object_info")
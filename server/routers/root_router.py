@@ -1,12 +1,24 @@
 import os
 from fastapi import APIRouter
-import requests
-import httpx
 from models.tool_model import ToolInfoJson
 from services.tool_service import tool_service
 from services.config_service import config_service
 from services.db_service import db_service
+from services.message_sink import message_sink
+from services.message_log import message_log
+from services.websocket_service import session_event_coalescer
+from services.canvas_cache import canvas_cache
+from services.canvas_lock_manager import canvas_lock_manager
+from services.thumbnail_service import thumbnail_service
 from utils.http_client import HttpClient
+from services.model_discovery_service import model_discovery_service
+from services.job_scheduler import job_scheduler
+from services.generation_scheduler import generation_scheduler
+from services.task_poller import task_poller
+from services.langgraph_service.model_cache import text_model_cache
+from services.langgraph_service.swarm_cache import swarm_cache
+from services.backplane import backplane
+from services.tool_confirmation_manager import tool_confirmation_manager
 # services
 from models.config_model import ModelInfo
 from typing import List
@@ -15,37 +27,15 @@ from services.tool_service import TOOL_MAPPING
 router = APIRouter(prefix="/api")
 
 
-def get_ollama_model_list() -> List[str]:
+async def get_ollama_model_list() -> List[str]:
     base_url = config_service.get_config().get('ollama', {}).get(
         'url', os.getenv('OLLAMA_HOST', 'http://localhost:11434'))
-    try:
-        response = requests.get(f'{base_url}/api/tags', timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        return [model['name'] for model in data.get('models', [])]
-    except requests.RequestException as e:
-        print(f"Error querying Ollama: {e}")
-        return []
+    return await model_discovery_service.get_ollama_models(base_url)
 
 
 async def get_comfyui_model_list(base_url: str) -> List[str]:
     """Get ComfyUI model list from object_info API"""
-    try:
-        timeout = httpx.Timeout(10.0)
-        async with HttpClient.create(timeout=timeout) as client:
-            response = await client.get(f"{base_url}/api/object_info")
-            if response.status_code == 200:
-                data = response.json()
-                # Extract models from CheckpointLoaderSimple node
-                models = data.get('CheckpointLoaderSimple', {}).get(
-                    'input', {}).get('required', {}).get('ckpt_name', [[]])[0]
-                return models if isinstance(models, list) else []  # type: ignore
-            else:
-                print(f"ComfyUI server returned status {response.status_code}")
-                return []
-    except Exception as e:
-        print(f"Error querying ComfyUI: {e}")
-        return []
+    return await model_discovery_service.get_comfyui_models(base_url)
 
 # List all LLM models
 @router.get("/list_models")
@@ -58,7 +48,7 @@ async def get_models() -> list[ModelInfo]:
         'url', os.getenv('OLLAMA_HOST', 'http://localhost:11434'))
     # Add Ollama models if URL is available
     if ollama_url and ollama_url.strip():
-        ollama_models = get_ollama_model_list()
+        ollama_models = await get_ollama_model_list()
         for ollama_model in ollama_models:
             res.append({
                 'provider': 'ollama',
@@ -137,4 +127,26 @@ async def list_chat_sessions():
 
 @router.get("/chat_session/{session_id}")
 async def get_chat_session(session_id: str):
+    await message_sink.flush()
     return await db_service.get_chat_history(session_id)
+
+
+@router.get("/metrics")
+async def get_metrics():
+    return {
+        'message_sink': message_sink.get_metrics(),
+        'canvas_cache': canvas_cache.get_metrics(),
+        'canvas_locks': canvas_lock_manager.get_metrics(),
+        'thumbnails': thumbnail_service.get_metrics(),
+        'http': HttpClient.get_metrics(),
+        'text_models': text_model_cache.get_metrics(),
+        'agent_swarms': swarm_cache.get_metrics(),
+        'message_log': message_log.get_metrics(),
+        'stream_coalescer': session_event_coalescer.get_metrics(),
+        'backplane': backplane.get_metrics(),
+        'tool_confirmations': tool_confirmation_manager.get_metrics(),
+        'model_discovery': model_discovery_service.get_metrics(),
+        'jobs': job_scheduler.get_metrics(),
+        'generation': generation_scheduler.get_metrics(),
+        'task_poller': task_poller.get_metrics(),
+    }
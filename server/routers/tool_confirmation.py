@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, List, Optional
 from services.websocket_service import send_to_websocket
 from services.tool_confirmation_manager import tool_confirmation_manager
 
@@ -11,35 +11,54 @@ class ToolConfirmationRequest(BaseModel):
     tool_call_id: str
     confirmed: bool
 
+class ToolConfirmationBatchRequest(BaseModel):
+    session_id: str
+    confirmed: bool
+    # 为空时处理该会话所有等待确认的工具调用
+    tool_call_ids: Optional[List[str]] = None
+
+
+async def _notify_resolved(session_id: str, tool_call_id: str, confirmed: bool):
+    await send_to_websocket(session_id, {
+        'type': 'tool_call_confirmed' if confirmed else 'tool_call_cancelled',
+        'id': tool_call_id
+    })
+
+
 @router.post("/tool_confirmation")
 async def handle_tool_confirmation(request: ToolConfirmationRequest):
     """处理工具调用确认"""
     try:
-        if request.confirmed:
-            # 确认工具调用
-            success = tool_confirmation_manager.confirm_tool(
-                request.tool_call_id)
-            if success:
-                await send_to_websocket(request.session_id, {
-                    'type': 'tool_call_confirmed',
-                    'id': request.tool_call_id
-                })
-            else:
-                raise HTTPException(
-                    status_code=404, detail="Tool call not found or already processed")
+        success = await tool_confirmation_manager.resolve(
+            request.tool_call_id, request.confirmed)
+        if not success:
+            raise HTTPException(
+                status_code=404, detail="Tool call not found or already processed")
+        await _notify_resolved(request.session_id, request.tool_call_id, request.confirmed)
+
+        return {"status": "success"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/tool_confirmation/batch")
+async def handle_tool_confirmation_batch(request: ToolConfirmationBatchRequest):
+    """批量确认或取消工具调用"""
+    try:
+        if request.tool_call_ids is None:
+            resolved = await tool_confirmation_manager.resolve_session(
+                request.session_id, request.confirmed)
+            results: Dict[str, bool] = {tool_call_id: True for tool_call_id in resolved}
         else:
-            # 取消工具调用
-            success = tool_confirmation_manager.cancel_confirmation(
-                request.tool_call_id)
+            results = await tool_confirmation_manager.resolve_many(
+                request.tool_call_ids, request.confirmed)
+        for tool_call_id, success in results.items():
             if success:
-                await send_to_websocket(request.session_id, {
-                    'type': 'tool_call_cancelled',
-                    'id': request.tool_call_id
-                })
-            else:
-                raise HTTPException(
-                    status_code=404, detail="Tool call not found or already processed")
+                await _notify_resolved(request.session_id, tool_call_id, request.confirmed)
 
-        return {"status": "success"}
+        return {"status": "success", "results": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
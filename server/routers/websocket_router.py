@@ -1,5 +1,9 @@
 # routers/websocket_router.py
-from services.websocket_state import sio, add_connection, remove_connection
+from services.websocket_state import sio, add_connection, remove_connection, session_room, canvas_room, NOTIFICATIONS_ROOM
+from services.message_log import message_log
+from services.backplane import backplane
+from services.tool_confirmation_manager import tool_confirmation_manager
+import json
 
 @sio.event
 async def connect(sid, environ, auth):
@@ -7,6 +11,7 @@ async def connect(sid, environ, auth):
     
     user_info = auth or {}
     add_connection(sid, user_info)
+    await sio.enter_room(sid, NOTIFICATIONS_ROOM)
     
     await sio.emit('connected', {'status': 'connected'}, room=sid)
 
@@ -18,3 +23,69 @@ async def disconnect(sid):
 @sio.event
 async def ping(sid, data):
     await sio.emit('pong', data, room=sid)
+
+async def _resync_messages(payload):
+    session_id = payload['session_id']
+    events = message_log.resync(session_id, payload['last_seq'], payload.get('epoch'))
+    # 客户端加入房间之前发出的确认请求也要补发
+    for tool_call_id in tool_confirmation_manager.get_pending_ids(session_id):
+        request = tool_confirmation_manager.get_pending_request(tool_call_id)
+        if request is not None:
+            events.append({
+                'type': 'tool_call_pending_confirmation',
+                'id': tool_call_id,
+                'name': request.tool_name,
+                'arguments': json.dumps(request.arguments),
+            })
+    for event in events:
+        await sio.emit('session_update', {
+            'canvas_id': None,
+            'session_id': session_id,
+            **event
+        }, room=payload['sid'])
+    return True
+
+backplane.register_handler('resync_messages', _resync_messages)
+
+@sio.event
+async def resync_messages(sid, data):
+    """客户端的消息序号与服务端不一致时，重放缺失的增量或发送全部消息"""
+    session_id = (data or {}).get('session_id')
+    if not session_id:
+        return
+    payload = {
+        'sid': sid,
+        'session_id': session_id,
+        'last_seq': int(data.get('last_seq') or 0),
+        'epoch': data.get('epoch'),
+    }
+    if message_log.has_session(session_id):
+        await _resync_messages(payload)
+    else:
+        # 消息日志在运行该会话的 worker 上
+        await backplane.route('session', session_id, 'resync_messages', payload)
+
+
+def _subscription_rooms(data):
+    data = data or {}
+    rooms = []
+    if data.get('session_id'):
+        rooms.append(session_room(data['session_id']))
+    if data.get('canvas_id'):
+        rooms.append(canvas_room(data['canvas_id']))
+    return rooms
+
+
+@sio.event
+async def subscribe(sid, data):
+    """加入 session / canvas 房间，之后只接收这些房间的事件"""
+    for room in _subscription_rooms(data):
+        await sio.enter_room(sid, room)
+    # ack：客户端确认已加入房间后再发起对话 / 重同步
+    return True
+
+
+@sio.event
+async def unsubscribe(sid, data):
+    for room in _subscription_rooms(data):
+        await sio.leave_room(sid, room)
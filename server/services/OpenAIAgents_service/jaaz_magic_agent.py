@@ -9,6 +9,7 @@ from tools.utils.image_utils import get_image_info_and_save
 from services.config_service import FILES_DIR
 from common import DEFAULT_PORT
 from ..jaaz_service import JaazService
+from ..generation_scheduler import generation_scheduler
 
 
 async def create_jaaz_response(messages: List[Dict[str, Any]], session_id: str = "", canvas_id: str = "") -> Dict[str, Any]:
@@ -55,7 +56,8 @@ async def create_jaaz_response(messages: List[Dict[str, Any]], session_id: str =
             }
 
         # 调用 Jaaz 服务生成魔法图像
-        result = await jaaz_service.generate_magic_image(image_content)
+        result = await generation_scheduler.run(
+            'jaaz', session_id, lambda: jaaz_service.generate_magic_image(image_content))
         if not result:
             return {
                 'role': 'assistant',
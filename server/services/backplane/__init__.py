@@ -0,0 +1,29 @@
+# services/backplane/__init__.py
+"""
+Backplane shared by server workers
+
+BACKPLANE_URL 为空时使用进程内实现（单 worker，旧行为）；
+设置为 redis://host:port/db 时，socket.io 事件、任务归属、工具确认和画布锁
+都通过 Redis（或兼容服务）在多个 worker 之间共享，`python main.py --workers N`
+才可以启动多个 worker。
+设置为 fakeredis:// 时在进程内存中模拟 Redis（需要 fakeredis），同一进程里
+创建的多个 RedisBackplane 共享数据，可以在本地模拟多个 worker，但不能用于 --workers。
+"""
+
+import os
+
+from .base import Backplane
+from .redis_backplane import LOCAL_STAND_IN_URL, RedisBackplane
+
+BACKPLANE_URL = os.getenv("BACKPLANE_URL", "")
+
+
+def create_backplane(url: str = BACKPLANE_URL) -> Backplane:
+    if not url:
+        return Backplane()
+    return RedisBackplane(url)
+
+
+backplane = create_backplane()
+
+__all__ = ['Backplane', 'RedisBackplane', 'BACKPLANE_URL', 'LOCAL_STAND_IN_URL', 'create_backplane', 'backplane']
@@ -0,0 +1,86 @@
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Optional
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class Backplane:
+    """
+    State shared between server workers.
+
+    - `socketio_manager()`: socket.io client manager, so an emit from any
+      worker reaches sockets connected to the others
+    - ownership registry: which worker runs a stream task / waits for a
+      tool confirmation (`claim`, `release`, `owner`)
+    - `route()`: run a named handler on the worker that owns a key
+    - `canvas_lock()` / canvas versions: cross-worker canvas mutations
+
+    The base class is the in-process implementation used by a single worker:
+    this worker owns everything and canvas locking is left to the local
+    CanvasLockManager.
+    """
+
+    distributed = False
+
+    def __init__(self) -> None:
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, Handler] = {}
+        self._local_calls = 0
+        self._routed_calls = 0
+        self._route_failures = 0
+
+    def socketio_manager(self) -> Any:
+        return None
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def register_handler(self, name: str, handler: Handler) -> None:
+        self._handlers[name] = handler
+
+    async def _call_local(self, name: str, payload: Dict[str, Any]) -> Any:
+        handler = self._handlers.get(name)
+        if handler is None:
+            print(f"⚠️ No backplane handler registered for {name}")
+            return None
+        self._local_calls += 1
+        return await handler(payload)
+
+    async def claim(self, kind: str, key: str) -> None:
+        pass
+
+    async def release(self, kind: str, key: str) -> None:
+        pass
+
+    async def owner(self, kind: str, key: str) -> Optional[str]:
+        return self.worker_id
+
+    async def route(self, kind: str, key: str, name: str, payload: Dict[str, Any]) -> Any:
+        """Run handler `name` on the worker owning (kind, key), None if nobody owns it"""
+        return await self._call_local(name, payload)
+
+    @asynccontextmanager
+    async def canvas_lock(self, canvas_id: str) -> AsyncGenerator[None, None]:
+        yield
+
+    async def canvas_version(self, canvas_id: str) -> int:
+        return 0
+
+    async def bump_canvas_version(self, canvas_id: str) -> int:
+        return 0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            'type': 'redis' if self.distributed else 'in_process',
+            'worker_id': self.worker_id,
+            'handlers': sorted(self._handlers),
+            'local_calls': self._local_calls,
+            'routed_calls': self._routed_calls,
+            'route_failures': self._route_failures,
+        }
+
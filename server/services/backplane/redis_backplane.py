@@ -0,0 +1,256 @@
+import asyncio
+import json
+import os
+import time
+import traceback
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Dict, Optional, Set
+
+from .base import Backplane
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:
+    # redis is only required when BACKPLANE_URL is set
+    class WatchError(Exception):  # type: ignore
+        pass
+
+BACKPLANE_PREFIX = os.getenv("BACKPLANE_PREFIX", "jaaz")
+# Time to wait for the owning worker to answer a routed call
+BACKPLANE_ROUTE_TIMEOUT = float(os.getenv("BACKPLANE_ROUTE_TIMEOUT", 5))
+# Canvas locks expire so a crashed worker can't block a canvas forever
+BACKPLANE_LOCK_TTL_MS = int(os.getenv("BACKPLANE_LOCK_TTL_MS", 30000))
+BACKPLANE_LOCK_TIMEOUT = float(os.getenv("BACKPLANE_LOCK_TIMEOUT", 30))
+
+# BACKPLANE_URL=fakeredis:// runs the Redis backplane on an in-memory stand-in,
+# shared by every RedisBackplane of the process (local development / testing)
+LOCAL_STAND_IN_URL = 'fakeredis://'
+_local_server: Any = None
+
+
+def _local_stand_in_client() -> Any:
+    global _local_server
+    try:
+        import fakeredis  # type: ignore
+    except ImportError as e:
+        raise RuntimeError(
+            f"BACKPLANE_URL is {LOCAL_STAND_IN_URL} but the fakeredis package is not installed, run `pip install fakeredis`"
+        ) from e
+    if _local_server is None:
+        _local_server = fakeredis.FakeServer()
+    return fakeredis.FakeAsyncRedis(server=_local_server, decode_responses=True)
+
+
+class RedisBackplane(Backplane):
+    """
+    Backplane on a Redis compatible server (Redis, Valkey, KeyDB, fakeredis).
+
+    - ownership: hash `{prefix}:owners:{kind}` of key -> worker id
+    - routed calls: published on the owner's channel `{prefix}:worker:{id}`,
+      the answer comes back on the caller's channel
+    - canvas lock: `SET NX PX` with a random token, released by compare-and-delete
+      (WATCH / MULTI rather than a Lua script, so stand-ins without scripting work)
+    - canvas version: `INCR {prefix}:canvas_version:{id}` after each change,
+      workers drop their cached copy when the version moved
+    """
+
+    distributed = True
+
+    def __init__(self, url: Optional[str] = None, client: Any = None) -> None:
+        super().__init__()
+        self.url = url
+        if client is None and url and url.startswith(LOCAL_STAND_IN_URL):
+            client = _local_stand_in_client()
+        if client is None:
+            try:
+                import redis.asyncio as redis_asyncio
+            except ImportError as e:
+                raise RuntimeError(
+                    "BACKPLANE_URL is set but the redis package is not installed, run `pip install redis`"
+                ) from e
+            client = redis_asyncio.from_url(url, decode_responses=True)
+        self.redis = client
+        self.channel = f"{BACKPLANE_PREFIX}:worker:{self.worker_id}"
+        self._pubsub: Any = None
+        self._listener: Optional[asyncio.Task[None]] = None
+        self._replies: Dict[str, 'asyncio.Future[Any]'] = {}
+        self._requests: Set['asyncio.Task[None]'] = set()
+        self._owned: Dict[str, set] = {}
+        self._lock_waits = 0
+        self._lock_wait_ms = 0.0
+
+    def socketio_manager(self) -> Any:
+        if not self.url or self.url.startswith(LOCAL_STAND_IN_URL):
+            # The stand-in only lives in this process, the local socket.io manager reaches everyone
+            return None
+        import socketio  # type: ignore
+        return socketio.AsyncRedisManager(self.url, channel=f"{BACKPLANE_PREFIX}:socketio")
+
+    async def start(self) -> None:
+        if self._listener is not None:
+            return
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen())
+        print(f"🛰️ Backplane worker {self.worker_id} connected")
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        # Routed calls still running here, their callers get None after the route timeout
+        for task in list(self._requests):
+            task.cancel()
+        await asyncio.gather(*self._requests, return_exceptions=True)
+        # Hand back everything this worker still owns
+        for kind, keys in list(self._owned.items()):
+            for key in list(keys):
+                await self.release(kind, key)
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self.channel)
+            await self._pubsub.aclose()
+            self._pubsub = None
+        for future in self._replies.values():
+            future.cancel()
+        self._replies.clear()
+
+    def _key(self, *parts: str) -> str:
+        return ':'.join((BACKPLANE_PREFIX, *parts))
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                data = json.loads(message['data'])
+                if data.get('reply_id'):
+                    future = self._replies.get(data['reply_id'])
+                    if future is not None and not future.done():
+                        future.set_result(data.get('result'))
+                else:
+                    task = asyncio.create_task(self._handle_request(data))
+                    self._requests.add(task)
+                    task.add_done_callback(self._requests.discard)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"🟠 Backplane listener error: {e}")
+                traceback.print_exc()
+                await asyncio.sleep(1)
+
+    async def _handle_request(self, data: Dict[str, Any]) -> None:
+        result = None
+        try:
+            result = await self._call_local(data['name'], data.get('payload') or {})
+        except Exception as e:
+            print(f"🟠 Backplane handler {data.get('name')} failed: {e}")
+            traceback.print_exc()
+        await self.redis.publish(data['reply_to'], json.dumps({
+            'reply_id': data['request_id'],
+            'result': result,
+        }))
+
+    async def _compare_and_delete(self, key: str, value: str, field: Optional[str] = None) -> None:
+        """Delete `key` (or hash `field` of it) only if it still holds `value`"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    current = await (pipe.hget(key, field) if field is not None else pipe.get(key))
+                    if current != value:
+                        await pipe.unwatch()
+                        return
+                    pipe.multi()
+                    if field is not None:
+                        pipe.hdel(key, field)
+                    else:
+                        pipe.delete(key)
+                    await pipe.execute()
+                    return
+                except WatchError:
+                    # Changed between WATCH and EXEC, check again
+                    continue
+
+    async def claim(self, kind: str, key: str) -> None:
+        await self.redis.hset(self._key('owners', kind), key, self.worker_id)
+        self._owned.setdefault(kind, set()).add(key)
+
+    async def release(self, kind: str, key: str) -> None:
+        self._owned.get(kind, set()).discard(key)
+        await self._compare_and_delete(self._key('owners', kind), self.worker_id, field=key)
+
+    async def owner(self, kind: str, key: str) -> Optional[str]:
+        return await self.redis.hget(self._key('owners', kind), key)
+
+    async def route(self, kind: str, key: str, name: str, payload: Dict[str, Any]) -> Any:
+        owner = await self.owner(kind, key)
+        if owner is None:
+            return None
+        if owner == self.worker_id:
+            return await self._call_local(name, payload)
+
+        request_id = uuid.uuid4().hex
+        future: 'asyncio.Future[Any]' = asyncio.get_running_loop().create_future()
+        self._replies[request_id] = future
+        self._routed_calls += 1
+        try:
+            receivers = await self.redis.publish(self._key('worker', owner), json.dumps({
+                'request_id': request_id,
+                'reply_to': self.channel,
+                'name': name,
+                'payload': payload,
+            }))
+            if not receivers:
+                # Owner is gone, nobody can act on the key any more
+                self._route_failures += 1
+                return None
+            return await asyncio.wait_for(future, timeout=BACKPLANE_ROUTE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._route_failures += 1
+            print(f"⚠️ Backplane call {name} to worker {owner} timed out")
+            return None
+        finally:
+            self._replies.pop(request_id, None)
+
+    @asynccontextmanager
+    async def canvas_lock(self, canvas_id: str) -> AsyncGenerator[None, None]:
+        lock_key = self._key('canvas_lock', canvas_id)
+        token = uuid.uuid4().hex
+        start = time.perf_counter()
+        delay = 0.005
+        while not await self.redis.set(lock_key, token, nx=True, px=BACKPLANE_LOCK_TTL_MS):
+            if time.perf_counter() - start > BACKPLANE_LOCK_TIMEOUT:
+                raise TimeoutError(f"Timed out waiting for the lock of canvas {canvas_id}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.05)
+        wait_ms = (time.perf_counter() - start) * 1000
+        if wait_ms > 1:
+            self._lock_waits += 1
+            self._lock_wait_ms += wait_ms
+        try:
+            yield
+        finally:
+            await self._compare_and_delete(lock_key, token)
+
+    async def canvas_version(self, canvas_id: str) -> int:
+        version = await self.redis.get(self._key('canvas_version', canvas_id))
+        return int(version or 0)
+
+    async def bump_canvas_version(self, canvas_id: str) -> int:
+        return int(await self.redis.incr(self._key('canvas_version', canvas_id)))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            **super().get_metrics(),
+            'owned': {kind: len(keys) for kind, keys in self._owned.items()},
+            'pending_replies': len(self._replies),
+            'handling_requests': len(self._requests),
+            'canvas_lock_waits': self._lock_waits,
+            'canvas_lock_wait_ms': round(self._lock_wait_ms, 3),
+        }
@@ -0,0 +1,321 @@
+# services/canvas_cache.py
+"""
+In-memory canvas document cache
+
+Generation paths (image / video / ComfyUI) used to re-read and re-parse the
+whole canvas JSON from SQLite for every element they add. Parsed canvas
+documents are now kept here in an LRU cache:
+
+- reads return the cached document, loading it from the database on a miss
+- appended elements/files are applied in memory and marked dirty
+- dirty canvases are written back as element patches after `flush_delay`
+  seconds, or immediately once `flush_threshold` elements are pending
+- each cached canvas keeps an ElementRowIndex so placing a new element
+  doesn't rescan the whole canvas
+- the cache is capped by number of canvases and total number of elements;
+  dirty entries are flushed before they are evicted
+- with several workers (distributed backplane) each entry remembers the
+  canvas version it was loaded at; `sync_version` drops stale copies and
+  `publish_change` writes changes through and bumps the shared version
+"""
+
+import asyncio
+import os
+import traceback
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.backplane import backplane
+from services.db_service import db_service
+from utils.canvas import ElementRowIndex
+
+CANVAS_CACHE_MAX_ENTRIES = int(os.getenv("CANVAS_CACHE_MAX_ENTRIES", 32))
+CANVAS_CACHE_MAX_ELEMENTS = int(os.getenv("CANVAS_CACHE_MAX_ELEMENTS", 200000))
+CANVAS_CACHE_FLUSH_DELAY = float(os.getenv("CANVAS_CACHE_FLUSH_DELAY", 1.0))
+CANVAS_CACHE_FLUSH_THRESHOLD = int(os.getenv("CANVAS_CACHE_FLUSH_THRESHOLD", 50))
+
+
+class CanvasEntry:
+    """A parsed canvas document plus the patches not yet written to disk"""
+
+    def __init__(self, name: str, data: Dict[str, Any], version: int = 0) -> None:
+        self.name = name
+        self.data = data
+        # Shared canvas version this copy is up to date with
+        self.version = version
+        data.setdefault('elements', [])
+        data.setdefault('files', {})
+        self.index_by_id: Dict[str, int] = {
+            element.get('id'): i for i, element in enumerate(data['elements'])
+        }
+        self.pending_elements: Dict[str, Dict[str, Any]] = {}
+        self.pending_files: Dict[str, Any] = {}
+        # Built on first placement, then kept up to date as elements are appended
+        self._layout: Optional[ElementRowIndex] = None
+
+    @property
+    def layout(self) -> ElementRowIndex:
+        if self._layout is None:
+            self._layout = ElementRowIndex(self.data['elements'])
+        return self._layout
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.pending_elements or self.pending_files)
+
+    @property
+    def element_count(self) -> int:
+        return len(self.data['elements'])
+
+    def apply(self, elements: List[Dict[str, Any]], files: Dict[str, Any]) -> None:
+        for element in elements:
+            element_id = element['id']
+            existing_index = self.index_by_id.get(element_id)
+            if existing_index is None:
+                self.index_by_id[element_id] = len(self.data['elements'])
+                self.data['elements'].append(element)
+                if self._layout is not None:
+                    self._layout.add(element)
+            else:
+                self.data['elements'][existing_index] = element
+                # Moved or deleted elements can't be updated in place, rebuild lazily
+                self._layout = None
+            self.pending_elements[element_id] = element
+        for file_id, file_data in files.items():
+            self.data['files'][file_id] = file_data
+            self.pending_files[file_id] = file_data
+
+
+class CanvasCache:
+    def __init__(
+        self,
+        max_entries: int = CANVAS_CACHE_MAX_ENTRIES,
+        max_elements: int = CANVAS_CACHE_MAX_ELEMENTS,
+        flush_delay: float = CANVAS_CACHE_FLUSH_DELAY,
+        flush_threshold: int = CANVAS_CACHE_FLUSH_THRESHOLD,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_elements = max_elements
+        self.flush_delay = flush_delay
+        self.flush_threshold = flush_threshold
+        self._entries: 'OrderedDict[str, CanvasEntry]' = OrderedDict()
+        self._loading: Dict[str, 'asyncio.Future[Optional[CanvasEntry]]'] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task[None]] = None
+        self._stale_reloads = 0
+
+    async def _get_entry(self, canvas_id: str) -> Optional[CanvasEntry]:
+        entry = self._entries.get(canvas_id)
+        if entry is not None:
+            self._entries.move_to_end(canvas_id)
+            return entry
+
+        # Share a single database load between concurrent misses
+        loading = self._loading.get(canvas_id)
+        if loading is not None:
+            return await loading
+
+        future: 'asyncio.Future[Optional[CanvasEntry]]' = asyncio.get_running_loop().create_future()
+        self._loading[canvas_id] = future
+        try:
+            # Read the version first, a change racing with the load only causes a reload later
+            version = await backplane.canvas_version(canvas_id)
+            document = await db_service.get_canvas_document(canvas_id)
+            entry = CanvasEntry(document['name'], document['data'], version) if document else None
+            if entry is not None:
+                self._entries[canvas_id] = entry
+                await self._evict()
+            future.set_result(entry)
+            return entry
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited future doesn't log a warning
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            self._loading.pop(canvas_id, None)
+
+    async def get(self, canvas_id: str) -> Optional[Dict[str, Any]]:
+        """Get the parsed canvas document ({'data', 'name'}), None if it doesn't exist"""
+        entry = await self._get_entry(canvas_id)
+        if entry is None:
+            return None
+        return {'data': entry.data, 'name': entry.name}
+
+    async def next_element_position(self, canvas_id: str, max_num_per_row: int = 4, spacing: int = 20) -> Tuple[float, float]:
+        """Position for the next media element, from the canvas' incremental row index"""
+        entry = await self._get_entry(canvas_id)
+        if entry is None:
+            return 0, 0
+        return entry.layout.next_position(max_num_per_row, spacing)
+
+    async def append_elements(
+        self,
+        canvas_id: str,
+        elements: List[Dict[str, Any]],
+        files: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Append or replace elements/files in memory and schedule a write-back"""
+        entry = await self._get_entry(canvas_id)
+        if entry is None:
+            # Unknown canvas, nothing cached to keep consistent
+            await db_service.patch_canvas_data(canvas_id, elements, files or {})
+            return
+        entry.apply(elements, files or {})
+        if len(entry.pending_elements) >= self.flush_threshold:
+            await self.flush(canvas_id)
+        else:
+            self._schedule_flush()
+
+    async def replace(self, canvas_id: str, data: Dict[str, Any], data_str: str, thumbnail: Optional[str] = None) -> None:
+        """Full save from the frontend, written through to the database"""
+        async with self._flush_lock:
+            await db_service.save_canvas_data(canvas_id, data_str, thumbnail)
+            entry = self._entries.get(canvas_id)
+            if entry is not None:
+                new_entry = CanvasEntry(entry.name, data, entry.version)
+                # Keep elements generated while the save was in flight. Elements the
+                # frontend already has are left as saved unless ours is newer, so a
+                # move or delete made before the debounced flush isn't undone
+                saved_elements = data['elements']
+                newer_elements = []
+                for element_id, element in entry.pending_elements.items():
+                    saved_index = new_entry.index_by_id.get(element_id)
+                    if saved_index is None or element.get('version', 0) > saved_elements[saved_index].get('version', 0):
+                        newer_elements.append(element)
+                missing_files = {
+                    file_id: file_data for file_id, file_data in entry.pending_files.items()
+                    if file_id not in data['files']
+                }
+                new_entry.apply(newer_elements, missing_files)
+                self._entries[canvas_id] = new_entry
+
+    def rename(self, canvas_id: str, name: str) -> None:
+        entry = self._entries.get(canvas_id)
+        if entry is not None:
+            entry.name = name
+
+    async def sync_version(self, canvas_id: str) -> None:
+        """Drop the cached copy if another worker changed the canvas since it was loaded"""
+        if not backplane.distributed:
+            return
+        entry = self._entries.get(canvas_id)
+        if entry is None:
+            return
+        if entry.version != await backplane.canvas_version(canvas_id) and not entry.dirty:
+            self._stale_reloads += 1
+            self._entries.pop(canvas_id, None)
+
+    async def publish_change(self, canvas_id: str) -> None:
+        """Write a change through and let the other workers know their copies are stale"""
+        if not backplane.distributed:
+            return
+        await self.flush(canvas_id)
+        version = await backplane.bump_canvas_version(canvas_id)
+        entry = self._entries.get(canvas_id)
+        if entry is not None:
+            entry.version = version
+
+    def invalidate(self, canvas_id: str) -> None:
+        """Drop a canvas from the cache, discarding unflushed changes"""
+        self._entries.pop(canvas_id, None)
+
+    async def flush(self, canvas_id: Optional[str] = None) -> None:
+        """Write pending patches of one canvas (or all canvases) to the database"""
+        async with self._flush_lock:
+            canvas_ids = [canvas_id] if canvas_id else list(self._entries.keys())
+            for cid in canvas_ids:
+                entry = self._entries.get(cid)
+                if entry is not None and entry.dirty:
+                    await self._flush_entry(cid, entry)
+
+    async def _flush_entry(self, canvas_id: str, entry: CanvasEntry) -> None:
+        elements = list(entry.pending_elements.values())
+        files = dict(entry.pending_files)
+        entry.pending_elements = {}
+        entry.pending_files = {}
+        write = asyncio.ensure_future(db_service.patch_canvas_data(canvas_id, elements, files))
+        try:
+            # Shielded so a cancelled flush (shutdown) doesn't abort the write mid-transaction
+            await asyncio.shield(write)
+        except asyncio.CancelledError:
+            # Keep the flush lock until the write has landed, then give up
+            await asyncio.wait([write])
+            self._check_write(canvas_id, entry, write, elements, files)
+            raise
+        except Exception:
+            pass
+        self._check_write(canvas_id, entry, write, elements, files)
+
+    @staticmethod
+    def _check_write(
+        canvas_id: str,
+        entry: CanvasEntry,
+        write: 'asyncio.Future[None]',
+        elements: List[Dict[str, Any]],
+        files: Dict[str, Any],
+    ) -> None:
+        error = write.exception()
+        if error is None:
+            return
+        # Keep the changes pending so the next flush retries them
+        for element in elements:
+            entry.pending_elements.setdefault(element['id'], element)
+        for file_id, file_data in files.items():
+            entry.pending_files.setdefault(file_id, file_data)
+        print(f"🟠 Error flushing canvas {canvas_id}: {error}")
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        # Elements appended while this flush runs schedule the next one
+        self._flush_task = None
+        await self.flush()
+        # Failed writes stay dirty, retry them after another delay
+        if any(entry.dirty for entry in self._entries.values()):
+            self._schedule_flush()
+
+    async def _evict(self) -> None:
+        total_elements = sum(entry.element_count for entry in self._entries.values())
+        # Never evict the most recently used entry
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or total_elements > self.max_elements
+        ):
+            canvas_id, entry = next(iter(self._entries.items()))
+            if entry.dirty:
+                async with self._flush_lock:
+                    await self._flush_entry(canvas_id, entry)
+                if entry.dirty:
+                    # Write-back failed, keep it rather than lose changes
+                    break
+            # Entry may have been touched while flushing, only drop it if still oldest
+            if next(iter(self._entries)) == canvas_id:
+                self._entries.popitem(last=False)
+                total_elements -= entry.element_count
+
+    async def close(self) -> None:
+        """Flush everything on shutdown"""
+        task, self._flush_task = self._flush_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        # Waits on the flush lock, so a write still in flight lands first
+        await self.flush()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'elements': sum(entry.element_count for entry in self._entries.values()),
+            'dirty_entries': sum(1 for entry in self._entries.values() if entry.dirty),
+            'stale_reloads': self._stale_reloads,
+        }
+
+
+canvas_cache = CanvasCache()
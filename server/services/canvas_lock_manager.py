@@ -0,0 +1,78 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Dict
+
+from services.backplane import backplane
+from services.canvas_cache import canvas_cache
+
+
+class _CanvasLock:
+    __slots__ = ('lock', 'users')
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        # Holders + waiters, the lock is dropped once nobody uses it
+        self.users = 0
+
+
+class CanvasLockManager:
+    """
+    Per-canvas lock shared by every path that mutates a canvas (image, video,
+    ComfyUI), so concurrent generations can't race on element placement.
+
+    Hold it only around the in-memory mutation (compute position + append
+    element); download, probe and store media before taking it so parallel
+    generations on one canvas don't queue behind each other's network I/O.
+    Locks of idle canvases are evicted as soon as the last user releases them.
+
+    With a distributed backplane the backplane's canvas lock is taken as well,
+    the cached canvas is refreshed if another worker changed it, and changes
+    are written through when the lock is released.
+    """
+
+    def __init__(self) -> None:
+        self._locks: Dict[str, _CanvasLock] = {}
+        self._acquisitions = 0
+        self._contended = 0
+        self._total_wait_ms = 0.0
+        self._max_wait_ms = 0.0
+
+    @asynccontextmanager
+    async def lock_canvas(self, canvas_id: str) -> AsyncGenerator[None, None]:
+        canvas_lock = self._locks.get(canvas_id)
+        if canvas_lock is None:
+            canvas_lock = self._locks[canvas_id] = _CanvasLock()
+        canvas_lock.users += 1
+        try:
+            if canvas_lock.lock.locked():
+                self._contended += 1
+            start = time.perf_counter()
+            async with canvas_lock.lock:
+                wait_ms = (time.perf_counter() - start) * 1000
+                self._acquisitions += 1
+                self._total_wait_ms += wait_ms
+                self._max_wait_ms = max(self._max_wait_ms, wait_ms)
+                async with backplane.canvas_lock(canvas_id):
+                    await canvas_cache.sync_version(canvas_id)
+                    try:
+                        yield
+                    finally:
+                        await canvas_cache.publish_change(canvas_id)
+        finally:
+            canvas_lock.users -= 1
+            if canvas_lock.users == 0 and self._locks.get(canvas_id) is canvas_lock:
+                del self._locks[canvas_id]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            'active_locks': len(self._locks),
+            'acquisitions': self._acquisitions,
+            'contended': self._contended,
+            'avg_wait_ms': round(self._total_wait_ms / self._acquisitions, 3) if self._acquisitions else 0.0,
+            'max_wait_ms': round(self._max_wait_ms, 3),
+        }
+
+
+# Global lock manager instance
+canvas_lock_manager = CanvasLockManager()
@@ -9,11 +9,25 @@ from typing import Dict, Any, List, Optional
 from models.tool_model import ToolInfoJson
 from services.db_service import db_service
 from services.langgraph_service import langgraph_multi_agent
-from services.websocket_service import send_to_websocket
 from services.stream_service import add_stream_task, remove_stream_task
+from services.message_sink import message_sink
+from services.job_scheduler import job_scheduler
 from models.config_model import ModelInfo
 
 
+async def submit_chat(data: Dict[str, Any], user: str = '') -> str:
+    """
+    Queue a chat request on the job scheduler.
+
+    Returns:
+        str: The job id, results stream over the websocket as the job runs.
+    """
+    job = await job_scheduler.submit(
+        'chat', data.get('session_id', ''), lambda: handle_chat(data),
+        user=user, priority=data.get('priority', 'normal'))
+    return job.id
+
+
 async def handle_chat(data: Dict[str, Any]) -> None:
     """
     Handle an incoming chat request.
@@ -60,7 +74,7 @@ async def handle_chat(data: Dict[str, Any]) -> None:
         messages, canvas_id, session_id, text_model, tool_list, system_prompt))
 
     # Register the task in stream_tasks (for possible cancellation)
-    add_stream_task(session_id, task)
+    await add_stream_task(session_id, task)
     try:
         # Await completion of the langgraph_agent task
         await task
@@ -69,7 +83,6 @@ async def handle_chat(data: Dict[str, Any]) -> None:
     finally:
         # Always remove the task from stream_tasks after completion/cancellation
         remove_stream_task(session_id)
-        # Notify frontend WebSocket that chat processing is done
-        await send_to_websocket(session_id, {
-            'type': 'done'
-        })
+        # Persist any messages still buffered (e.g. after cancellation)
+        # The job scheduler sends `done` once this returns
+        await message_sink.flush()
@@ -3,7 +3,7 @@ import os
 import traceback
 import aiofiles
 import toml
-from typing import Dict, TypedDict, Literal, Optional
+from typing import Awaitable, Callable, Dict, List, TypedDict, Literal, Optional
 
 # 定义配置文件的类型结构
 
@@ -75,6 +75,7 @@ IMAGE_FORMATS = (
     ".jpg",
     ".jpeg",
     ".webp",  # 基础格式
+    ".avif",
     ".bmp",
     ".tiff",
     ".tif",  # 其他常见格式
@@ -97,6 +98,8 @@ class ConfigService:
             "CONFIG_PATH", os.path.join(USER_DATA_DIR, "config.toml")
         )
         self.initialized = False
+        # 配置更新后调用（如清理缓存的模型实例）
+        self._update_listeners: List[Callable[[], Awaitable[None]]] = []
 
     def _get_jaaz_url(self) -> str:
         """Get the correct jaaz URL"""
@@ -149,6 +152,18 @@ class ConfigService:
             self.app_config['jaaz']['url'] = self._get_jaaz_url()
         return self.app_config
 
+    def add_update_listener(self, listener: Callable[[], Awaitable[None]]) -> None:
+        """注册配置更新回调"""
+        self._update_listeners.append(listener)
+
+    async def _notify_update_listeners(self) -> None:
+        for listener in self._update_listeners:
+            try:
+                await listener()
+            except Exception as e:
+                print(f"⚠️ Config update listener failed: {e}")
+                traceback.print_exc()
+
     async def update_config(self, data: AppConfig) -> Dict[str, str]:
         try:
             if 'jaaz' in data:
@@ -158,6 +173,7 @@ class ConfigService:
             with open(self.config_file, "w") as f:
                 toml.dump(data, f)
             self.app_config = data
+            await self._notify_update_listeners()
 
             return {
                 "status": "success",
@@ -0,0 +1,113 @@
+"""
+SQLite connection pool
+
+Keeps one long-lived writer connection and a small set of reader connections
+open for the lifetime of the server instead of opening a new aiosqlite
+connection (and background thread) for every query.
+
+- WAL journaling so readers never block the writer and vice versa
+- Writes are serialized through a single connection guarded by an asyncio.Lock
+- Each connection keeps its own sqlite3 statement cache, so repeated queries
+  reuse their prepared statements
+"""
+
+import asyncio
+import sqlite3
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, List, Optional
+
+import aiosqlite
+
+DEFAULT_READER_COUNT = 4
+# Prepared statements cached per connection (sqlite3 default is 128)
+STATEMENT_CACHE_SIZE = 256
+
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",  # ~20MB page cache per connection
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+]
+
+
+class SQLitePool:
+    """One writer, N readers, all opened once and reused"""
+
+    def __init__(self, db_path: str, reader_count: int = DEFAULT_READER_COUNT):
+        self.db_path = db_path
+        self.reader_count = max(1, reader_count)
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._readers: List[aiosqlite.Connection] = []
+        self._idle_readers: Optional[asyncio.Queue[aiosqlite.Connection]] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._open_lock: Optional[asyncio.Lock] = None
+        self._opened = False
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(
+            self.db_path, cached_statements=STATEMENT_CACHE_SIZE
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            await conn.execute(pragma)
+        return conn
+
+    async def open(self) -> None:
+        """Open the writer and reader connections (idempotent)"""
+        if self._opened:
+            return
+        if self._open_lock is None:
+            self._open_lock = asyncio.Lock()
+        async with self._open_lock:
+            if self._opened:
+                return
+            self._write_lock = asyncio.Lock()
+            self._idle_readers = asyncio.Queue()
+            self._writer = await self._connect()
+            for _ in range(self.reader_count):
+                reader = await self._connect()
+                self._readers.append(reader)
+                self._idle_readers.put_nowait(reader)
+            self._opened = True
+            print(f'🗄️ SQLite pool opened: 1 writer, {self.reader_count} readers')
+
+    async def close(self) -> None:
+        """Close all pooled connections"""
+        if not self._opened:
+            return
+        self._opened = False
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+        for reader in self._readers:
+            await reader.close()
+        self._readers = []
+        self._idle_readers = None
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncGenerator[aiosqlite.Connection, None]:
+        """Borrow a read-only connection"""
+        await self.open()
+        assert self._idle_readers is not None
+        conn = await self._idle_readers.get()
+        try:
+            yield conn
+        finally:
+            if self._idle_readers is not None:
+                self._idle_readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncGenerator[aiosqlite.Connection, None]:
+        """Take the writer connection; commits on success, rolls back on error"""
+        await self.open()
+        assert self._write_lock is not None
+        async with self._write_lock:
+            assert self._writer is not None
+            try:
+                yield self._writer
+                await self._writer.commit()
+            except BaseException:
+                await self._writer.rollback()
+                raise
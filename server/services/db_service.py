@@ -1,12 +1,29 @@
 import sqlite3
 import json
 import os
-from typing import List, Dict, Any, Optional
-import aiosqlite
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from .config_service import USER_DATA_DIR
 from .migrations.manager import MigrationManager, CURRENT_VERSION
+from .db_pool import SQLitePool
 
 DB_PATH = os.path.join(USER_DATA_DIR, "localmanus.db")
+DB_READER_COUNT = int(os.getenv("DB_READER_COUNT", 4))
+
+def _apply_canvas_patches(data: Dict[str, Any], element_rows: Sequence[Any], file_rows: Sequence[Any]) -> None:
+    """Overlay patched elements/files onto the base canvas document in place"""
+    elements: List[Dict[str, Any]] = data.setdefault('elements', [])
+    files: Dict[str, Any] = data.setdefault('files', {})
+    index_by_id = {element.get('id'): i for i, element in enumerate(elements)}
+    for element_row in element_rows:
+        element = json.loads(element_row['data'])
+        existing_index = index_by_id.get(element_row['element_id'])
+        if existing_index is None:
+            index_by_id[element_row['element_id']] = len(elements)
+            elements.append(element)
+        else:
+            elements[existing_index] = element
+    for file_row in file_rows:
+        files[file_row['file_id']] = json.loads(file_row['data'])
 
 class DatabaseService:
     def __init__(self):
@@ -14,6 +31,7 @@ class DatabaseService:
         self._ensure_db_directory()
         self._migration_manager = MigrationManager()
         self._init_db()
+        self._pool = SQLitePool(self.db_path, DB_READER_COUNT)
 
     def _ensure_db_directory(self):
         """Ensure the database directory exists"""
@@ -22,18 +40,21 @@ class DatabaseService:
     def _init_db(self):
         """Initialize the database with the current schema"""
         with sqlite3.connect(self.db_path) as conn:
+            # WAL is persisted in the db file, pooled connections inherit it
+            conn.execute("PRAGMA journal_mode=WAL")
+
             # Create version table if it doesn't exist
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS db_version (
                     version INTEGER PRIMARY KEY
                 )
             """)
-            
+
             # Get current version
             cursor = conn.execute("SELECT version FROM db_version")
             current_version = cursor.fetchone()
             print('local db version', current_version, 'latest version', CURRENT_VERSION)
-            
+
             if current_version is None:
                 # First time setup - start from version 0
                 conn.execute("INSERT INTO db_version (version) VALUES (0)")
@@ -43,57 +64,66 @@ class DatabaseService:
                 # Need to migrate
                 self._migration_manager.migrate(conn, current_version[0], CURRENT_VERSION)
 
+    async def initialize(self):
+        """Open pooled connections at startup instead of on the first query"""
+        await self._pool.open()
+
+    async def close(self):
+        """Close pooled connections"""
+        await self._pool.close()
+
     async def create_canvas(self, id: str, name: str):
         """Create a new canvas"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._pool.writer() as db:
             await db.execute("""
                 INSERT INTO canvases (id, name)
                 VALUES (?, ?)
             """, (id, name))
-            await db.commit()
 
     async def list_canvases(self) -> List[Dict[str, Any]]:
         """Get all canvases"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = sqlite3.Row
-            cursor = await db.execute("""
+        async with self._pool.reader() as db:
+            rows = await db.execute_fetchall("""
                 SELECT id, name, description, thumbnail, created_at, updated_at
                 FROM canvases
                 ORDER BY updated_at DESC
             """)
-            rows = await cursor.fetchall()
             return [dict(row) for row in rows]
 
     async def create_chat_session(self, id: str, model: str, provider: str, canvas_id: str, title: Optional[str] = None):
         """Save a new chat session"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._pool.writer() as db:
             await db.execute("""
                 INSERT INTO chat_sessions (id, model, provider, canvas_id, title)
                 VALUES (?, ?, ?, ?, ?)
             """, (id, model, provider, canvas_id, title))
-            await db.commit()
 
     async def create_message(self, session_id: str, role: str, message: str):
         """Save a chat message"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._pool.writer() as db:
             await db.execute("""
                 INSERT INTO chat_messages (session_id, role, message)
                 VALUES (?, ?, ?)
             """, (session_id, role, message))
-            await db.commit()
+
+    async def create_messages(self, rows: Sequence[Tuple[str, str, str]]):
+        """Save many chat messages in one transaction, rows are (session_id, role, message)"""
+        async with self._pool.writer() as db:
+            await db.executemany("""
+                INSERT INTO chat_messages (session_id, role, message)
+                VALUES (?, ?, ?)
+            """, rows)
 
     async def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
         """Get chat history for a session"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = sqlite3.Row
-            cursor = await db.execute("""
+        async with self._pool.reader() as db:
+            rows = await db.execute_fetchall("""
                 SELECT role, message, id
                 FROM chat_messages
                 WHERE session_id = ?
                 ORDER BY id ASC
             """, (session_id,))
-            rows = await cursor.fetchall()
-            
+
             messages = []
             for row in rows:
                 row_dict = dict(row)
@@ -103,103 +133,137 @@ class DatabaseService:
                         messages.append(msg)
                     except:
                         pass
-                
+
             return messages
 
     async def list_sessions(self, canvas_id: str) -> List[Dict[str, Any]]:
         """List all chat sessions"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = sqlite3.Row
+        async with self._pool.reader() as db:
             if canvas_id:
-                cursor = await db.execute("""
+                rows = await db.execute_fetchall("""
                     SELECT id, title, model, provider, created_at, updated_at
                     FROM chat_sessions
                     WHERE canvas_id = ?
                     ORDER BY updated_at DESC
                 """, (canvas_id,))
             else:
-                cursor = await db.execute("""
+                rows = await db.execute_fetchall("""
                     SELECT id, title, model, provider, created_at, updated_at
                     FROM chat_sessions
                     ORDER BY updated_at DESC
                 """)
-            rows = await cursor.fetchall()
             return [dict(row) for row in rows]
 
     async def save_canvas_data(self, id: str, data: str, thumbnail: str = None):
-        """Save canvas data"""
-        async with aiosqlite.connect(self.db_path) as db:
+        """Save the full canvas document, folding in any pending element patches"""
+        async with self._pool.writer() as db:
             await db.execute("""
-                UPDATE canvases 
+                UPDATE canvases
                 SET data = ?, thumbnail = ?, updated_at = STRFTIME('%Y-%m-%dT%H:%M:%fZ', 'now')
                 WHERE id = ?
             """, (data, thumbnail, id))
-            await db.commit()
+            await db.execute("DELETE FROM canvas_elements WHERE canvas_id = ?", (id,))
+            await db.execute("DELETE FROM canvas_files WHERE canvas_id = ?", (id,))
+
+    async def patch_canvas_data(self, id: str, elements: Optional[List[Dict[str, Any]]] = None, files: Optional[Dict[str, Any]] = None):
+        """Append or replace canvas elements (by element id) and files without rewriting the whole document"""
+        async with self._pool.writer() as db:
+            if elements:
+                await db.executemany("""
+                    INSERT INTO canvas_elements (canvas_id, element_id, data)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(canvas_id, element_id) DO UPDATE SET
+                        data = excluded.data,
+                        updated_at = STRFTIME('%Y-%m-%dT%H:%M:%fZ', 'now')
+                """, [(id, element['id'], json.dumps(element)) for element in elements])
+            if files:
+                await db.executemany("""
+                    INSERT OR REPLACE INTO canvas_files (canvas_id, file_id, data)
+                    VALUES (?, ?, ?)
+                """, [(id, file_id, json.dumps(file_data)) for file_id, file_data in files.items()])
+            await db.execute("""
+                UPDATE canvases
+                SET updated_at = STRFTIME('%Y-%m-%dT%H:%M:%fZ', 'now')
+                WHERE id = ?
+            """, (id,))
 
     async def get_canvas_data(self, id: str) -> Optional[Dict[str, Any]]:
         """Get canvas data"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = sqlite3.Row
-            cursor = await db.execute("""
+        document = await self.get_canvas_document(id)
+        if document is None:
+            return None
+        document['sessions'] = await self.list_sessions(id)
+        return document
+
+    async def get_canvas_document(self, id: str) -> Optional[Dict[str, Any]]:
+        """Get canvas data and name, without the session list"""
+        async with self._pool.reader() as db:
+            rows = await db.execute_fetchall("""
                 SELECT data, name
                 FROM canvases
                 WHERE id = ?
             """, (id,))
-            row = await cursor.fetchone()
-
-            sessions = await self.list_sessions(id)
-            
-            if row:
-                return {
-                    'data': json.loads(row['data']) if row['data'] else {},
-                    'name': row['name'],
-                    'sessions': sessions
-                }
-            return None
+            row = rows[0] if rows else None
+            if row is None:
+                return None
+            element_rows = await db.execute_fetchall("""
+                SELECT element_id, data
+                FROM canvas_elements
+                WHERE canvas_id = ?
+                ORDER BY id ASC
+            """, (id,))
+            file_rows = await db.execute_fetchall("""
+                SELECT file_id, data
+                FROM canvas_files
+                WHERE canvas_id = ?
+            """, (id,))
+
+        data = json.loads(row['data']) if row['data'] else {}
+        if element_rows or file_rows:
+            _apply_canvas_patches(data, element_rows, file_rows)
+        return {
+            'data': data,
+            'name': row['name'],
+        }
 
     async def delete_canvas(self, id: str):
         """Delete canvas and related data"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._pool.writer() as db:
+            await db.execute("DELETE FROM canvas_elements WHERE canvas_id = ?", (id,))
+            await db.execute("DELETE FROM canvas_files WHERE canvas_id = ?", (id,))
             await db.execute("DELETE FROM canvases WHERE id = ?", (id,))
-            await db.commit()
 
     async def rename_canvas(self, id: str, name: str):
         """Rename canvas"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._pool.writer() as db:
             await db.execute("UPDATE canvases SET name = ? WHERE id = ?", (name, id))
-            await db.commit()
 
     async def create_comfy_workflow(self, name: str, api_json: str, description: str, inputs: str, outputs: str = None):
         """Create a new comfy workflow"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._pool.writer() as db:
             await db.execute("""
                 INSERT INTO comfy_workflows (name, api_json, description, inputs, outputs)
                 VALUES (?, ?, ?, ?, ?)
             """, (name, api_json, description, inputs, outputs))
-            await db.commit()
 
     async def list_comfy_workflows(self) -> List[Dict[str, Any]]:
         """List all comfy workflows"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = sqlite3.Row
-            cursor = await db.execute("SELECT id, name, description, api_json, inputs, outputs FROM comfy_workflows ORDER BY id DESC")
-            rows = await cursor.fetchall()
+        async with self._pool.reader() as db:
+            rows = await db.execute_fetchall("SELECT id, name, description, api_json, inputs, outputs FROM comfy_workflows ORDER BY id DESC")
             return [dict(row) for row in rows]
 
     async def delete_comfy_workflow(self, id: int):
         """Delete a comfy workflow"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._pool.writer() as db:
             await db.execute("DELETE FROM comfy_workflows WHERE id = ?", (id,))
-            await db.commit()
 
     async def get_comfy_workflow(self, id: int):
         """Get comfy workflow dict"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = sqlite3.Row
-            cursor = await db.execute(
+        async with self._pool.reader() as db:
+            rows = await db.execute_fetchall(
                 "SELECT api_json FROM comfy_workflows WHERE id = ?", (id,)
             )
-            row = await cursor.fetchone()
+            row = rows[0] if rows else None
         try:
             workflow_json = (
                 row["api_json"]
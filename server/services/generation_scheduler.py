@@ -0,0 +1,292 @@
+# services/generation_scheduler.py
+"""
+Provider-aware scheduler for image / video generation
+
+Every generation tool call used to hit its provider directly, so an agent
+fanning out several tool calls (or several chats at once) ran into provider
+rate limits. Provider calls now go through a lane per provider:
+
+- at most `concurrency` generations in flight per provider, and
+  GENERATION_MAX_CONCURRENCY across all providers
+- a token bucket of `rate_per_minute` starts (burst `burst`) per provider
+- waiting calls are served round-robin across sessions, so one session
+  fanning out ten images doesn't starve the others
+- a submit request answered with HTTP 429 (RateLimitedError, or an OpenAI
+  client error with status 429) pauses the whole lane with exponential
+  backoff (or the provider's Retry-After) and the call is retried up to
+  GENERATION_RATE_LIMIT_RETRIES times. Only the submit is retried: a remote
+  task that was accepted and failed later is never submitted again, since
+  that would start (and bill) a new task
+
+Limits per provider can be overridden with GENERATION_PROVIDER_LIMITS, a JSON
+object like '{"volces": {"concurrency": 1, "rate_per_minute": 10}}'.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+T = TypeVar('T')
+
+GENERATION_MAX_CONCURRENCY = int(os.getenv("GENERATION_MAX_CONCURRENCY", 12))
+GENERATION_RATE_LIMIT_RETRIES = int(os.getenv("GENERATION_RATE_LIMIT_RETRIES", 3))
+GENERATION_BACKOFF_BASE = float(os.getenv("GENERATION_BACKOFF_BASE", 2.0))
+GENERATION_BACKOFF_MAX = float(os.getenv("GENERATION_BACKOFF_MAX", 60.0))
+
+# rate_per_minute = 0 disables the token bucket
+DEFAULT_PROVIDER_LIMITS: Dict[str, Dict[str, float]] = {
+    'jaaz': {'concurrency': 4, 'rate_per_minute': 60, 'burst': 4},
+    'openai': {'concurrency': 2, 'rate_per_minute': 20, 'burst': 2},
+    'replicate': {'concurrency': 4, 'rate_per_minute': 60, 'burst': 4},
+    'volces': {'concurrency': 2, 'rate_per_minute': 30, 'burst': 2},
+    'wavespeed': {'concurrency': 4, 'rate_per_minute': 60, 'burst': 4},
+    'comfyui': {'concurrency': 1, 'rate_per_minute': 0, 'burst': 1},
+    'default': {'concurrency': 4, 'rate_per_minute': 60, 'burst': 4},
+}
+
+
+def _load_provider_limits() -> Dict[str, Dict[str, float]]:
+    limits = {provider: dict(values) for provider, values in DEFAULT_PROVIDER_LIMITS.items()}
+    overrides = os.getenv("GENERATION_PROVIDER_LIMITS", "")
+    if overrides:
+        try:
+            for provider, values in json.loads(overrides).items():
+                limits.setdefault(provider, dict(limits['default'])).update(values)
+        except (ValueError, AttributeError) as e:
+            print(f"⚠️ Invalid GENERATION_PROVIDER_LIMITS, using defaults: {e}")
+    return limits
+
+
+class RateLimitedError(Exception):
+    """A provider answered a submit request with HTTP 429, nothing was started"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(headers: Any) -> Optional[float]:
+    if not headers:
+        return None
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def raise_if_rate_limited(response: Any, what: str) -> None:
+    """Raise RateLimitedError if a submit request (aiohttp / httpx response) got HTTP 429"""
+    status = getattr(response, 'status', None) or getattr(response, 'status_code', None)
+    if status == 429:
+        raise RateLimitedError(f"{what}: HTTP 429 Too Many Requests",
+                               _parse_retry_after(getattr(response, 'headers', None)))
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether a provider error is a 429 answer to the submit request"""
+    # openai.RateLimitError carries status_code, raised by the (submit) API call itself
+    return isinstance(error, RateLimitedError) or getattr(error, 'status_code', None) == 429
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Retry-After seconds from a rate limited submit, if the provider sent one"""
+    if isinstance(error, RateLimitedError):
+        return error.retry_after
+    return _parse_retry_after(getattr(getattr(error, 'response', None), 'headers', None))
+
+
+class _ProviderLane:
+    def __init__(self, name: str, concurrency: float, rate_per_minute: float, burst: float) -> None:
+        self.name = name
+        self.concurrency = max(1, int(concurrency))
+        self.rate = rate_per_minute / 60
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.refilled_at = time.monotonic()
+        self.backoff_until = 0.0
+        self.active = 0
+        # session id -> waiters, sessions served round-robin
+        self.queues: Dict[str, Deque['asyncio.Future[None]']] = {}
+        self.order: Deque[str] = deque()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+        # metrics
+        self.acquired = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def refill(self, now: float) -> None:
+        if self.rate <= 0:
+            self.tokens = self.burst
+        else:
+            self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def next_ready_in(self, now: float) -> float:
+        """Seconds until the lane may start another call (0 if it can now)"""
+        delay = max(0.0, self.backoff_until - now)
+        if self.tokens < 1 and self.rate > 0:
+            delay = max(delay, (1 - self.tokens) / self.rate)
+        return delay
+
+    def pop_next_waiter(self) -> Optional['asyncio.Future[None]']:
+        while self.order:
+            session_id = self.order.popleft()
+            queue = self.queues.get(session_id)
+            while queue and queue[0].done():
+                queue.popleft()
+            if not queue:
+                self.queues.pop(session_id, None)
+                continue
+            waiter = queue.popleft()
+            if queue:
+                # Back of the line, other sessions go first
+                self.order.append(session_id)
+            else:
+                del self.queues[session_id]
+            return waiter
+        return None
+
+
+class GenerationScheduler:
+    def __init__(self, max_concurrency: int = GENERATION_MAX_CONCURRENCY) -> None:
+        self.max_concurrency = max_concurrency
+        self.limits = _load_provider_limits()
+        self._lanes: Dict[str, _ProviderLane] = {}
+        self._active = 0
+
+    def _lane(self, provider: str) -> _ProviderLane:
+        lane = self._lanes.get(provider)
+        if lane is None:
+            limits = self.limits.get(provider, self.limits['default'])
+            lane = self._lanes[provider] = _ProviderLane(
+                provider, limits.get('concurrency', 4), limits.get('rate_per_minute', 0), limits.get('burst', 1))
+        return lane
+
+    def _pump(self) -> None:
+        """Start as many waiting calls as limits allow, oldest lanes first"""
+        for lane in self._lanes.values():
+            self._pump_lane(lane)
+
+    def _pump_lane(self, lane: _ProviderLane) -> None:
+        now = time.monotonic()
+        lane.refill(now)
+        while lane.order and lane.active < lane.concurrency and self._active < self.max_concurrency:
+            delay = lane.next_ready_in(now)
+            if delay > 0:
+                # Wake up once the backoff ends / the next token is available
+                if lane.timer is None:
+                    lane.timer = asyncio.get_running_loop().call_later(delay, self._on_timer, lane)
+                return
+            waiter = lane.pop_next_waiter()
+            if waiter is None:
+                return
+            if lane.rate > 0:
+                lane.tokens -= 1
+            lane.active += 1
+            self._active += 1
+            waiter.set_result(None)
+
+    def _on_timer(self, lane: _ProviderLane) -> None:
+        lane.timer = None
+        self._pump_lane(lane)
+
+    @asynccontextmanager
+    async def slot(self, provider: str, session_id: str = '') -> AsyncGenerator[None, None]:
+        """Hold a generation slot of `provider` for the duration of the block"""
+        lane = self._lane(provider)
+        waiter: 'asyncio.Future[None]' = asyncio.get_running_loop().create_future()
+        queue = lane.queues.get(session_id)
+        if queue is None:
+            queue = lane.queues[session_id] = deque()
+            lane.order.append(session_id)
+        queue.append(waiter)
+        start = time.perf_counter()
+        self._pump_lane(lane)
+        try:
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # Granted and cancelled at the same time, give the slot back
+                self._release(lane)
+            else:
+                waiter.cancel()
+            raise
+        wait_ms = (time.perf_counter() - start) * 1000
+        lane.acquired += 1
+        lane.total_wait_ms += wait_ms
+        lane.max_wait_ms = max(lane.max_wait_ms, wait_ms)
+        try:
+            yield
+        finally:
+            self._release(lane)
+
+    def _release(self, lane: _ProviderLane) -> None:
+        lane.active -= 1
+        self._active -= 1
+        self._pump()
+
+    def _back_off(self, lane: _ProviderLane, attempt: int, retry_after: Optional[float]) -> float:
+        delay = retry_after if retry_after is not None else min(
+            GENERATION_BACKOFF_MAX, GENERATION_BACKOFF_BASE * (2 ** attempt))
+        # Jitter so retries of parallel calls don't arrive together
+        delay *= 1 + random.random() * 0.2
+        lane.backoff_until = max(lane.backoff_until, time.monotonic() + delay)
+        return delay
+
+    async def run(self, provider: str, session_id: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Run a provider call in a slot, retrying with backoff when rate limited"""
+        lane = self._lane(provider)
+        attempt = 0
+        while True:
+            async with self.slot(provider, session_id):
+                try:
+                    return await func()
+                except Exception as e:
+                    if not is_rate_limited(e):
+                        raise
+                    lane.rate_limited += 1
+                    if attempt >= GENERATION_RATE_LIMIT_RETRIES:
+                        raise
+                    delay = self._back_off(lane, attempt, _retry_after(e))
+                    print(f"⏳ {provider} rate limited, backing off {delay:.1f}s (retry {attempt + 1}/{GENERATION_RATE_LIMIT_RETRIES})")
+            attempt += 1
+            lane.retries += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            'active': self._active,
+            'max_concurrency': self.max_concurrency,
+            'providers': {
+                name: {
+                    'active': lane.active,
+                    'waiting': lane.waiting,
+                    'waiting_sessions': len(lane.queues),
+                    'concurrency': lane.concurrency,
+                    'rate_per_minute': lane.rate * 60,
+                    'tokens': round(min(lane.burst, lane.tokens + (now - lane.refilled_at) * lane.rate), 2) if lane.rate > 0 else lane.burst,
+                    'backoff_remaining_s': round(max(0.0, lane.backoff_until - now), 2),
+                    'acquired': lane.acquired,
+                    'rate_limited': lane.rate_limited,
+                    'retries': lane.retries,
+                    'avg_wait_ms': round(lane.total_wait_ms / lane.acquired, 3) if lane.acquired else 0.0,
+                    'max_wait_ms': round(lane.max_wait_ms, 3),
+                }
+                for name, lane in self._lanes.items()
+            },
+        }
+
+
+generation_scheduler = GenerationScheduler()
@@ -1,10 +1,11 @@
 # services/OpenAIAgents_service/jaaz_service.py
 
-import asyncio
 import aiohttp
 from typing import Dict, Any, Optional, List
 from utils.http_client import HttpClient
 from services.config_service import config_service
+from services.task_poller import task_poller
+from services.generation_scheduler import raise_if_rate_limited
 
 
 class JaazService:
@@ -129,6 +130,7 @@ class JaazService:
                 json=payload,
                 timeout=aiohttp.ClientTimeout(total=120.0)
             ) as response:
+                raise_if_rate_limited(response, 'Jaaz video task')
                 if response.status == 200:
                     data = await response.json()
                     task_id = data.get('task_id', '')
@@ -144,16 +146,16 @@ class JaazService:
     async def poll_for_task_completion(
         self,
         task_id: str,
-        max_attempts: Optional[int] = None,
-        interval: Optional[float] = None
+        kind: str = 'jaaz_video',
+        timeout: float = 300.0
     ) -> Dict[str, Any]:
         """
-        等待任务完成并返回结果
+        等待任务完成并返回结果（由共享的 task_poller 按任务类型自适应轮询）
 
         Args:
             task_id: 任务 ID
-            max_attempts: 最大轮询次数
-            interval: 轮询间隔（秒）
+            kind: 任务类型，决定预期耗时和轮询间隔，如 'jaaz_video:kling-v2'
+            timeout: 最长等待时间（秒）
 
         Returns:
             Dict[str, Any]: 任务结果
@@ -161,43 +163,37 @@ class JaazService:
         Raises:
             Exception: 当任务失败或超时时抛出异常
         """
-        max_attempts = max_attempts or 150  # 默认最多轮询 150 次
-        interval = interval or 2.0  # 默认轮询间隔 2 秒
-
-        async with HttpClient.create_aiohttp() as session:
-            for _ in range(max_attempts):
+        async def check() -> Optional[Dict[str, Any]]:
+            async with HttpClient.create_aiohttp() as session:
                 async with session.get(
                     f"{self.api_url}/task/{task_id}",
                     headers=self._build_headers(),
                     timeout=aiohttp.ClientTimeout(total=20.0)
                 ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get('success') and data.get('data', {}).get('found'):
-                            task = data['data']['task']
-                            status = task.get('status')
-
-                            if status == 'succeeded':
-                                print(
-                                    f"✅ Task {task_id} completed successfully")
-                                return task
-                            elif status == 'failed':
-                                error_msg = task.get('error', 'Unknown error')
-                                raise Exception(f"Task failed: {error_msg}")
-                            elif status == 'cancelled':
-                                raise Exception("Task was cancelled")
-                            elif status == 'processing':
-                                # 继续轮询
-                                await asyncio.sleep(interval)
-                                continue
-                            else:
-                                raise Exception(f"Unknown task status: {status}")
-                        else:
-                            raise Exception("Task not found")
-                    else:
+                    if response.status != 200:
                         raise Exception(f"Failed to get task status: HTTP {response.status}")
+                    data = await response.json()
 
-            raise Exception(f"Task polling timeout after {max_attempts} attempts")
+            if not (data.get('success') and data.get('data', {}).get('found')):
+                raise Exception("Task not found")
+
+            task = data['data']['task']
+            status = task.get('status')
+            if status == 'succeeded':
+                print(f"✅ Task {task_id} completed successfully")
+                return task
+            elif status == 'failed':
+                error_msg = task.get('error', 'Unknown error')
+                raise Exception(f"Task failed: {error_msg}")
+            elif status == 'cancelled':
+                raise Exception("Task was cancelled")
+            elif status == 'processing':
+                # 继续轮询
+                return None
+            else:
+                raise Exception(f"Unknown task status: {status}")
+
+        return await task_poller.wait(f"jaaz:{task_id}", check, kind=kind, timeout=timeout)
 
     async def generate_magic_image(self, image_content: str) -> Optional[Dict[str, Any]]:
         """
@@ -217,7 +213,7 @@ class JaazService:
                 return {"error": "Failed to create magic task"}
 
             # 2. 等待任务完成
-            result = await self.poll_for_task_completion(task_id, max_attempts=120, interval=5.0) # 10 分钟
+            result = await self.poll_for_task_completion(task_id, kind='jaaz_magic', timeout=600.0) # 10 分钟
             if not result:
                 print("❌ Magic generation failed")
                 return {"error": "Magic generation failed"}
@@ -279,7 +275,7 @@ class JaazService:
             raise Exception("Failed to create video task")
 
         # 2. 等待任务完成
-        result = await self.poll_for_task_completion(task_id)
+        result = await self.poll_for_task_completion(task_id, kind=f'jaaz_video:{model}')
         if not result:
             raise Exception("Video generation failed")
 
@@ -341,6 +337,7 @@ class JaazService:
                 json=payload,
                 timeout=aiohttp.ClientTimeout(total=120.0)
             ) as response:
+                raise_if_rate_limited(response, 'Jaaz video task')
                 if response.status == 200:
                     data = await response.json()
                     task_id = data.get('task_id', '')
@@ -353,7 +350,7 @@ class JaazService:
         print(f"✅ Seedance video task created: {task_id}")
 
         # 2. 等待任务完成
-        result = await self.poll_for_task_completion(task_id)
+        result = await self.poll_for_task_completion(task_id, kind=f'jaaz_video:{model}')
         if not result:
             raise Exception("Seedance video generation failed")
 
@@ -400,6 +397,7 @@ class JaazService:
                 json=payload,
                 timeout=aiohttp.ClientTimeout(total=60.0)
             ) as response:
+                raise_if_rate_limited(response, 'Jaaz Midjourney task')
                 if response.status == 200:
                     data = await response.json()
                     task_id = data.get('task_id', '')
@@ -443,7 +441,7 @@ class JaazService:
             raise Exception("Failed to create Midjourney task")
 
         # 2. 等待任务完成
-        task_result = await self.poll_for_task_completion(task_id, max_attempts=150, interval=2.0)
+        task_result = await self.poll_for_task_completion(task_id, kind=f'jaaz_midjourney:{model}')
         print(f"🎨 Midjourney task result: {task_result}")
         if not task_result:
             raise Exception("Midjourney image generation failed")
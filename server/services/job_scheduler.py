@@ -0,0 +1,320 @@
+# services/job_scheduler.py
+"""
+In-process job scheduler for agent runs
+
+`/api/chat` and `/api/magic` used to hold the HTTP request open for the whole
+agent run, and `/api/canvas/create` started an untracked task. They now
+submit a job and return its id at once; results still stream over the
+websocket and the run ends with the usual `done` event.
+
+- at most JOB_MAX_CONCURRENCY jobs run at a time and one per session (later
+  messages of a session wait for the current run). Requests carrying an
+  `x-user-id` header are also limited to JOB_MAX_PER_USER running jobs per
+  user; the local desktop user is only bound by the global limit
+- waiting jobs start by priority (high / normal / low), then submit order
+- status is kept for the last JOB_HISTORY_SIZE finished jobs
+- cancelling a queued job drops it, cancelling a running job cancels its task;
+  jobs of a session owned by another worker are cancelled through the backplane
+- each job is claimed on the backplane while it is in the history, so status
+  lookups and cancels reaching another worker are routed to the job's worker
+- the scheduler sends the session's `done` event once the job has ended,
+  whatever the outcome; the job handlers don't send it themselves
+"""
+
+import asyncio
+import os
+import time
+import traceback
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from nanoid import generate
+from starlette.requests import Request
+
+from services.backplane import backplane
+from services.stream_service import cancel_stream_task, drop_session, hold_session
+from services.websocket_service import send_to_websocket
+
+JOB_MAX_CONCURRENCY = int(os.getenv("JOB_MAX_CONCURRENCY", 8))
+JOB_MAX_PER_USER = int(os.getenv("JOB_MAX_PER_USER", 4))
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", 200))
+
+JOB_PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+
+def get_job_user(request: Request) -> str:
+    """Key used for the per-user concurrency limit, '' (no per-user limit) without x-user-id"""
+    return request.headers.get('x-user-id', '')
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    session_id: str
+    user: str
+    priority: int
+    seq: int
+    run: Callable[[], Awaitable[None]] = field(repr=False)
+    status: str = 'queued'  # queued / running / done / failed / cancelled
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_requested: bool = False
+    task: Optional['asyncio.Task[None]'] = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'session_id': self.session_id,
+            'status': self.status,
+            'priority': next((name for name, value in JOB_PRIORITIES.items() if value == self.priority), self.priority),
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobScheduler:
+    def __init__(
+        self,
+        max_concurrency: int = JOB_MAX_CONCURRENCY,
+        max_per_user: int = JOB_MAX_PER_USER,
+        history_size: int = JOB_HISTORY_SIZE,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+        self.history_size = history_size
+        self._queued: List[Job] = []
+        self._running: Dict[str, Job] = {}
+        self._finished: 'OrderedDict[str, Job]' = OrderedDict()
+        self._seq = 0
+        self._releases: Set['asyncio.Task[None]'] = set()
+
+        # metrics
+        self._submitted = 0
+        self._started = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._total_wait_ms = 0.0
+        self._max_wait_ms = 0.0
+        self._max_queued = 0
+
+    async def submit(
+        self,
+        kind: str,
+        session_id: str,
+        run: Callable[[], Awaitable[None]],
+        user: str = '',
+        priority: str = 'normal',
+    ) -> Job:
+        """Queue a job, it starts as soon as the concurrency limits allow"""
+        self._seq += 1
+        job = Job(
+            id=generate(size=12),
+            kind=kind,
+            session_id=session_id,
+            user=user,
+            priority=JOB_PRIORITIES.get(priority, JOB_PRIORITIES['normal']),
+            seq=self._seq,
+            run=run,
+        )
+        # Cancel requests and status lookups reaching another worker are routed here
+        if session_id:
+            await hold_session(session_id, job.id)
+        await backplane.claim('job', job.id)
+        self._queued.append(job)
+        self._queued.sort(key=lambda queued: (queued.priority, queued.seq))
+        self._submitted += 1
+        self._max_queued = max(self._max_queued, len(self._queued))
+        self._dispatch()
+        return job
+
+    def _can_start(self, job: Job) -> bool:
+        if len(self._running) >= self.max_concurrency:
+            return False
+        running = list(self._running.values())
+        if job.user and sum(1 for other in running if other.user == job.user) >= self.max_per_user:
+            return False
+        return not (job.session_id and any(other.session_id == job.session_id for other in running))
+
+    def _dispatch(self) -> None:
+        for job in list(self._queued):
+            if len(self._running) >= self.max_concurrency:
+                break
+            if not self._can_start(job):
+                continue
+            self._queued.remove(job)
+            self._running[job.id] = job
+            job.status = 'running'
+            job.started_at = time.time()
+            self._started += 1
+            wait_ms = (job.started_at - job.created_at) * 1000
+            self._total_wait_ms += wait_ms
+            self._max_wait_ms = max(self._max_wait_ms, wait_ms)
+            job.task = asyncio.create_task(self._run(job))
+            job.task.add_done_callback(lambda _, job=job: self._on_task_done(job))
+
+    async def _run(self, job: Job) -> None:
+        try:
+            await job.run()
+            job.status = 'cancelled' if job.cancel_requested else 'done'
+        except asyncio.CancelledError:
+            job.status = 'cancelled'
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            print(f"🟠 Job {job.id} ({job.kind}) failed: {e}")
+            traceback.print_exc()
+        finally:
+            # The only place a started job reports `done`, before the next job of the session starts
+            try:
+                await asyncio.shield(self._notify_done(job))
+            finally:
+                self._finish(job)
+                self._dispatch()
+
+    def _on_task_done(self, job: Job) -> None:
+        if job.id not in self._running:
+            return
+        # Task cancelled before it started, _run never got to clean up
+        job.status = 'cancelled'
+        self._finish(job)
+        self._dispatch()
+        if job.session_id:
+            asyncio.create_task(self._notify_done(job))
+
+    def _finish(self, job: Job) -> None:
+        job.finished_at = time.time()
+        self._running.pop(job.id, None)
+        if job.session_id:
+            drop_session(job.session_id, job.id)
+        if job.status == 'done':
+            self._completed += 1
+        elif job.status == 'failed':
+            self._failed += 1
+        else:
+            self._cancelled += 1
+        self._finished[job.id] = job
+        while len(self._finished) > self.history_size:
+            evicted_id, _ = self._finished.popitem(last=False)
+            # Status is gone, stop routing lookups to this worker
+            task = asyncio.create_task(backplane.release('job', evicted_id))
+            self._releases.add(task)
+            task.add_done_callback(self._releases.discard)
+
+    @staticmethod
+    async def _notify_done(job: Job) -> None:
+        if job.session_id:
+            await send_to_websocket(job.session_id, {'type': 'done'})
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        job = self._running.get(job_id) or self._finished.get(job_id)
+        if job is None:
+            job = next((queued for queued in self._queued if queued.id == job_id), None)
+        return job
+
+    async def lookup(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status of a job, on whichever worker runs it"""
+        job = self.get_job(job_id)
+        if job is not None:
+            return job.to_dict()
+        if backplane.distributed:
+            return await backplane.route('job', job_id, 'get_job', {'job_id': job_id})
+        return None
+
+    async def _lookup_local(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        job = self.get_job(payload['job_id'])
+        return job.to_dict() if job is not None else None
+
+    def list_jobs(self, session_id: Optional[str] = None) -> List[Job]:
+        jobs = [*self._queued, *self._running.values(), *reversed(self._finished.values())]
+        if session_id:
+            jobs = [job for job in jobs if job.session_id == session_id]
+        return jobs
+
+    async def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job, False if it is unknown or already finished"""
+        job = self.get_job(job_id)
+        if job is None or job.status not in ('queued', 'running'):
+            return False
+        if job.status == 'queued':
+            self._queued.remove(job)
+            job.status = 'cancelled'
+            self._finish(job)
+            await self._notify_done(job)
+            return True
+        job.cancel_requested = True
+        if job.task is not None:
+            job.task.cancel()
+        return True
+
+    async def cancel_job(self, job_id: str) -> bool:
+        """Cancel a job on whichever worker runs it"""
+        if self.get_job(job_id) is not None:
+            return await self.cancel(job_id)
+        if backplane.distributed:
+            return bool(await backplane.route('job', job_id, 'cancel_job', {'job_id': job_id}))
+        return False
+
+    async def _cancel_local(self, payload: Dict[str, Any]) -> bool:
+        return await self.cancel(payload['job_id'])
+
+    async def cancel_session(self, session_id: str) -> bool:
+        """Cancel every job of a session, on whichever worker runs it"""
+        if any(job.session_id == session_id for job in [*self._queued, *self._running.values()]):
+            return await self._cancel_session_local({'session_id': session_id})
+        if backplane.distributed and await backplane.owner('session', session_id) != backplane.worker_id:
+            return bool(await backplane.route('session', session_id, 'cancel_session_jobs', {'session_id': session_id}))
+        # Runs started outside the scheduler
+        return await cancel_stream_task(session_id)
+
+    async def _cancel_session_local(self, payload: Dict[str, Any]) -> bool:
+        session_id = payload['session_id']
+        jobs = [job for job in [*self._queued, *self._running.values()] if job.session_id == session_id]
+        if not jobs:
+            return await cancel_stream_task(session_id)
+        results = [await self.cancel(job.id) for job in jobs]
+        return any(results)
+
+    async def stop(self) -> None:
+        """Cancel everything on shutdown"""
+        for job in list(self._queued):
+            self._queued.remove(job)
+            job.status = 'cancelled'
+            self._finish(job)
+        tasks = [job.task for job in self._running.values() if job.task is not None]
+        for job in self._running.values():
+            job.cancel_requested = True
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if self._releases:
+            await asyncio.gather(*self._releases, return_exceptions=True)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            'queued': len(self._queued),
+            'running': len(self._running),
+            'max_queued': self._max_queued,
+            'max_concurrency': self.max_concurrency,
+            'max_per_user': self.max_per_user,
+            'submitted': self._submitted,
+            'completed': self._completed,
+            'failed': self._failed,
+            'cancelled': self._cancelled,
+            'avg_wait_ms': round(self._total_wait_ms / self._started, 3) if self._started else 0.0,
+            'max_wait_ms': round(self._max_wait_ms, 3),
+        }
+
+
+job_scheduler = JobScheduler()
+backplane.register_handler('cancel_session_jobs', job_scheduler._cancel_session_local)
+backplane.register_handler('get_job', job_scheduler._lookup_local)
+backplane.register_handler('cancel_job', job_scheduler._cancel_local)
@@ -1,34 +1,37 @@
 # type: ignore[import]
+import time
 import traceback
 from typing import Optional, List, Dict, Any, Callable, Awaitable
 from langchain_core.messages import AIMessageChunk, ToolCall, convert_to_openai_messages, ToolMessage
-from langgraph.graph import StateGraph
+from langgraph.graph.state import CompiledStateGraph
+from services.message_log import message_log
 import json
 
 
 class StreamProcessor:
     """流式处理器 - 负责处理智能体的流式输出"""
 
-    def __init__(self, session_id: str, db_service: Any, websocket_service: Callable[[str, Dict[str, Any]], Awaitable[None]]):
+    def __init__(self, session_id: str, message_sink: Any, websocket_service: Callable[[str, Dict[str, Any]], Awaitable[None]], started_at: Optional[float] = None):
         self.session_id = session_id
-        self.db_service = db_service
+        self.message_sink = message_sink
         self.websocket_service = websocket_service
         self.tool_calls: List[ToolCall] = []
         self.last_saved_message_index = 0
         self.last_streaming_tool_call_id: Optional[str] = None
+        # 请求开始时间（time.perf_counter），用于统计首 token 耗时
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.first_token_ms: Optional[float] = None
 
-    async def process_stream(self, swarm: StateGraph, messages: List[Dict[str, Any]], context: Dict[str, Any]) -> None:
+    async def process_stream(self, compiled_swarm: CompiledStateGraph, messages: List[Dict[str, Any]], context: Dict[str, Any]) -> None:
         """处理整个流式响应
 
         Args:
-            swarm: 智能体群组
+            compiled_swarm: 编译好的智能体群组
             messages: 消息列表
             context: 上下文信息
         """
         self.last_saved_message_index = len(messages) - 1
 
-        compiled_swarm = swarm.compile()
-
         async for chunk in compiled_swarm.astream(
             {"messages": messages},
             config=context,
@@ -36,16 +39,18 @@ class StreamProcessor:
         ):
             await self._handle_chunk(chunk)
 
-        # 发送完成事件
-        await self.websocket_service(self.session_id, {
-            'type': 'done'
-        })
+        # 完成前把缓冲的消息落盘（完成事件由任务调度器在任务结束后发送）
+        await self.message_sink.flush()
 
     async def _handle_chunk(self, chunk: Any) -> None:
         # print('👇chunk', chunk)
         """处理单个chunk"""
         chunk_type = chunk[0]
 
+        if chunk_type == 'messages' and self.first_token_ms is None:
+            self.first_token_ms = (time.perf_counter() - self.started_at) * 1000
+            print(f"⏱️ Time to first token: {self.first_token_ms:.1f}ms")
+
         if chunk_type == 'values':
             await self._handle_values_chunk(chunk[1])
         else:
@@ -59,17 +64,16 @@ class StreamProcessor:
         if not isinstance(oai_messages, list):
             oai_messages = [oai_messages] if oai_messages else []
 
-        # 发送所有消息到前端
-        await self.websocket_service(self.session_id, {
-            'type': 'all_messages',
-            'messages': oai_messages
-        })
+        # 只发送变化的消息（messages_delta），MESSAGE_SYNC_MODE=all 时发送全部消息
+        sync_event = message_log.update(self.session_id, oai_messages)
+        if sync_event is not None:
+            await self.websocket_service(self.session_id, sync_event)
 
-        # 保存新消息到数据库
+        # 保存新消息到数据库（写入缓冲队列，由后台批量落盘）
         for i in range(self.last_saved_message_index + 1, len(oai_messages)):
             new_message = oai_messages[i]
             if len(oai_messages) > 0:  # 确保有消息才保存
-                await self.db_service.create_message(
+                self.message_sink.enqueue(
                     self.session_id,
                     new_message.get('role', 'user'),
                     json.dumps(new_message)
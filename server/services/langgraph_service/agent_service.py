@@ -1,14 +1,13 @@
 from models.tool_model import ToolInfoJson
-from services.db_service import db_service
+from services.message_sink import message_sink
 from .StreamProcessor import StreamProcessor
 from .agent_manager import AgentManager
+from .model_cache import text_model_cache
+from .swarm_cache import swarm_cache
+import time
 import traceback
-from utils.http_client import HttpClient
 from langgraph_swarm import create_swarm  # type: ignore
-from langchain_openai import ChatOpenAI
-from langchain_ollama import ChatOllama
 from services.websocket_service import send_to_websocket  # type: ignore
-from services.config_service import config_service
 from typing import Optional, List, Dict, Any, cast, Set, TypedDict
 from models.config_model import ModelInfo
 
@@ -93,80 +92,62 @@ async def langgraph_multi_agent(
         tool_list: 工具模型配置列表（图像或视频模型）
         system_prompt: 系统提示词
     """
+    started_at = time.perf_counter()
     try:
         # 0. 修复消息历史
         fixed_messages = _fix_chat_history(messages)
 
-        # 2. 文本模型
-        text_model_instance = _create_text_model(text_model)
-
-        # 3. 创建智能体
-        agents = AgentManager.create_agents(
-            text_model_instance,
-            tool_list,  # 传入所有注册的工具
-            system_prompt or ""
-        )
-        agent_names = [agent.name for agent in agents]
-        print('👇agent_names', agent_names)
-        last_agent = AgentManager.get_last_active_agent(
-            fixed_messages, agent_names)
-
-        print('👇last_agent', last_agent)
-
-        # 4. 创建智能体群组
-        swarm = create_swarm(
-            agents=agents,  # type: ignore
-            default_active_agent=last_agent if last_agent else agent_names[0]
-        )
-
-        # 5. 创建上下文
-        context = {
-            'canvas_id': canvas_id,
-            'session_id': session_id,
-            'tool_list': tool_list,
-        }
-
-        # 6. 流处理
-        processor = StreamProcessor(
-            session_id, db_service, send_to_websocket)  # type: ignore
-        await processor.process_stream(swarm, fixed_messages, context)
+        # 2. 文本模型（跨轮次复用缓存的模型实例）
+        async with text_model_cache.use(text_model) as text_model_instance:
+            # 3. 获取最后活跃的智能体
+            agent_names = AgentManager.AGENT_NAMES
+            last_agent = AgentManager.get_last_active_agent(
+                fixed_messages, agent_names)
+
+            print('👇last_agent', last_agent)
+            default_active_agent = last_agent if last_agent else agent_names[0]
+
+            def build_swarm() -> Any:
+                # 4. 创建智能体及智能体群组并编译
+                agents = AgentManager.create_agents(
+                    text_model_instance,
+                    tool_list,  # 传入所有注册的工具
+                    system_prompt or ""
+                )
+                print('👇agent_names', [agent.name for agent in agents])
+                swarm = create_swarm(
+                    agents=agents,  # type: ignore
+                    default_active_agent=default_active_agent
+                )
+                return swarm.compile()
+
+            # 相同模型、工具和提示词的编译结果跨消息复用
+            compiled_swarm, cache_hit = swarm_cache.get_or_build(
+                text_model,
+                text_model_instance,
+                tool_list,
+                system_prompt or "",
+                default_active_agent,
+                build_swarm,
+            )
+
+            # 5. 创建上下文
+            context = {
+                'canvas_id': canvas_id,
+                'session_id': session_id,
+                'tool_list': tool_list,
+            }
+
+            # 6. 流处理
+            processor = StreamProcessor(
+                session_id, message_sink, send_to_websocket, started_at)  # type: ignore
+            await processor.process_stream(compiled_swarm, fixed_messages, context)
+            swarm_cache.record_first_token(processor.first_token_ms, cache_hit)
 
     except Exception as e:
         await _handle_error(e, session_id)
 
 
-def _create_text_model(text_model: ModelInfo) -> Any:
-    """创建语言模型实例"""
-    model = text_model.get('model')
-    provider = text_model.get('provider')
-    url = text_model.get('url')
-    api_key = config_service.app_config.get(  # type: ignore
-        provider, {}).get("api_key", "")
-
-    # TODO: Verify if max token is working
-    # max_tokens = text_model.get('max_tokens', 8148)
-
-    if provider == 'ollama':
-        return ChatOllama(
-            model=model,
-            base_url=url,
-        )
-    else:
-        # Create httpx client with SSL configuration for ChatOpenAI
-        http_client = HttpClient.create_sync_client()
-        http_async_client = HttpClient.create_async_client()
-        return ChatOpenAI(
-            model=model,
-            api_key=api_key,  # type: ignore
-            timeout=300,
-            base_url=url,
-            temperature=0,
-            # max_tokens=max_tokens, # TODO: 暂时注释掉有问题的参数
-            http_client=http_client,
-            http_async_client=http_async_client
-        )
-
-
 async def _handle_error(error: Exception, session_id: str) -> None:
     """处理错误"""
     print('Error in langgraph_agent', error)
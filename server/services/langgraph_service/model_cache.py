@@ -0,0 +1,151 @@
+"""
+Text model instance cache
+
+ChatOpenAI / ChatOllama instances (and the HTTP clients they own) are kept
+across chat turns instead of being rebuilt for every message:
+
+- keyed by (provider, model, url, sha256 of the api key)
+- `config_service.update_config` retires every cached model
+- a retired model's HTTP clients are closed once the last chat using it
+  finishes, so in-flight streams are never cut off
+"""
+
+import hashlib
+import traceback
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+import httpx
+from langchain_ollama import ChatOllama
+from langchain_openai import ChatOpenAI
+
+from models.config_model import ModelInfo
+from services.config_service import config_service
+from utils.http_client import HttpClient
+
+ModelKey = Tuple[str, str, str, str]
+
+
+class _CachedModel:
+    __slots__ = ('model', 'http_client', 'http_async_client', 'users', 'retired')
+
+    def __init__(
+        self,
+        model: Any,
+        http_client: Optional[httpx.Client] = None,
+        http_async_client: Optional[httpx.AsyncClient] = None,
+    ) -> None:
+        self.model = model
+        self.http_client = http_client
+        self.http_async_client = http_async_client
+        self.users = 0
+        self.retired = False
+
+    async def close(self) -> None:
+        try:
+            if self.http_client is not None:
+                self.http_client.close()
+            if self.http_async_client is not None:
+                await self.http_async_client.aclose()
+        except Exception as e:
+            print(f"⚠️ Error closing model HTTP clients: {e}")
+            traceback.print_exc()
+
+
+class TextModelCache:
+    def __init__(self) -> None:
+        self._models: Dict[ModelKey, _CachedModel] = {}
+        # Retired models still used by a running chat
+        self._retired: List[_CachedModel] = []
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def model_key(text_model: ModelInfo) -> ModelKey:
+        provider = text_model.get('provider') or ''
+        api_key = config_service.app_config.get(  # type: ignore
+            provider, {}).get("api_key", "")
+        api_key_hash = hashlib.sha256((api_key or '').encode()).hexdigest()
+        return (provider, text_model.get('model') or '', text_model.get('url') or '', api_key_hash)
+
+    @staticmethod
+    def _create(text_model: ModelInfo) -> _CachedModel:
+        """创建语言模型实例"""
+        model = text_model.get('model')
+        provider = text_model.get('provider')
+        url = text_model.get('url')
+        api_key = config_service.app_config.get(  # type: ignore
+            provider, {}).get("api_key", "")
+
+        # TODO: Verify if max token is working
+        # max_tokens = text_model.get('max_tokens', 8148)
+
+        if provider == 'ollama':
+            return _CachedModel(ChatOllama(
+                model=model,
+                base_url=url,
+            ))
+
+        # Create httpx client with SSL configuration for ChatOpenAI
+        http_client = HttpClient.create_sync_client()
+        http_async_client = HttpClient.create_async_client()
+        return _CachedModel(
+            ChatOpenAI(
+                model=model,
+                api_key=api_key,  # type: ignore
+                timeout=300,
+                base_url=url,
+                temperature=0,
+                # max_tokens=max_tokens, # TODO: 暂时注释掉有问题的参数
+                http_client=http_client,
+                http_async_client=http_async_client
+            ),
+            http_client,
+            http_async_client,
+        )
+
+    @asynccontextmanager
+    async def use(self, text_model: ModelInfo) -> AsyncGenerator[Any, None]:
+        """Borrow the cached model instance for the duration of a chat turn"""
+        key = self.model_key(text_model)
+        entry = self._models.get(key)
+        if entry is None:
+            self._misses += 1
+            entry = self._models[key] = self._create(text_model)
+        else:
+            self._hits += 1
+
+        entry.users += 1
+        try:
+            yield entry.model
+        finally:
+            entry.users -= 1
+            if entry.retired and entry.users == 0:
+                self._retired.remove(entry)
+                await entry.close()
+
+    async def invalidate(self) -> None:
+        """Retire every cached model, closing the ones not in use"""
+        models = list(self._models.values())
+        self._models.clear()
+        for entry in models:
+            entry.retired = True
+            if entry.users == 0:
+                await entry.close()
+            else:
+                self._retired.append(entry)
+
+    async def close(self) -> None:
+        await self.invalidate()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            'models': len(self._models),
+            'retired_in_use': len(self._retired),
+            'hits': self._hits,
+            'misses': self._misses,
+        }
+
+
+text_model_cache = TextModelCache()
+config_service.add_update_listener(text_model_cache.invalidate)
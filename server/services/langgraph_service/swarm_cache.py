@@ -0,0 +1,134 @@
+"""
+Compiled agent swarm cache
+
+Building the planner / creator react agents, `create_swarm` and
+`compile()` used to run on every chat message. Compiled swarms hold no
+per-run state (there is no checkpointer), so one instance is reused by all
+chats with the same setup:
+
+- keyed by (text model key, tool list, system prompt, default active agent)
+- a cached swarm is only reused with the exact model instance it was built
+  with, so models retired by `text_model_cache` are never kept alive here
+- at most SWARM_CACHE_MAX_ENTRIES swarms, least recently used evicted first
+- cleared when ToolService registrations change or the config is updated
+- build time and time-to-first-token are recorded per cache hit / miss
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from models.config_model import ModelInfo
+from models.tool_model import ToolInfoJson
+from services.config_service import config_service
+from services.tool_service import tool_service
+from .model_cache import ModelKey, text_model_cache
+
+SwarmKey = Tuple[ModelKey, str, str, str]
+
+SWARM_CACHE_MAX_ENTRIES = int(os.getenv("SWARM_CACHE_MAX_ENTRIES", 16))
+
+
+class _TimingStats:
+    __slots__ = ('count', 'total_ms', 'max_ms')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 2),
+        }
+
+
+class SwarmCache:
+    def __init__(self, max_entries: int = SWARM_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        # key -> (model instance, compiled swarm), least recently used first
+        self._swarms: 'OrderedDict[SwarmKey, Tuple[Any, Any]]' = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._build_ms = _TimingStats()
+        self._first_token_ms = {'hit': _TimingStats(), 'miss': _TimingStats()}
+
+    @staticmethod
+    def _tool_list_hash(tool_list: List[ToolInfoJson]) -> str:
+        # Agent prompts are built from the whole tool entries, not only their ids
+        tools_json = json.dumps(sorted(tool_list, key=lambda tool: tool.get('id', '')), sort_keys=True, default=str)
+        return hashlib.sha256(tools_json.encode()).hexdigest()
+
+    def get_or_build(
+        self,
+        text_model: ModelInfo,
+        model: Any,
+        tool_list: List[ToolInfoJson],
+        system_prompt: str,
+        default_active_agent: str,
+        build: Callable[[], Any],
+    ) -> Tuple[Any, bool]:
+        """Return (compiled swarm, cache hit), calling `build` on a miss"""
+        key: SwarmKey = (
+            text_model_cache.model_key(text_model),
+            self._tool_list_hash(tool_list),
+            hashlib.sha256(system_prompt.encode()).hexdigest(),
+            default_active_agent,
+        )
+        cached = self._swarms.get(key)
+        if cached is not None and cached[0] is model:
+            self._hits += 1
+            self._swarms.move_to_end(key)
+            return cached[1], True
+
+        self._misses += 1
+        start = time.perf_counter()
+        compiled_swarm = build()
+        build_ms = (time.perf_counter() - start) * 1000
+        self._build_ms.record(build_ms)
+        print(f"🐝 Built agent swarm in {build_ms:.1f}ms")
+        self._swarms[key] = (model, compiled_swarm)
+        self._swarms.move_to_end(key)
+        while len(self._swarms) > self.max_entries:
+            self._swarms.popitem(last=False)
+            self._evictions += 1
+        return compiled_swarm, False
+
+    def record_first_token(self, first_token_ms: Optional[float], cache_hit: bool) -> None:
+        if first_token_ms is not None:
+            self._first_token_ms['hit' if cache_hit else 'miss'].record(first_token_ms)
+
+    def clear(self) -> None:
+        """Drop every cached swarm (ToolService change listener)"""
+        self._swarms.clear()
+
+    async def invalidate(self) -> None:
+        """Drop every cached swarm (config update listener)"""
+        self.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            'swarms': len(self._swarms),
+            'max_entries': self.max_entries,
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+            'build_ms': self._build_ms.to_dict(),
+            'first_token_ms': {name: stats.to_dict() for name, stats in self._first_token_ms.items()},
+        }
+
+
+swarm_cache = SwarmCache()
+tool_service.add_change_listener(swarm_cache.clear)
+config_service.add_update_listener(swarm_cache.invalidate)
@@ -10,6 +10,20 @@ from services.db_service import db_service
 from services.OpenAIAgents_service import create_jaaz_response
 from services.websocket_service import send_to_websocket  # type: ignore
 from services.stream_service import add_stream_task, remove_stream_task
+from services.job_scheduler import job_scheduler
+
+
+async def submit_magic(data: Dict[str, Any], user: str = '') -> str:
+    """
+    Queue a magic generation request on the job scheduler.
+
+    Returns:
+        str: The job id, results stream over the websocket as the job runs.
+    """
+    job = await job_scheduler.submit(
+        'magic', data.get('session_id', ''), lambda: handle_magic(data),
+        user=user, priority=data.get('priority', 'normal'))
+    return job.id
 
 
 async def handle_magic(data: Dict[str, Any]) -> None:
@@ -57,7 +71,7 @@ async def handle_magic(data: Dict[str, Any]) -> None:
     task = asyncio.create_task(_process_magic_generation(messages, session_id, canvas_id))
 
     # Register the task in stream_tasks (for possible cancellation)
-    add_stream_task(session_id, task)
+    await add_stream_task(session_id, task)
     try:
         # Await completion of the magic generation task
         await task
@@ -65,9 +79,8 @@ async def handle_magic(data: Dict[str, Any]) -> None:
         print(f"🛑Magic generation session {session_id} cancelled")
     finally:
         # Always remove the task from stream_tasks after completion/cancellation
+        # The job scheduler sends `done` once this returns
         remove_stream_task(session_id)
-        # Notify frontend WebSocket that magic generation is done
-        await send_to_websocket(session_id, {'type': 'done'})
 
     print('✨ magic_service 处理完成')
 
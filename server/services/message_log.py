@@ -0,0 +1,153 @@
+# services/message_log.py
+"""
+Versioned chat message log for websocket sync
+
+StreamProcessor used to send the whole conversation as an `all_messages`
+event after every graph step. The message log keeps the last list sent for
+each session and emits only what changed:
+
+    {'type': 'messages_delta', 'epoch': 'a1b2c3d4', 'seq': 8, 'base_seq': 7, 'start': 12, 'messages': [...]}
+
+The client keeps messages[:start] and replaces the rest with `messages`,
+provided its last applied seq equals `base_seq` in the same epoch. Otherwise
+it asks for a resync with its last seen epoch and seq (socket event
+`resync_messages`), which replays the buffered deltas or falls back to a full
+`all_messages` event (now carrying `epoch` and `seq`).
+
+Every session log gets a random epoch when it is created, so seqs of a log
+recreated after a restart, an LRU eviction or a turn on another worker are
+never mistaken for the ones the client already holds.
+
+MESSAGE_SYNC_MODE=all restores the old behaviour of sending every update
+as `all_messages`.
+"""
+
+import os
+import secrets
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+MESSAGE_SYNC_MODE = os.getenv("MESSAGE_SYNC_MODE", "delta")
+MESSAGE_LOG_MAX_SESSIONS = int(os.getenv("MESSAGE_LOG_MAX_SESSIONS", 64))
+MESSAGE_LOG_MAX_DELTAS = int(os.getenv("MESSAGE_LOG_MAX_DELTAS", 64))
+
+
+class _SessionLog:
+    __slots__ = ('epoch', 'seq', 'messages', 'deltas')
+
+    def __init__(self, max_deltas: int) -> None:
+        self.epoch = secrets.token_hex(4)
+        self.seq = 0
+        self.messages: List[Dict[str, Any]] = []
+        self.deltas: Deque[Dict[str, Any]] = deque(maxlen=max_deltas)
+
+
+class MessageLog:
+    def __init__(
+        self,
+        mode: str = MESSAGE_SYNC_MODE,
+        max_sessions: int = MESSAGE_LOG_MAX_SESSIONS,
+        max_deltas: int = MESSAGE_LOG_MAX_DELTAS,
+    ) -> None:
+        self.mode = mode
+        self.max_sessions = max_sessions
+        self.max_deltas = max_deltas
+        self._sessions: 'OrderedDict[str, _SessionLog]' = OrderedDict()
+        # Called with the session id of every evicted log
+        self.on_evict: Optional[Callable[[str], None]] = None
+        self._updates = 0
+        self._messages_sent = 0
+        self._messages_total = 0
+        self._resyncs = 0
+        self._full_resyncs = 0
+
+    def _get_log(self, session_id: str) -> _SessionLog:
+        log = self._sessions.get(session_id)
+        if log is None:
+            log = self._sessions[session_id] = _SessionLog(self.max_deltas)
+            while len(self._sessions) > self.max_sessions:
+                evicted_id, _ = self._sessions.popitem(last=False)
+                if self.on_evict is not None:
+                    self.on_evict(evicted_id)
+        else:
+            self._sessions.move_to_end(session_id)
+        return log
+
+    @staticmethod
+    def _all_messages_event(log: _SessionLog) -> Dict[str, Any]:
+        return {
+            'type': 'all_messages',
+            'epoch': log.epoch,
+            'seq': log.seq,
+            'messages': log.messages,
+        }
+
+    def update(self, session_id: str, messages: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Record the current message list, returns the event to send (None if unchanged)"""
+        log = self._get_log(session_id)
+
+        # Length of the unchanged prefix
+        start = 0
+        limit = min(len(log.messages), len(messages))
+        while start < limit and log.messages[start] == messages[start]:
+            start += 1
+        if start == len(messages) == len(log.messages) and log.seq > 0:
+            return None
+
+        base_seq = log.seq
+        log.seq += 1
+        log.messages = list(messages)
+        self._updates += 1
+        self._messages_total += len(messages)
+
+        if self.mode == 'all':
+            self._messages_sent += len(messages)
+            return self._all_messages_event(log)
+
+        delta = {
+            'type': 'messages_delta',
+            'epoch': log.epoch,
+            'seq': log.seq,
+            'base_seq': base_seq,
+            'start': start,
+            'messages': messages[start:],
+        }
+        log.deltas.append(delta)
+        self._messages_sent += len(messages) - start
+        return delta
+
+    def has_session(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def resync(self, session_id: str, last_seq: int, epoch: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Events that bring a client at `epoch` / `last_seq` up to date"""
+        self._resyncs += 1
+        log = self._sessions.get(session_id)
+        if log is None or log.seq == 0:
+            return []
+
+        if epoch == log.epoch and last_seq == log.seq:
+            return []
+        if epoch == log.epoch and 0 <= last_seq < log.seq:
+            deltas = [delta for delta in log.deltas if delta['seq'] > last_seq]
+            if deltas and deltas[0]['base_seq'] == last_seq:
+                return deltas
+
+        # Deltas no longer buffered, or seqs of another log (restart / eviction / worker), send everything
+        self._full_resyncs += 1
+        return [self._all_messages_event(log)]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'sessions': len(self._sessions),
+            'updates': self._updates,
+            'messages_sent': self._messages_sent,
+            # What all_messages would have sent for the same updates
+            'messages_total': self._messages_total,
+            'resyncs': self._resyncs,
+            'full_resyncs': self._full_resyncs,
+        }
+
+
+message_log = MessageLog()
@@ -0,0 +1,176 @@
+# services/message_sink.py
+"""
+Write-behind sink for chat message persistence
+
+StreamProcessor used to await one INSERT + commit per new message right in the
+middle of the token stream. Messages are now buffered here and written by a
+background task as a single multi-row transaction (executemany) every
+`flush_interval` seconds, or sooner once `max_batch` rows are pending.
+
+Call `flush()` whenever the persisted history must be complete (stream done,
+cancelled, history read) and `stop()` on shutdown.
+
+A batch that fails is retried with the next flush, up to MESSAGE_SINK_MAX_RETRIES
+times. After that its rows are written one at a time and rows that still fail
+are logged and dropped, so one bad row can't block every later message.
+"""
+
+import asyncio
+import os
+import time
+import traceback
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.db_service import db_service
+
+MessageRow = Tuple[str, str, str]  # (session_id, role, message)
+
+MESSAGE_SINK_MAX_RETRIES = int(os.getenv("MESSAGE_SINK_MAX_RETRIES", 3))
+
+
+class MessageSink:
+    def __init__(self, flush_interval: float = 0.2, max_batch: int = 100,
+                 max_retries: int = MESSAGE_SINK_MAX_RETRIES) -> None:
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self._buffer: List[MessageRow] = []
+        # Failed batch writes in a row, reset by the next successful write
+        self._failed_attempts = 0
+        self._task: Optional[asyncio.Task[None]] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+        # metrics
+        self._flush_count = 0
+        self._flushed_rows = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+        self._max_queue_depth = 0
+        self._failed_flushes = 0
+        self._dropped_rows = 0
+
+    def start(self) -> None:
+        """Start the background flush loop (idempotent)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> int:
+        """Stop the flush loop and write everything still pending, returns the number of rows lost"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        dropped_before = self._dropped_rows
+        # Failed batches are retried, then written row by row, so this ends with an empty buffer
+        for _ in range(self.max_retries + 1):
+            if not self._buffer:
+                break
+            await self.flush()
+        lost = self._dropped_rows - dropped_before + len(self._buffer)
+        if lost:
+            print(f"🔴 Message sink stopped with {lost} chat messages not saved")
+        return lost
+
+    def enqueue(self, session_id: str, role: str, message: str) -> None:
+        """Queue a message for persistence without waiting for disk I/O"""
+        self.start()
+        self._buffer.append((session_id, role, message))
+        self._max_queue_depth = max(self._max_queue_depth, len(self._buffer))
+        if len(self._buffer) >= self.max_batch and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Write all pending messages in one transaction"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            start = time.perf_counter()
+            write = asyncio.ensure_future(db_service.create_messages(batch))
+            try:
+                # Shielded so stop() cancelling the flush loop doesn't drop the batch mid-write
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                # Keep the lock until the write has landed so batches stay in order
+                await asyncio.wait([write])
+                self._check_write(batch, write, start)
+                raise
+            except Exception:
+                pass
+            if not self._check_write(batch, write, start):
+                rows = asyncio.ensure_future(self._write_rows(batch))
+                try:
+                    await asyncio.shield(rows)
+                except asyncio.CancelledError:
+                    await asyncio.wait([rows])
+                    raise
+
+    def _check_write(self, batch: List[MessageRow], write: 'asyncio.Future[None]', start: float) -> bool:
+        """Record a batch write, False if the batch failed too often and must be written row by row"""
+        error = write.exception()
+        if error is not None:
+            self._failed_flushes += 1
+            self._failed_attempts += 1
+            print(f"🟠 Error flushing {len(batch)} chat messages (attempt {self._failed_attempts}): {error}")
+            traceback.print_exception(type(error), error, error.__traceback__)
+            if self._failed_attempts > self.max_retries:
+                self._failed_attempts = 0
+                return False
+            # Put the batch back in front so ordering is kept for the retry
+            self._buffer = batch + self._buffer
+            return True
+        self._failed_attempts = 0
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._flush_count += 1
+        self._flushed_rows += len(batch)
+        self._last_flush_ms = elapsed_ms
+        self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+        return True
+
+    async def _write_rows(self, batch: List[MessageRow]) -> None:
+        """Write a batch that keeps failing one row at a time, dropping the rows that fail"""
+        for row in batch:
+            try:
+                await db_service.create_message(*row)
+                self._flushed_rows += 1
+            except Exception as e:
+                self._dropped_rows += 1
+                session_id, role, message = row
+                print(f"🔴 Dropping chat message of session {session_id} ({role}), it can't be saved: {e!r} {message[:200]!r}")
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            'queue_depth': len(self._buffer),
+            'max_queue_depth': self._max_queue_depth,
+            'flush_count': self._flush_count,
+            'flushed_rows': self._flushed_rows,
+            'last_flush_ms': round(self._last_flush_ms, 3),
+            'max_flush_ms': round(self._max_flush_ms, 3),
+            'avg_flush_ms': round(self._total_flush_ms / self._flush_count, 3) if self._flush_count else 0.0,
+            'failed_flushes': self._failed_flushes,
+            'dropped_rows': self._dropped_rows,
+        }
+
+
+message_sink = MessageSink()
@@ -0,0 +1,42 @@
+from . import Migration
+import sqlite3
+
+
+class V4AddCanvasElements(Migration):
+    version = 4
+    description = "Add canvas elements and files"
+
+    def up(self, conn: sqlite3.Connection) -> None:
+        # Elements appended/patched since the last full canvas save.
+        # canvases.data stays the base document, rows here are overlaid on read.
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS canvas_elements (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                canvas_id TEXT NOT NULL,
+                element_id TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at TEXT DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%fZ', 'now')),
+                updated_at TEXT DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%fZ', 'now')),
+                UNIQUE (canvas_id, element_id),
+                FOREIGN KEY (canvas_id) REFERENCES canvases(id)
+            )
+        """)
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS canvas_files (
+                canvas_id TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at TEXT DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%fZ', 'now')),
+                PRIMARY KEY (canvas_id, file_id),
+                FOREIGN KEY (canvas_id) REFERENCES canvases(id)
+            )
+        """)
+
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_canvas_elements_canvas_id_id ON canvas_elements(canvas_id, id)
+        """)
+
+    def down(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DROP TABLE IF EXISTS canvas_files")
+        conn.execute("DROP TABLE IF EXISTS canvas_elements")
@@ -0,0 +1,183 @@
+# services/model_discovery_service.py
+"""
+Cached discovery of locally hosted models (Ollama, ComfyUI)
+
+`/api/list_models` used to query Ollama with a blocking `requests.get`
+(5s timeout) on every call, freezing the whole server while Ollama was
+down. Model lists are now fetched asynchronously and cached per host:
+
+- fresh for MODEL_DISCOVERY_TTL seconds
+- after that, and up to MODEL_DISCOVERY_MAX_STALE seconds, the cached list
+  is returned immediately and refreshed in the background
+  (stale-while-revalidate)
+- a failed refresh keeps serving the last good list (until it is older than
+  MODEL_DISCOVERY_MAX_STALE) and is retried after MODEL_DISCOVERY_NEGATIVE_TTL
+- unreachable hosts without a usable list are remembered for
+  MODEL_DISCOVERY_NEGATIVE_TTL seconds and answered with an empty list
+  without contacting them
+- concurrent requests for one host share a single fetch
+- config updates drop the cache so a fixed URL is picked up at once
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from services.config_service import config_service
+from utils.http_client import HttpClient
+
+MODEL_DISCOVERY_TTL = float(os.getenv("MODEL_DISCOVERY_TTL", 30))
+MODEL_DISCOVERY_MAX_STALE = float(os.getenv("MODEL_DISCOVERY_MAX_STALE", 600))
+MODEL_DISCOVERY_NEGATIVE_TTL = float(os.getenv("MODEL_DISCOVERY_NEGATIVE_TTL", 15))
+MODEL_DISCOVERY_TIMEOUT = float(os.getenv("MODEL_DISCOVERY_TIMEOUT", 3))
+COMFYUI_DISCOVERY_TIMEOUT = float(os.getenv("COMFYUI_DISCOVERY_TIMEOUT", 10))
+
+DiscoveryKey = Tuple[str, str]  # (kind, base url)
+Fetcher = Callable[[str], Awaitable[List[str]]]
+
+
+class _DiscoveryEntry:
+    __slots__ = ('models', 'fetched_at', 'ok', 'error', 'failed_at')
+
+    def __init__(self, models: List[str], ok: bool, error: Optional[str] = None) -> None:
+        self.models = models
+        self.fetched_at = time.monotonic()
+        self.ok = ok
+        self.error = error
+        # Last failed refresh of an ok entry, retried after the negative TTL
+        self.failed_at: Optional[float] = None
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+
+async def _fetch_ollama_models(base_url: str) -> List[str]:
+    client = HttpClient.get_shared_client()
+    response = await client.get(f'{base_url}/api/tags', timeout=MODEL_DISCOVERY_TIMEOUT)
+    response.raise_for_status()
+    data = response.json()
+    return [model['name'] for model in data.get('models', [])]
+
+
+async def _fetch_comfyui_models(base_url: str) -> List[str]:
+    """Get ComfyUI model list from object_info API"""
+    client = HttpClient.get_shared_client()
+    response = await client.get(f"{base_url}/api/object_info", timeout=httpx.Timeout(COMFYUI_DISCOVERY_TIMEOUT))
+    if response.status_code != 200:
+        raise Exception(f"ComfyUI server returned status {response.status_code}")
+    data = response.json()
+    # Extract models from CheckpointLoaderSimple node
+    models = data.get('CheckpointLoaderSimple', {}).get(
+        'input', {}).get('required', {}).get('ckpt_name', [[]])[0]
+    return models if isinstance(models, list) else []  # type: ignore
+
+
+class ModelDiscoveryService:
+    def __init__(
+        self,
+        ttl: float = MODEL_DISCOVERY_TTL,
+        max_stale: float = MODEL_DISCOVERY_MAX_STALE,
+        negative_ttl: float = MODEL_DISCOVERY_NEGATIVE_TTL,
+    ) -> None:
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.negative_ttl = negative_ttl
+        self._entries: Dict[DiscoveryKey, _DiscoveryEntry] = {}
+        self._inflight: Dict[DiscoveryKey, 'asyncio.Task[_DiscoveryEntry]'] = {}
+        self._hits = 0
+        self._stale_hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._fetches = 0
+        self._errors = 0
+        self._stale_errors = 0
+        self._total_fetch_ms = 0.0
+
+    async def get_ollama_models(self, base_url: str) -> List[str]:
+        return await self._get(('ollama', base_url), _fetch_ollama_models)
+
+    async def get_comfyui_models(self, base_url: str) -> List[str]:
+        return await self._get(('comfyui', base_url), _fetch_comfyui_models)
+
+    async def _get(self, key: DiscoveryKey, fetcher: Fetcher) -> List[str]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.ok and entry.age < self.ttl:
+                self._hits += 1
+                return entry.models
+            if entry.ok and entry.age < self.max_stale:
+                # Serve the stale list now, refresh for the next caller
+                self._stale_hits += 1
+                if entry.failed_at is None or time.monotonic() - entry.failed_at >= self.negative_ttl:
+                    self._refresh(key, fetcher)
+                return entry.models
+            if not entry.ok and entry.age < self.negative_ttl:
+                self._negative_hits += 1
+                return entry.models
+
+        self._misses += 1
+        # Shielded so a disconnecting client doesn't cancel the shared fetch
+        entry = await asyncio.shield(self._refresh(key, fetcher))
+        return entry.models
+
+    def _refresh(self, key: DiscoveryKey, fetcher: Fetcher) -> 'asyncio.Task[_DiscoveryEntry]':
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(self._fetch(key, fetcher))
+        return task
+
+    async def _fetch(self, key: DiscoveryKey, fetcher: Fetcher) -> _DiscoveryEntry:
+        kind, base_url = key
+        self._fetches += 1
+        start = time.perf_counter()
+        try:
+            entry = _DiscoveryEntry(await fetcher(base_url), ok=True)
+        except Exception as e:
+            self._errors += 1
+            print(f"Error querying {kind} at {base_url}: {e!r}")
+            previous = self._entries.get(key)
+            if previous is not None and previous.ok and previous.age < self.max_stale:
+                # Keep serving the last good list rather than an empty one
+                self._stale_errors += 1
+                previous.failed_at = time.monotonic()
+                previous.error = repr(e)
+                return previous
+            entry = _DiscoveryEntry([], ok=False, error=repr(e))
+        finally:
+            self._total_fetch_ms += (time.perf_counter() - start) * 1000
+            self._inflight.pop(key, None)
+        self._entries[key] = entry
+        return entry
+
+    async def invalidate(self) -> None:
+        """Drop every cached model list (config update listener)"""
+        self._entries.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            'entries': {
+                f'{kind}:{base_url}': {
+                    'ok': entry.ok,
+                    'models': len(entry.models),
+                    'age_s': round(entry.age, 1),
+                    'error': entry.error,
+                }
+                for (kind, base_url), entry in self._entries.items()
+            },
+            'hits': self._hits,
+            'stale_hits': self._stale_hits,
+            'negative_hits': self._negative_hits,
+            'misses': self._misses,
+            'fetches': self._fetches,
+            'errors': self._errors,
+            'stale_errors': self._stale_errors,
+            'avg_fetch_ms': round(self._total_fetch_ms / self._fetches, 2) if self._fetches else 0.0,
+        }
+
+
+model_discovery_service = ModelDiscoveryService()
+config_service.add_update_listener(model_discovery_service.invalidate)
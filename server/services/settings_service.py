@@ -36,7 +36,8 @@ app_settings = {}
 DEFAULT_SETTINGS = {
     "proxy": "system",  # 代理设置：'' (不使用代理), 'system' (使用系统代理), 或具体的代理URL地址
     "enabled_knowledge": [],  # 启用的知识库ID列表（保持兼容性）
-    "enabled_knowledge_data": []  # 启用的知识库完整数据列表
+    "enabled_knowledge_data": [],  # 启用的知识库完整数据列表
+    "image_output_format": "png"  # 生成图片的保存格式：'png', 'png_fast', 'webp', 'jpeg', 'avif'
 }
 
 
@@ -173,6 +174,16 @@ class SettingsService:
         settings = self.get_raw_settings()
         return settings.get('proxy', '')
 
+    def get_image_output_format(self):
+        """
+        获取生成图片的保存格式
+
+        Returns:
+            str: 'png' (optimize), 'png_fast', 'webp' (无损), 'jpeg' 或 'avif'
+        """
+        settings = self.get_raw_settings()
+        return settings.get('image_output_format', 'png')
+
     def get_enabled_knowledge_ids(self):
         """
         获取启用的知识库ID列表
@@ -1,19 +1,67 @@
 # services/stream_service.py
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Set
 import asyncio
+from services.backplane import backplane
+from services.message_log import message_log
 
-# Dictionary to store active stream tasks, keyed by session_id
+# Dictionary to store active stream tasks of this worker, keyed by session_id
 stream_tasks: Dict[str, asyncio.Task[Any]] = {}
 
-def add_stream_task(session_id: str, task: asyncio.Task[Any]) -> None:
+# What keeps this worker's claim on a session besides its message log: the stream task and scheduled jobs
+_session_holders: Dict[str, Set[str]] = {}
+_releases: Set['asyncio.Task[None]'] = set()
+
+async def hold_session(session_id: str, holder: str) -> None:
+    """
+    Claim the session on the backplane for `holder` (the stream task or a job id).
+
+    The claim is released once every holder has dropped it and the session's
+    message log has been evicted from this worker.
+    """
+    _session_holders.setdefault(session_id, set()).add(holder)
+    await backplane.claim('session', session_id)
+
+def drop_session(session_id: str, holder: str) -> None:
+    holders = _session_holders.get(session_id)
+    if holders is None or holder not in holders:
+        return
+    holders.discard(holder)
+    if holders:
+        return
+    del _session_holders[session_id]
+    # Resyncs still need the message log, keep the claim until it is evicted
+    if not message_log.has_session(session_id):
+        _schedule_release(session_id)
+
+def _on_message_log_evicted(session_id: str) -> None:
+    if session_id not in _session_holders:
+        _schedule_release(session_id)
+
+def _schedule_release(session_id: str) -> None:
+    task = asyncio.create_task(_release_session(session_id))
+    _releases.add(task)
+    task.add_done_callback(_releases.discard)
+
+async def _release_session(session_id: str) -> None:
+    # Claimed again before the release got to run
+    if session_id in _session_holders or message_log.has_session(session_id):
+        return
+    await backplane.release('session', session_id)
+
+async def add_stream_task(session_id: str, task: asyncio.Task[Any]) -> None:
     """
     Add a stream task for the given session_id.
 
+    The session is claimed on the backplane so cancel requests and message
+    resyncs reaching another worker are routed here. The claim is kept after
+    the task finishes until the session's message log is evicted.
+
     Args:
         session_id (str): Unique identifier for the session.
         task: The task object to associate with the session.
     """
     stream_tasks[session_id] = task
+    await hold_session(session_id, 'stream')
 
 def remove_stream_task(session_id: str) -> None:
     """
@@ -22,7 +70,8 @@ def remove_stream_task(session_id: str) -> None:
     Args:
         session_id (str): Unique identifier for the session.
     """
-    stream_tasks.pop(session_id, None)
+    if stream_tasks.pop(session_id, None) is not None:
+        drop_session(session_id, 'stream')
 
 def get_stream_task(session_id: str) -> Optional[asyncio.Task[Any]]:
     """
@@ -36,4 +85,25 @@ def get_stream_task(session_id: str) -> Optional[asyncio.Task[Any]]:
     """
     return stream_tasks.get(session_id)
 
+async def _cancel_local_stream_task(payload: Dict[str, Any]) -> bool:
+    task = get_stream_task(payload['session_id'])
+    if task and not task.done():
+        task.cancel()
+        return True
+    return False
+
+async def cancel_stream_task(session_id: str) -> bool:
+    """
+    Cancel the stream task of the given session_id, on whichever worker runs it.
+
+    Returns:
+        True if a running task was cancelled.
+    """
+    if session_id in stream_tasks:
+        return await _cancel_local_stream_task({'session_id': session_id})
+    return bool(await backplane.route('session', session_id, 'cancel_stream_task', {'session_id': session_id}))
+
+backplane.register_handler('cancel_stream_task', _cancel_local_stream_task)
+message_log.on_evict = _on_message_log_evicted
+
 # 你也可以加一个 list_stream_tasks() 返回所有 session_id
@@ -0,0 +1,269 @@
+# services/task_poller.py
+"""
+Shared poller for remote generation tasks (Jaaz, Wavespeed, Volces)
+
+Each provider used to run its own loop polling at a fixed 1-5s interval for
+the whole task. All outstanding tasks are now polled from one scheduler loop:
+
+- the first status check happens after a few min intervals (at most halfway
+  through the expected duration of the task kind), checks then close in on
+  the expected finish time and back off exponentially once it has passed, up
+  to the kind's max interval, which stays close to the old fixed intervals
+- expected durations start from TASK_POLL_PROFILES and follow the observed
+  durations per kind / model (EWMA)
+- waiting on a key that is already being polled shares that poll instead of
+  starting a second one
+- at most TASK_POLL_CONCURRENCY status requests are in flight at a time
+
+None of the provider status endpoints accept several task ids, so lookups
+are multiplexed (one loop, shared HTTP session) rather than batched.
+"""
+
+import asyncio
+import heapq
+import os
+import time
+import traceback
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+TASK_POLL_CONCURRENCY = int(os.getenv("TASK_POLL_CONCURRENCY", 32))
+TASK_POLL_EWMA_ALPHA = float(os.getenv("TASK_POLL_EWMA_ALPHA", 0.3))
+TASK_POLL_BACKOFF_FACTOR = float(os.getenv("TASK_POLL_BACKOFF_FACTOR", 1.5))
+# First check after this many min intervals, so fast tasks and failed submissions are seen early
+TASK_POLL_FIRST_CHECK_INTERVALS = float(os.getenv("TASK_POLL_FIRST_CHECK_INTERVALS", 3))
+
+# kind -> (expected duration, min interval, max interval) in seconds.
+# A kind like 'jaaz_video:kling-v2' falls back to the 'jaaz_video' profile.
+TASK_POLL_PROFILES: Dict[str, Tuple[float, float, float]] = {
+    'jaaz_image': (20, 2, 4),
+    'jaaz_magic': (60, 3, 5),
+    'jaaz_midjourney': (60, 2, 5),
+    'jaaz_video': (90, 3, 6),
+    'wavespeed_image': (8, 1, 2),
+    'volces_video': (60, 3, 6),
+    'default': (30, 2, 5),
+}
+
+class TaskPollTimeout(Exception):
+    """The task didn't finish within the poll timeout"""
+
+
+# Returns None while the task is still running, the result once it is done,
+# raises if the task failed
+StatusCheck = Callable[[], Awaitable[Optional[Any]]]
+
+
+class _PollEntry:
+    def __init__(self, key: str, kind: str, check: StatusCheck, timeout: float, future: 'asyncio.Future[Any]') -> None:
+        self.key = key
+        self.kind = kind
+        self.check = check
+        self.timeout = timeout
+        self.future = future
+        self.started_at = time.monotonic()
+        self.interval = 0.0
+        self.seq = 0
+        self.polls = 0
+        self.waiters = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+
+class _KindStats:
+    def __init__(self) -> None:
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.polls = 0
+        self.total_duration = 0.0
+
+
+class TaskPoller:
+    def __init__(self, concurrency: int = TASK_POLL_CONCURRENCY) -> None:
+        self.concurrency = concurrency
+        self._entries: Dict[str, _PollEntry] = {}
+        # (due time, seq, key)
+        self._schedule: List[Tuple[float, int, str]] = []
+        self._seq = 0
+        self._expected: Dict[str, float] = {}
+        self._stats: Dict[str, _KindStats] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional['asyncio.Task[None]'] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._polls: Set['asyncio.Task[None]'] = set()
+
+    def _profile(self, kind: str) -> Tuple[float, float, float]:
+        profile = TASK_POLL_PROFILES.get(kind) or TASK_POLL_PROFILES.get(kind.split(':')[0]) or TASK_POLL_PROFILES['default']
+        return self._expected.get(kind, profile[0]), profile[1], profile[2]
+
+    def expected_duration(self, kind: str) -> float:
+        return self._profile(kind)[0]
+
+    def _next_delay(self, entry: _PollEntry) -> float:
+        expected, min_interval, max_interval = self._profile(entry.kind)
+        if entry.polls == 0:
+            delay = min(expected / 2, min_interval * TASK_POLL_FIRST_CHECK_INTERVALS)
+        elif entry.elapsed < expected:
+            # Close in on the expected finish time
+            delay = (expected - entry.elapsed) / 3
+        else:
+            delay = max(entry.interval, min_interval) * TASK_POLL_BACKOFF_FACTOR
+        entry.interval = min(max_interval, max(min_interval, delay))
+        return entry.interval
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._task = asyncio.create_task(self._run())
+
+    def _schedule_entry(self, entry: _PollEntry, delay: float) -> None:
+        self._seq += 1
+        entry.seq = self._seq
+        heapq.heappush(self._schedule, (time.monotonic() + delay, self._seq, entry.key))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def wait(self, key: str, check: StatusCheck, kind: str = 'default', timeout: float = 300) -> Any:
+        """
+        Poll `check` until it returns a result, on the shared schedule
+
+        Args:
+            key: Identifies the remote task, waits on the same key share one poll
+            check: Status lookup, None while the task is still running
+            kind: Profile / stats bucket, e.g. 'jaaz_video:kling-v2'
+            timeout: Give up after this many seconds
+        """
+        self._ensure_running()
+        entry = self._entries.get(key)
+        if entry is None:
+            future: 'asyncio.Future[Any]' = asyncio.get_running_loop().create_future()
+            entry = self._entries[key] = _PollEntry(key, kind, check, timeout, future)
+            self._stats.setdefault(kind, _KindStats())
+            self._schedule_entry(entry, self._next_delay(entry))
+        entry.waiters += 1
+        try:
+            return await asyncio.shield(entry.future)
+        except asyncio.CancelledError:
+            entry.waiters -= 1
+            if entry.waiters == 0 and not entry.future.done():
+                # Nobody waits any more, stop polling
+                self._stats[entry.kind].cancelled += 1
+                self._entries.pop(key, None)
+                entry.future.cancel()
+            raise
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None and self._semaphore is not None
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            while self._schedule and self._schedule[0][0] <= now:
+                _, seq, key = heapq.heappop(self._schedule)
+                entry = self._entries.get(key)
+                # Skip entries that finished / were replaced since they were scheduled
+                if entry is not None and entry.seq == seq and not entry.future.done():
+                    task = asyncio.create_task(self._poll(entry))
+                    self._polls.add(task)
+                    task.add_done_callback(self._polls.discard)
+            delay = self._schedule[0][0] - now if self._schedule else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, entry: _PollEntry) -> None:
+        assert self._semaphore is not None
+        stats = self._stats[entry.kind]
+        async with self._semaphore:
+            if entry.future.done():
+                return
+            entry.polls += 1
+            stats.polls += 1
+            try:
+                result = await entry.check()
+            except Exception as e:
+                stats.failed += 1
+                self._finish(entry)
+                if not entry.future.done():
+                    entry.future.set_exception(e)
+                return
+            except asyncio.CancelledError:
+                self._finish(entry)
+                entry.future.cancel()
+                raise
+
+        if result is not None:
+            duration = entry.elapsed
+            stats.completed += 1
+            stats.total_duration += duration
+            # Follow how long this kind of task actually takes
+            expected = self._profile(entry.kind)[0]
+            self._expected[entry.kind] = expected + TASK_POLL_EWMA_ALPHA * (duration - expected)
+            print(f"✅ Task {entry.key} done after {entry.polls} polls in {duration:.1f}s")
+            self._finish(entry)
+            if not entry.future.done():
+                entry.future.set_result(result)
+            return
+
+        if entry.elapsed >= entry.timeout:
+            stats.timeouts += 1
+            self._finish(entry)
+            if not entry.future.done():
+                entry.future.set_exception(
+                    TaskPollTimeout(f"Task polling timeout after {entry.polls} polls ({entry.timeout:.0f}s)"))
+            return
+
+        self._schedule_entry(entry, min(self._next_delay(entry), max(0.0, entry.timeout - entry.elapsed)))
+
+    def _finish(self, entry: _PollEntry) -> None:
+        if self._entries.get(entry.key) is entry:
+            del self._entries[entry.key]
+
+    async def stop(self) -> None:
+        for entry in list(self._entries.values()):
+            entry.future.cancel()
+        self._entries.clear()
+        self._schedule.clear()
+        for task in list(self._polls):
+            task.cancel()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                traceback.print_exc()
+            self._task = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        def avg_polls(stats: _KindStats) -> float:
+            finished = stats.completed + stats.failed + stats.timeouts
+            return round(stats.polls / finished, 2) if finished else 0.0
+
+        return {
+            'active': [
+                {'key': entry.key, 'kind': entry.kind, 'polls': entry.polls, 'elapsed_s': round(entry.elapsed, 1)}
+                for entry in self._entries.values()
+            ],
+            'kinds': {
+                kind: {
+                    'expected_s': round(self._profile(kind)[0], 1),
+                    'completed': stats.completed,
+                    'failed': stats.failed,
+                    'timeouts': stats.timeouts,
+                    'cancelled': stats.cancelled,
+                    'polls': stats.polls,
+                    'avg_polls_per_task': avg_polls(stats),
+                    'avg_duration_s': round(stats.total_duration / stats.completed, 1) if stats.completed else 0.0,
+                }
+                for kind, stats in self._stats.items()
+            },
+        }
+
+
+task_poller = TaskPoller()
@@ -0,0 +1,189 @@
+# services/thumbnail_service.py
+"""
+Resized derivatives of generated images
+
+`/api/file/{file_id}?w=256&format=webp` serves a downscaled copy instead of
+the full-resolution original, so image previews (canvas list cards, chat
+images, upload previews) don't download and decode every image at full size.
+Canvas elements keep the original URL, Excalidraw exports them at full size:
+
+- requested widths are snapped up to a fixed set of buckets so the number of
+  variants per image stays bounded
+- derivatives are generated in the image process pool and cached on disk
+  under THUMBNAIL_DIR, concurrent requests for the same variant share one job
+- the cache directory is capped at THUMBNAIL_CACHE_MAX_MB, least recently
+  used derivatives are deleted first (hits refresh the file's mtime)
+- `save_image_to_canvas` precomputes THUMBNAIL_PRECOMPUTE_WIDTHS in the
+  background, the width the canvas list and chat ask for (`thumbnailUrl` in
+  react/src/lib/utils.ts), so their first load already hits the cache
+"""
+
+import asyncio
+import os
+import traceback
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from services.config_service import FILES_DIR, USER_DATA_DIR
+from utils.image_processing import IMAGE_OUTPUT_FORMATS, resolve_output_format, run_image_task, save_image_derivative
+
+THUMBNAIL_DIR = os.path.join(USER_DATA_DIR, "thumbnails")
+THUMBNAIL_WIDTHS = (128, 256, 512, 1024, 2048)
+THUMBNAIL_DEFAULT_FORMAT = os.getenv("THUMBNAIL_DEFAULT_FORMAT", "webp")
+THUMBNAIL_CACHE_MAX_MB = float(os.getenv("THUMBNAIL_CACHE_MAX_MB", 512))
+THUMBNAIL_PRECOMPUTE_WIDTHS = tuple(
+    int(w) for w in os.getenv("THUMBNAIL_PRECOMPUTE_WIDTHS", "512").split(",") if w.strip()
+)
+
+# Source formats Pillow can decode and resize
+RESIZABLE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".avif", ".bmp", ".tiff", ".gif")
+
+
+def snap_width(width: int) -> int:
+    """Round a requested width up to the nearest bucket"""
+    for bucket in THUMBNAIL_WIDTHS:
+        if width <= bucket:
+            return bucket
+    return THUMBNAIL_WIDTHS[-1]
+
+
+class ThumbnailService:
+    def __init__(self, cache_dir: str = THUMBNAIL_DIR, max_bytes: int = int(THUMBNAIL_CACHE_MAX_MB * 1024 * 1024)) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._inflight: Dict[str, 'asyncio.Future[Optional[str]]'] = {}
+        self._background_tasks: Set['asyncio.Task[None]'] = set()
+        # Size of the cache directory, computed lazily by scanning it once
+        self._cache_bytes: Optional[int] = None
+        self._cleanup_lock = asyncio.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._generated = 0
+        self._evicted = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _derivative_path(self, file_id: str, width: int, output_format: str) -> str:
+        extension = IMAGE_OUTPUT_FORMATS[output_format]['extension']
+        name, _ = os.path.splitext(file_id)
+        return os.path.join(self.cache_dir, f"{name}_w{width}.{extension}")
+
+    async def get_derivative(self, file_id: str, width: int, output_format: Optional[str] = None) -> Optional[str]:
+        """
+        Path of a cached derivative of `file_id`, generating it on a miss
+
+        Returns None when the file can't be resized (not an image), callers
+        should fall back to the original.
+        """
+        source_path = os.path.join(FILES_DIR, file_id)
+        if not file_id.lower().endswith(RESIZABLE_EXTENSIONS) or not os.path.exists(source_path):
+            return None
+
+        width = snap_width(width)
+        output_format = resolve_output_format(output_format or THUMBNAIL_DEFAULT_FORMAT)
+        dest_path = self._derivative_path(file_id, width, output_format)
+
+        if os.path.exists(dest_path):
+            self._hits += 1
+            try:
+                # Mark as recently used for LRU cleanup
+                os.utime(dest_path)
+            except OSError:
+                pass
+            return dest_path
+
+        inflight = self._inflight.get(dest_path)
+        if inflight is not None:
+            return await inflight
+
+        self._misses += 1
+        future: 'asyncio.Future[Optional[str]]' = asyncio.get_running_loop().create_future()
+        self._inflight[dest_path] = future
+        try:
+            await run_image_task(save_image_derivative, source_path, dest_path, width, output_format)
+            self._generated += 1
+            await self._track_new_file(dest_path)
+            future.set_result(dest_path)
+            return dest_path
+        except Exception as e:
+            print(f"🟠 Error generating derivative {dest_path}: {e}")
+            traceback.print_exc()
+            future.set_result(None)
+            return None
+        finally:
+            self._inflight.pop(dest_path, None)
+
+    def precompute(self, file_id: str, widths: Optional[List[int]] = None) -> None:
+        """Generate the default derivatives of a new file in the background"""
+        if not file_id.lower().endswith(RESIZABLE_EXTENSIONS):
+            return
+        task = asyncio.create_task(self._precompute(file_id, list(widths or THUMBNAIL_PRECOMPUTE_WIDTHS)))
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _precompute(self, file_id: str, widths: List[int]) -> None:
+        for width in widths:
+            await self.get_derivative(file_id, width)
+
+    def _scan_cache_dir(self) -> List[Any]:
+        with os.scandir(self.cache_dir) as it:
+            return [entry for entry in it if entry.is_file() and not entry.name.endswith(".tmp")]
+
+    async def _track_new_file(self, path: str) -> None:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        if self._cache_bytes is None:
+            entries = await asyncio.to_thread(self._scan_cache_dir)
+            self._cache_bytes = sum(entry.stat().st_size for entry in entries)
+        else:
+            self._cache_bytes += size
+        if self._cache_bytes > self.max_bytes:
+            await self.cleanup(keep=path)
+
+    async def cleanup(self, keep: Optional[str] = None) -> None:
+        """Delete least recently used derivatives until the cache is under 90% of its cap"""
+        async with self._cleanup_lock:
+            evicted, remaining = await asyncio.to_thread(self._cleanup_sync, int(self.max_bytes * 0.9), keep)
+            self._evicted += evicted
+            self._cache_bytes = remaining
+            if evicted:
+                print(f"🧹 Thumbnail cache cleanup removed {evicted} files, {remaining / 1024 / 1024:.1f}MB left")
+
+    def _cleanup_sync(self, target_bytes: int, keep: Optional[str] = None) -> Tuple[int, int]:
+        files = []
+        for entry in self._scan_cache_dir():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, path in sorted(files):
+            if total <= target_bytes:
+                break
+            if path == keep:
+                # About to be served to the caller
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        return evicted, total
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'generated': self._generated,
+            'evicted': self._evicted,
+            'inflight': len(self._inflight),
+            'cache_mb': round(self._cache_bytes / 1024 / 1024, 2) if self._cache_bytes is not None else None,
+            'max_mb': round(self.max_bytes / 1024 / 1024, 2),
+        }
+
+
+thumbnail_service = ThumbnailService()
@@ -1,7 +1,14 @@
 import asyncio
-from typing import Dict, Any, Optional
-from dataclasses import dataclass
+import os
+import time
+import traceback
+from typing import Dict, Any, List, Optional
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from services.backplane import backplane
+
+# 过期清理的间隔（秒），等待中的请求最多比超时时间晚这么久被取消
+TOOL_CONFIRMATION_SWEEP_INTERVAL = float(os.getenv("TOOL_CONFIRMATION_SWEEP_INTERVAL", 1.0))
 
 
 @dataclass
@@ -12,6 +19,9 @@ class ToolConfirmationRequest:
     arguments: Dict[str, Any]
     created_at: datetime
     confirmed: Optional[bool] = None
+    # 确认 / 取消 / 过期时完成，等待方直接 await，不再轮询
+    future: Optional['asyncio.Future[bool]'] = field(default=None, repr=False, compare=False)
+    started_at: float = field(default_factory=time.perf_counter, repr=False, compare=False)
 
 
 class ToolConfirmationManager:
@@ -20,67 +30,176 @@ class ToolConfirmationManager:
     def __init__(self):
         self.pending_confirmations: Dict[str, ToolConfirmationRequest] = {}
         self.confirmation_timeout = timedelta(minutes=5)  # 5分钟超时
+        self.sweep_interval = TOOL_CONFIRMATION_SWEEP_INTERVAL
+        self._sweeper: Optional[asyncio.Task[None]] = None
+
+        # metrics
+        self._requested = 0
+        self._confirmed = 0
+        self._cancelled = 0
+        self._expired = 0
+        self._abandoned = 0
+        self._total_wait_ms = 0.0
+        self._max_wait_ms = 0.0
+        self._max_pending = 0
+
+    def start(self) -> None:
+        """启动过期清理任务（可重复调用）"""
+        if self._sweeper is not None and not self._sweeper.done():
+            return
+        self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
 
     async def request_confirmation(self, tool_call_id: str, session_id: str, tool_name: str, arguments: Dict[str, Any]) -> bool:
         """请求工具确认，返回是否已确认"""
+        self.start()
         request = ToolConfirmationRequest(
             tool_call_id=tool_call_id,
             session_id=session_id,
             tool_name=tool_name,
             arguments=arguments,
-            created_at=datetime.now()
+            created_at=datetime.now(),
+            future=asyncio.get_running_loop().create_future(),
         )
 
         self.pending_confirmations[tool_call_id] = request
+        self._requested += 1
+        self._max_pending = max(self._max_pending, len(self.pending_confirmations))
+        # 确认请求可能落到其他 worker，登记归属以便路由回来
+        await backplane.claim('tool_confirmation', tool_call_id)
 
-        # 等待确认或超时
+        # 等待确认、取消或过期
         try:
-            await asyncio.wait_for(
-                self._wait_for_confirmation(tool_call_id),
-                timeout=self.confirmation_timeout.total_seconds()
-            )
-            return request.confirmed is True
-        except asyncio.TimeoutError:
-            # 超时，自动取消
-            self.cancel_confirmation(tool_call_id)
-            return False
+            return await request.future  # type: ignore
+        except asyncio.CancelledError:
+            # 会话被取消，不再等待
+            if request.confirmed is None:
+                self._abandoned += 1
+            raise
+        finally:
+            if self.pending_confirmations.get(tool_call_id) is request:
+                del self.pending_confirmations[tool_call_id]
+            await backplane.release('tool_confirmation', tool_call_id)
 
-    async def _wait_for_confirmation(self, tool_call_id: str):
-        """等待确认"""
-        while tool_call_id in self.pending_confirmations:
-            request = self.pending_confirmations[tool_call_id]
-            if request.confirmed is not None:
-                return
-            await asyncio.sleep(0.1)
+    def _settle(self, tool_call_id: str, confirmed: bool) -> bool:
+        request = self.pending_confirmations.get(tool_call_id)
+        if request is None or request.confirmed is not None:
+            return False
+        request.confirmed = confirmed
+        wait_ms = (time.perf_counter() - request.started_at) * 1000
+        self._total_wait_ms += wait_ms
+        self._max_wait_ms = max(self._max_wait_ms, wait_ms)
+        if request.future is not None and not request.future.done():
+            request.future.set_result(confirmed)
+        return True
 
     def confirm_tool(self, tool_call_id: str) -> bool:
         """确认工具调用"""
-        if tool_call_id in self.pending_confirmations:
-            self.pending_confirmations[tool_call_id].confirmed = True
+        if self._settle(tool_call_id, True):
+            self._confirmed += 1
             return True
         return False
 
     def cancel_confirmation(self, tool_call_id: str) -> bool:
         """取消工具调用"""
-        if tool_call_id in self.pending_confirmations:
-            self.pending_confirmations[tool_call_id].confirmed = False
+        if self._settle(tool_call_id, False):
+            self._cancelled += 1
             return True
         return False
 
+    async def resolve(self, tool_call_id: str, confirmed: bool) -> bool:
+        """确认或取消工具调用，请求在其他 worker 上等待时转发给该 worker"""
+        if tool_call_id in self.pending_confirmations:
+            return await self._resolve_local({'tool_call_id': tool_call_id, 'confirmed': confirmed})
+        return bool(await backplane.route('tool_confirmation', tool_call_id, 'resolve_tool_confirmation', {
+            'tool_call_id': tool_call_id,
+            'confirmed': confirmed,
+        }))
+
+    async def _resolve_local(self, payload: Dict[str, Any]) -> bool:
+        if payload['confirmed']:
+            return self.confirm_tool(payload['tool_call_id'])
+        return self.cancel_confirmation(payload['tool_call_id'])
+
+    async def resolve_many(self, tool_call_ids: List[str], confirmed: bool) -> Dict[str, bool]:
+        """批量确认或取消，返回每个 tool_call_id 是否处理成功"""
+        results = await asyncio.gather(*[self.resolve(tool_call_id, confirmed) for tool_call_id in tool_call_ids])
+        return dict(zip(tool_call_ids, results))
+
+    async def resolve_session(self, session_id: str, confirmed: bool) -> List[str]:
+        """确认或取消某个会话所有等待中的工具调用，返回处理的 tool_call_id"""
+        if any(request.session_id == session_id for request in self.pending_confirmations.values()):
+            return await self._resolve_session_local({'session_id': session_id, 'confirmed': confirmed})
+        # 会话运行在其他 worker 上
+        return await backplane.route('session', session_id, 'resolve_session_confirmations', {
+            'session_id': session_id,
+            'confirmed': confirmed,
+        }) or []
+
+    async def _resolve_session_local(self, payload: Dict[str, Any]) -> List[str]:
+        tool_call_ids = self.get_pending_ids(payload['session_id'])
+        results = [await self._resolve_local({'tool_call_id': tool_call_id, 'confirmed': payload['confirmed']})
+                   for tool_call_id in tool_call_ids]
+        return [tool_call_id for tool_call_id, success in zip(tool_call_ids, results) if success]
+
+    def get_pending_ids(self, session_id: str) -> List[str]:
+        """某个会话等待确认的 tool_call_id"""
+        return [
+            tool_call_id for tool_call_id, request in self.pending_confirmations.items()
+            if request.session_id == session_id and request.confirmed is None
+        ]
+
     def get_pending_request(self, tool_call_id: str) -> Optional[ToolConfirmationRequest]:
         """获取待确认的请求"""
         return self.pending_confirmations.get(tool_call_id)
 
-    def cleanup_expired(self):
-        """清理过期的确认请求"""
+    def cleanup_expired(self) -> int:
+        """取消已超时的确认请求，返回取消的数量"""
         now = datetime.now()
         expired_ids = [
             tool_call_id for tool_call_id, request in self.pending_confirmations.items()
-            if now - request.created_at > self.confirmation_timeout
+            if request.confirmed is None and now - request.created_at > self.confirmation_timeout
         ]
         for tool_call_id in expired_ids:
-            del self.pending_confirmations[tool_call_id]
+            if self._settle(tool_call_id, False):
+                self._expired += 1
+        return len(expired_ids)
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                expired = self.cleanup_expired()
+                if expired:
+                    print(f"⏰ {expired} tool confirmation(s) expired")
+            except Exception as e:
+                print(f"🟠 Error cleaning up tool confirmations: {e}")
+                traceback.print_exc()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        resolved = self._confirmed + self._cancelled + self._expired
+        return {
+            'pending': len(self.pending_confirmations),
+            'max_pending': self._max_pending,
+            'requested': self._requested,
+            'confirmed': self._confirmed,
+            'cancelled': self._cancelled,
+            'expired': self._expired,
+            'abandoned': self._abandoned,
+            'avg_wait_ms': round(self._total_wait_ms / resolved, 3) if resolved else 0.0,
+            'max_wait_ms': round(self._max_wait_ms, 3),
+        }
 
 
 # 全局实例
 tool_confirmation_manager = ToolConfirmationManager()
+backplane.register_handler('resolve_tool_confirmation', tool_confirmation_manager._resolve_local)
+backplane.register_handler('resolve_session_confirmations', tool_confirmation_manager._resolve_session_local)
@@ -1,5 +1,5 @@
 import traceback
-from typing import Dict
+from typing import Callable, Dict, List
 from langchain_core.tools import BaseTool
 from models.tool_model import ToolInfo
 from tools.comfy_dynamic import build_tool
@@ -196,8 +196,21 @@ TOOL_MAPPING: Dict[str, ToolInfo] = {
 class ToolService:
     def __init__(self):
         self.tools: Dict[str, ToolInfo] = {}
+        # 工具注册变化时调用（如清理缓存的 agent swarm）
+        self._change_listeners: List[Callable[[], None]] = []
         self._register_required_tools()
 
+    def add_change_listener(self, listener: Callable[[], None]) -> None:
+        """注册工具变化回调"""
+        self._change_listeners.append(listener)
+
+    def _notify_change(self) -> None:
+        for listener in self._change_listeners:
+            try:
+                listener()
+            except Exception as e:
+                print(f"⚠️ Tool change listener failed: {e}")
+
     def _register_required_tools(self):
         """注册必须的工具"""
         try:
@@ -215,6 +228,7 @@ class ToolService:
             return
 
         self.tools[tool_id] = tool_info
+        self._notify_change()
 
     # TODO: Check if there will be racing conditions when server just starting up but tools are not ready yet.
     async def initialize(self):
@@ -239,6 +253,7 @@ class ToolService:
 
     def remove_tool(self, tool_id: str):
         self.tools.pop(tool_id)
+        self._notify_change()
 
     def get_all_tools(self) -> Dict[str, ToolInfo]:
         return self.tools.copy()
@@ -247,6 +262,7 @@ class ToolService:
         self.tools.clear()
         # 重新注册必须的工具
         self._register_required_tools()
+        self._notify_change()
 
 
 tool_service = ToolService()
@@ -1,22 +1,170 @@
 # services/websocket_service.py
-from services.websocket_state import sio, get_all_socket_ids
+from services.websocket_state import sio, get_all_socket_ids, session_room, canvas_room, NOTIFICATIONS_ROOM, WEBSOCKET_ROUTING
+import asyncio
+import os
+import time
 import traceback
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Token 级事件合并：STREAM_COALESCE_MS 内的 delta / tool_call_arguments 合并成一帧发送，
+# 累计超过 STREAM_COALESCE_BYTES 立即发送，设为 0 关闭合并
+STREAM_COALESCE_MS = float(os.getenv("STREAM_COALESCE_MS", 25))
+STREAM_COALESCE_BYTES = int(os.getenv("STREAM_COALESCE_BYTES", 4096))
+COALESCED_EVENT_TYPES = ('delta', 'tool_call_arguments')
+# 通知面板展示的事件，也发给所有连接
+NOTIFICATION_EVENT_TYPES = ('error', 'info', 'image_generated')
+
+
+async def _emit_session_update(session_id: str, canvas_id: str | None, event: Dict[str, Any]):
+    payload = {
+        'canvas_id': canvas_id,
+        'session_id': session_id,
+        **event
+    }
+    try:
+        if WEBSOCKET_ROUTING == 'broadcast':
+            for socket_id in get_all_socket_ids():
+                await sio.emit('session_update', payload, room=socket_id)
+            return
+        # One emit to the session (and canvas) rooms, sockets in several of them get it once
+        rooms = [session_room(session_id)]
+        if canvas_id:
+            rooms.append(canvas_room(canvas_id))
+        if event.get('type') in NOTIFICATION_EVENT_TYPES:
+            rooms.append(NOTIFICATIONS_ROOM)
+        await sio.emit('session_update', payload, room=rooms)
+    except Exception as e:
+        print(f"Error broadcasting session update for {session_id}: {e}")
+        traceback.print_exc()
+
+
+class _PendingFrames:
+    __slots__ = ('events', 'bytes', 'first_at', 'last_sent_at', 'flush_task', 'lock')
+
+    def __init__(self) -> None:
+        # (canvas_id, event, enqueued_at)
+        self.events: List[Tuple[str | None, Dict[str, Any], float]] = []
+        self.bytes = 0
+        self.first_at = 0.0
+        self.last_sent_at = 0.0
+        self.flush_task: Optional[asyncio.Task[None]] = None
+        # Keeps frames of one session in order between the timer and producers
+        self.lock = asyncio.Lock()
+
+
+class SessionEventCoalescer:
+    """
+    Batches streaming token events per session.
+
+    The first token after an idle window is sent immediately; tokens that
+    follow within `window_ms` are merged (consecutive `delta` texts, or
+    `tool_call_arguments` texts of the same tool call) and sent when the
+    window closes or `max_bytes` is reached. Any other event of the session
+    flushes the pending frames first, so ordering is preserved.
+    """
+
+    def __init__(self, window_ms: float = STREAM_COALESCE_MS, max_bytes: int = STREAM_COALESCE_BYTES) -> None:
+        self.window = window_ms / 1000
+        self.max_bytes = max_bytes
+        self._sessions: Dict[str, _PendingFrames] = {}
+        self._events_in = 0
+        self._frames_out = 0
+        self._total_delay = 0.0
+        self._max_delay = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_bytes > 0
+
+    async def emit(self, session_id: str, canvas_id: str | None, event: Dict[str, Any]) -> None:
+        self._events_in += 1
+        if not self.enabled:
+            await self._send(session_id, canvas_id, event, time.perf_counter())
+            return
+
+        state = self._sessions.get(session_id)
+        if event.get('type') not in COALESCED_EVENT_TYPES:
+            if state is not None:
+                await self.flush(session_id)
+                if event.get('type') in ('done', 'error') and not state.events:
+                    # Stream finished, drop the per-session state
+                    self._sessions.pop(session_id, None)
+            await self._send(session_id, canvas_id, event, time.perf_counter())
+            return
+
+        if state is None:
+            state = self._sessions[session_id] = _PendingFrames()
+        now = time.perf_counter()
+        if not state.events and now - state.last_sent_at >= self.window:
+            # Idle stream, don't delay the first token
+            state.last_sent_at = now
+            async with state.lock:
+                await self._send(session_id, canvas_id, event, now)
+            return
+
+        self._merge(state, canvas_id, event, now)
+        if state.bytes >= self.max_bytes:
+            await self.flush(session_id)
+        elif state.flush_task is None or state.flush_task.done():
+            state.flush_task = asyncio.create_task(self._delayed_flush(session_id, state))
+
+    @staticmethod
+    def _merge(state: _PendingFrames, canvas_id: str | None, event: Dict[str, Any], now: float) -> None:
+        text = event.get('text') or ''
+        if not state.events:
+            state.first_at = now
+        state.bytes += len(text)
+        if state.events:
+            last_canvas_id, last_event, _ = state.events[-1]
+            if (
+                last_canvas_id == canvas_id
+                and last_event.get('type') == event.get('type')
+                and last_event.get('id') == event.get('id')
+            ):
+                last_event['text'] = (last_event.get('text') or '') + text
+                state.events[-1] = (last_canvas_id, last_event, state.events[-1][2])
+                return
+        state.events.append((canvas_id, dict(event), now))
+
+    async def _delayed_flush(self, session_id: str, state: _PendingFrames) -> None:
+        await asyncio.sleep(max(0.0, state.first_at + self.window - time.perf_counter()))
+        await self.flush(session_id)
+
+    async def flush(self, session_id: str) -> None:
+        state = self._sessions.get(session_id)
+        if state is None:
+            return
+        async with state.lock:
+            events, state.events, state.bytes = state.events, [], 0
+            for canvas_id, event, enqueued_at in events:
+                await self._send(session_id, canvas_id, event, enqueued_at)
+            if events:
+                state.last_sent_at = time.perf_counter()
+
+    async def _send(self, session_id: str, canvas_id: str | None, event: Dict[str, Any], enqueued_at: float) -> None:
+        delay = time.perf_counter() - enqueued_at
+        self._frames_out += 1
+        self._total_delay += delay
+        self._max_delay = max(self._max_delay, delay)
+        await _emit_session_update(session_id, canvas_id, event)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            'window_ms': self.window * 1000,
+            'max_bytes': self.max_bytes,
+            'events_in': self._events_in,
+            'frames_out': self._frames_out,
+            'avg_delay_ms': round(self._total_delay / self._frames_out * 1000, 3) if self._frames_out else 0.0,
+            'max_delay_ms': round(self._max_delay * 1000, 3),
+            'pending_sessions': len(self._sessions),
+        }
+
+
+session_event_coalescer = SessionEventCoalescer()
 
 
 async def broadcast_session_update(session_id: str, canvas_id: str | None, event: Dict[str, Any]):
-    socket_ids = get_all_socket_ids()
-    if socket_ids:
-        try:
-            for socket_id in socket_ids:
-                await sio.emit('session_update', {
-                    'canvas_id': canvas_id,
-                    'session_id': session_id,
-                    **event
-                }, room=socket_id)
-        except Exception as e:
-            print(f"Error broadcasting session update for {session_id}: {e}")
-            traceback.print_exc()
+    await session_event_coalescer.emit(session_id, canvas_id, event)
 
 # compatible with legacy codes
 # TODO: All Broadcast should have a canvas_id
@@ -1,14 +1,34 @@
 # services/websocket_state.py
+import os
 import socketio
 from typing import Dict
+from services.backplane import backplane
 
+# 多 worker 时通过 backplane 的 client manager 把事件转发到其他 worker 上的连接
 sio = socketio.AsyncServer(
     cors_allowed_origins="*",
-    async_mode='asgi'
+    async_mode='asgi',
+    client_manager=backplane.socketio_manager(),
 )
 
 active_connections: Dict[str, dict] = {}
 
+# rooms：事件只发送到订阅了对应 session / canvas 的客户端
+# broadcast：旧行为，逐个发送给所有连接
+WEBSOCKET_ROUTING = os.getenv("WEBSOCKET_ROUTING", "rooms")
+
+
+# 所有连接都会加入，通知面板需要的事件（错误、提示、生成完成）即使没订阅对应 session / canvas 也能收到
+NOTIFICATIONS_ROOM = "notifications"
+
+
+def session_room(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+def canvas_room(canvas_id: str) -> str:
+    return f"canvas:{canvas_id}"
+
 def add_connection(socket_id: str, user_info: dict = None):
     active_connections[socket_id] = user_info or {}
     print(f"New connection added: {socket_id}, total connections: {len(active_connections)}")
@@ -37,6 +37,9 @@ from pydantic import BaseModel, Field, create_model
 from routers.comfyui_execution import upload_image
 from services.config_service import FILES_DIR, config_service, IMAGE_FORMATS
 from services.db_service import db_service
+from services.canvas_cache import canvas_cache
+from services.canvas_lock_manager import canvas_lock_manager
+from services.generation_scheduler import generation_scheduler
 from services.websocket_service import broadcast_session_update, send_to_websocket
 
 from .utils.comfyui import ComfyUIWorkflowRunner
@@ -194,77 +197,69 @@ def build_tool(wf: Dict[str, Any]) -> BaseTool:
             extra_kwargs = {}
             extra_kwargs["ctx"] = ctx
 
-            outputs = await generator.generate(**extra_kwargs)
+            # One workflow at a time per ComfyUI server by default (GENERATION_PROVIDER_LIMITS)
+            outputs = await generation_scheduler.run(
+                "comfyui", session_id, lambda: generator.generate(**extra_kwargs)
+            )
             # if outputs is not a list of list, make it a list of list
             if not isinstance(outputs, list) or (
                 outputs and not isinstance(outputs[0], (list, tuple))
             ):
                 outputs = [outputs]
 
-            # update the canvas data, add the new image element
-            canvas_data = await db_service.get_canvas_data(canvas_id)
-            if "data" not in canvas_data:
-                canvas_data["data"] = {}
-            if "elements" not in canvas_data["data"]:
-                canvas_data["data"]["elements"] = []
-            if "files" not in canvas_data["data"]:
-                canvas_data["data"]["files"] = {}
-
             generated_files_info = []
 
-            for output in outputs:
-                mime_type, width, height, filename = output
-                file_id = generate_file_id()
+            # Serialize placement with other generations targeting this canvas
+            async with canvas_lock_manager.lock_canvas(canvas_id):
+                for output in outputs:
+                    mime_type, width, height, filename = output
+                    file_id = generate_file_id()
 
-                url = f"/api/file/{filename}"
+                    url = f"/api/file/{filename}"
 
-                file_data = {
-                    "mimeType": mime_type,
-                    "id": file_id,
-                    "dataURL": url,
-                    "created": int(time.time() * 1000),
-                }
+                    file_data = {
+                        "mimeType": mime_type,
+                        "id": file_id,
+                        "dataURL": url,
+                        "created": int(time.time() * 1000),
+                    }
 
-                # Pass the current canvas_data to the element generation function
-                if mime_type.startswith("image"):
-                    new_element = await generate_new_image_element(
-                        canvas_id,
-                        file_id,
-                        {
-                            "width": width,
-                            "height": height,
-                        },
-                        canvas_data=canvas_data.get("data", {}),
-                    )
-                else:
-                    new_element = await generate_new_video_element(
-                        canvas_id,
-                        file_id,
-                        {
-                            "width": width,
-                            "height": height,
-                        },
-                        canvas_data=canvas_data.get("data", {}),
+                    # Positioned from the cached canvas index, which includes earlier outputs
+                    if mime_type.startswith("image"):
+                        new_element = await generate_new_image_element(
+                            canvas_id,
+                            file_id,
+                            {
+                                "width": width,
+                                "height": height,
+                            },
+                        )
+                    else:
+                        new_element = await generate_new_video_element(
+                            canvas_id,
+                            file_id,
+                            {
+                                "width": width,
+                                "height": height,
+                            },
+                        )
+
+                    # Apply in memory so the next output is positioned after this one
+                    await canvas_cache.append_elements(
+                        canvas_id, [new_element], {file_id: file_data}
                     )
 
-                canvas_data["data"]["elements"].append(new_element)
-                canvas_data["data"]["files"][file_id] = file_data
-
-                image_url = f"http://localhost:{DEFAULT_PORT}/api/file/{filename}"
+                    image_url = f"http://localhost:{DEFAULT_PORT}/api/file/{filename}"
 
-                generated_files_info.append(
-                    {
-                        "element": new_element,
-                        "file": file_data,
-                        "url": image_url,
-                        "mime_type": mime_type,
-                        "filename": filename,
-                    }
-                )
-
-            await db_service.save_canvas_data(
-                canvas_id, json.dumps(canvas_data["data"])
-            )
+                    generated_files_info.append(
+                        {
+                            "element": new_element,
+                            "file": file_data,
+                            "url": image_url,
+                            "mime_type": mime_type,
+                            "filename": filename,
+                        }
+                    )
 
             for file_info in generated_files_info:
                 if file_info["mime_type"].startswith("image"):
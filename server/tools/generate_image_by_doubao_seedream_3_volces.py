@@ -12,6 +12,10 @@ class GenerateImageByDoubaoSeedream3InputSchema(BaseModel):
     aspect_ratio: str = Field(
         description="Required. Aspect ratio of the image, only these values are allowed: 1:1, 16:9, 4:3, 3:4, 9:16. Choose the best fitting aspect ratio according to the prompt. Best ratio for posters is 3:4"
     )
+    num_images: int = Field(
+        default=1, ge=1, le=4,
+        description="Optional; Number of images to generate for the prompt, 1-4. Only ask for more than 1 when the user wants several variations to choose from."
+    )
     tool_call_id: Annotated[str, InjectedToolCallId]
 
 
@@ -23,6 +27,7 @@ async def generate_image_by_doubao_seedream_3_volces(
     aspect_ratio: str,
     config: RunnableConfig,
     tool_call_id: Annotated[str, InjectedToolCallId],
+    num_images: int = 1,
 ) -> str:
     """
     Generate an image using Doubao Seedream 3 model via the provider framework
@@ -38,6 +43,7 @@ async def generate_image_by_doubao_seedream_3_volces(
         model="volces/doubao-seedream-3-0-t2i-250415",
         prompt=prompt,
         aspect_ratio=aspect_ratio,
+        num_images=num_images,
         input_images=None,
     )
 
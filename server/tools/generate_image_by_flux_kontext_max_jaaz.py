@@ -15,6 +15,10 @@ class GenerateImageByFluxKontextMaxInputSchema(BaseModel):
         default=None,
         description="Optional; Image to use as reference. Only one image is allowed, e.g. ['im_jurheut7.png']. Best for image editing cases like: Editing specific parts of the image, Removing specific objects, Maintaining visual elements across scenes (character/object consistency), Generating new content in the style of the reference (style transfer), etc."
     )
+    num_images: int = Field(
+        default=1, ge=1, le=4,
+        description="Optional; Number of images to generate for the prompt, 1-4. Only ask for more than 1 when the user wants several variations to choose from."
+    )
     tool_call_id: Annotated[str, InjectedToolCallId]
 
 
@@ -27,6 +31,7 @@ async def generate_image_by_flux_kontext_max(
     config: RunnableConfig,
     tool_call_id: Annotated[str, InjectedToolCallId],
     input_images: list[str] | None = None,
+    num_images: int = 1,
 ) -> str:
     """
     Generate an image using Flux Kontext Max model via the provider framework
@@ -42,6 +47,7 @@ async def generate_image_by_flux_kontext_max(
         model="black-forest-labs/flux-kontext-max",
         prompt=prompt,
         aspect_ratio=aspect_ratio,
+        num_images=num_images,
         input_images=input_images,
     )
 
@@ -14,6 +14,7 @@ async def generate_image_by_flux_kontext_max_replicate(
     config: RunnableConfig,
     tool_call_id: Annotated[str, InjectedToolCallId],
     input_image: str | None = None,
+    num_images: int = 1,
 ) -> str:
     """
     Generate an image using Flux Kontext Max model via the Replicate provider framework
@@ -29,6 +30,7 @@ async def generate_image_by_flux_kontext_max_replicate(
         model="black-forest-labs/flux-kontext-max",
         prompt=prompt,
         aspect_ratio=aspect_ratio,
+        num_images=num_images,
         input_images=[input_image] if input_image else None,
     )
 
@@ -16,6 +16,10 @@ class GenerateImageByFluxKontextProInputSchema(BaseModel):
         default=None,
         description="Optional; Image to use as reference. Only one image is allowed, e.g. ['im_jurheut7.png']. Best for image editing cases like: Editing specific parts of the image, Removing specific objects, Maintaining visual elements across scenes (character/object consistency), Generating new content in the style of the reference (style transfer), etc."
     )
+    num_images: int = Field(
+        default=1, ge=1, le=4,
+        description="Optional; Number of images to generate for the prompt, 1-4. Only ask for more than 1 when the user wants several variations to choose from."
+    )
     tool_call_id: Annotated[str, InjectedToolCallId]
 
 
@@ -28,6 +32,7 @@ async def generate_image_by_flux_kontext_pro_jaaz(
     config: RunnableConfig,
     tool_call_id: Annotated[str, InjectedToolCallId],
     input_images: list[str] | None = None,
+    num_images: int = 1,
 ) -> str:
     ctx = config.get('configurable', {})
     canvas_id = ctx.get('canvas_id', '')
@@ -39,6 +44,7 @@ async def generate_image_by_flux_kontext_pro_jaaz(
         model='black-forest-labs/flux-kontext-pro',
         prompt=prompt,
         aspect_ratio=aspect_ratio,
+        num_images=num_images,
         input_images=input_images,
     )
 
@@ -14,6 +14,7 @@ async def generate_image_by_flux_kontext_pro_replicate(
     config: RunnableConfig,
     tool_call_id: Annotated[str, InjectedToolCallId],
     input_image: str | None = None,
+    num_images: int = 1,
 ) -> str:
     ctx = config.get('configurable', {})
     canvas_id = ctx.get('canvas_id', '')
@@ -25,6 +26,7 @@ async def generate_image_by_flux_kontext_pro_replicate(
         model='black-forest-labs/flux-kontext-pro',
         prompt=prompt,
         aspect_ratio=aspect_ratio,
+        num_images=num_images,
         input_images=[input_image] if input_image else None,
     )
 
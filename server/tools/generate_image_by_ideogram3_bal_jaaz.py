@@ -12,6 +12,10 @@ class GenerateImageByIdeogram3InputSchema(BaseModel):
     aspect_ratio: str = Field(
         description="Required. Aspect ratio of the image, only these values are allowed: 1:1, 16:9, 4:3, 3:4, 9:16. Choose the best fitting aspect ratio according to the prompt. Best ratio for posters is 3:4"
     )
+    num_images: int = Field(
+        default=1, ge=1, le=4,
+        description="Optional; Number of images to generate for the prompt, 1-4. Only ask for more than 1 when the user wants several variations to choose from."
+    )
     tool_call_id: Annotated[str, InjectedToolCallId]
 
 
@@ -23,6 +27,7 @@ async def generate_image_by_ideogram3_bal_jaaz(
     aspect_ratio: str,
     config: RunnableConfig,
     tool_call_id: Annotated[str, InjectedToolCallId],
+    num_images: int = 1,
 ) -> str:
     ctx = config.get('configurable', {})
     canvas_id = ctx.get('canvas_id', '')
@@ -34,6 +39,7 @@ async def generate_image_by_ideogram3_bal_jaaz(
         provider='jaaz',
         prompt=prompt,
         aspect_ratio=aspect_ratio,
+        num_images=num_images,
         model="ideogram-ai/ideogram-v3-balanced",
         input_images=None,
     )
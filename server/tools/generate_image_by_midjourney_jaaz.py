@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 from langchain_core.tools import tool, InjectedToolCallId  # type: ignore
 from langchain_core.runnables import RunnableConfig
 from services.jaaz_service import JaazService
+from services.generation_scheduler import generation_scheduler
 from tools.utils.image_canvas_utils import save_image_to_canvas, send_image_start_notification, send_image_error_notification
 from common import DEFAULT_PORT
 import os
@@ -64,10 +65,15 @@ async def generate_image_by_midjourney_jaaz(
 
         # Create Jaaz service and generate image
         jaaz_service = JaazService()
-        result = await jaaz_service.generate_image_by_midjourney(
-            prompt=prompt,
-            model="midjourney",
-            input_images=processed_input_images,
+        # Queued behind the Jaaz concurrency / rate limits
+        result = await generation_scheduler.run(
+            'jaaz',
+            session_id,
+            lambda: jaaz_service.generate_image_by_midjourney(
+                prompt=prompt,
+                model="midjourney",
+                input_images=processed_input_images,
+            ),
         )
 
         if not result:
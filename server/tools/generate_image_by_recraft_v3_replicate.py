@@ -13,6 +13,7 @@ async def generate_image_by_recraft_v3_replicate(
     aspect_ratio: str,
     config: RunnableConfig,
     tool_call_id: Annotated[str, InjectedToolCallId],
+    num_images: int = 1,
 ) -> str:
     """
     Generate an image using Recraft V3 model via the Replicate provider framework
@@ -27,6 +28,7 @@ async def generate_image_by_recraft_v3_replicate(
         model="recraft-ai/recraft-v3",
         prompt=prompt,
         aspect_ratio=aspect_ratio,
+        num_images=num_images,
         input_images=None,
     )
 
@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 from langchain_core.tools import tool, InjectedToolCallId  # type: ignore
 from langchain_core.runnables import RunnableConfig
 from services.jaaz_service import JaazService
+from services.generation_scheduler import generation_scheduler
 from tools.video_generation.video_canvas_utils import send_video_start_notification, process_video_result
 from .utils.image_utils import process_input_image
 
@@ -81,14 +82,19 @@ async def generate_video_by_seedance_v1_jaaz(
 
         # Create Jaaz service and generate video
         jaaz_service = JaazService()
-        result = await jaaz_service.generate_video_by_seedance(
-            prompt=prompt,
-            model="seedance-1.0-pro",
-            resolution=resolution,
-            duration=duration,
-            aspect_ratio=aspect_ratio,
-            input_images=processed_input_images,
-            camera_fixed=camera_fixed,
+        # Queued behind the Jaaz concurrency / rate limits
+        result = await generation_scheduler.run(
+            'jaaz',
+            session_id,
+            lambda: jaaz_service.generate_video_by_seedance(
+                prompt=prompt,
+                model="seedance-1.0-pro",
+                resolution=resolution,
+                duration=duration,
+                aspect_ratio=aspect_ratio,
+                input_images=processed_input_images,
+                camera_fixed=camera_fixed,
+            ),
         )
 
         video_url = result.get('result_url')
@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 from langchain_core.tools import tool, InjectedToolCallId  # type: ignore
 from langchain_core.runnables import RunnableConfig
 from services.jaaz_service import JaazService
+from services.generation_scheduler import generation_scheduler
 from tools.video_generation.video_canvas_utils import send_video_start_notification, process_video_result
 from services.tool_confirmation_manager import tool_confirmation_manager
 from services.websocket_service import send_to_websocket
@@ -65,9 +66,14 @@ async def generate_video_by_veo3_fast_jaaz(
 
         # Create Jaaz service and generate video
         jaaz_service = JaazService()
-        result = await jaaz_service.generate_video(
-            prompt=prompt,
-            model="veo3-fast",
+        # Queued behind the Jaaz concurrency / rate limits
+        result = await generation_scheduler.run(
+            'jaaz',
+            session_id,
+            lambda: jaaz_service.generate_video(
+                prompt=prompt,
+                model="veo3-fast",
+            ),
         )
 
         video_url = result.get('result_url')
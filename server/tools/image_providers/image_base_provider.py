@@ -27,4 +27,34 @@ class ImageProviderBase(ABC):
         Returns:
             Tuple[str, int, int, str]: (mime_type, width, height, filename)
         """
-        pass
\ No newline at end of file
+        pass
+
+    async def generate_images(
+        self,
+        prompt: str,
+        model: str,
+        aspect_ratio: str = "1:1",
+        input_images: Optional[list[str]] = None,
+        metadata: Optional[dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> list[Tuple[str, int, int, str]]:
+        """
+        Generate `num_images` images with one generate() call each, providers
+        that return several images in one request override this
+
+        Returns:
+            list[Tuple[str, int, int, str]]: (mime_type, width, height, filename) per image
+        """
+        num_images = max(1, int(kwargs.pop("num_images", 1)))
+        images: list[Tuple[str, int, int, str]] = []
+        # One after another, the generation scheduler counts the whole batch as one slot
+        for _ in range(num_images):
+            images.append(await self.generate(
+                prompt=prompt,
+                model=model,
+                aspect_ratio=aspect_ratio,
+                input_images=input_images,
+                metadata=metadata,
+                **kwargs
+            ))
+        return images
@@ -1,6 +1,5 @@
 import os
 import traceback
-import asyncio
 from typing import Optional, List, Any, Dict
 from pydantic import BaseModel
 from openai.types import Image
@@ -9,6 +8,8 @@ from ..utils.image_utils import get_image_info_and_save, generate_image_id
 from services.config_service import FILES_DIR
 from utils.http_client import HttpClient
 from services.config_service import config_service
+from services.task_poller import task_poller
+from services.generation_scheduler import RateLimitedError, raise_if_rate_limited
 
 
 class JaazImagesResponse(BaseModel):
@@ -104,21 +105,20 @@ class JaazImageProvider(ImageProviderBase):
 
     async def _wait_for_task_completion(self, prompt: str, max_wait_time: int = 300) -> Optional[Dict[str, Any]]:
         """
-        Wait for cloud task to complete
+        Wait for cloud task to complete, polled by the shared task poller
 
         Args:
             prompt: The generation prompt
-            model: The model used
             max_wait_time: Maximum wait time in seconds
 
         Returns:
             Task data if succeeded, None otherwise
         """
-        start_time = asyncio.get_event_loop().time()
         no_task_retry_count = 0
         max_no_task_retries = 5
 
-        while True:
+        async def check() -> Optional[Dict[str, Any]]:
+            nonlocal no_task_retry_count
             task = await self._search_cloud_task(prompt)
 
             if not task:
@@ -126,11 +126,8 @@ class JaazImageProvider(ImageProviderBase):
                 if no_task_retry_count <= max_no_task_retries:
                     print(
                         f'🦄 No cloud task found, retrying ({no_task_retry_count}/{max_no_task_retries})...')
-                    await asyncio.sleep(3)
-                    continue
-                else:
-                    print('🦄 No cloud task found after 5 retries')
                     return None
+                raise Exception(f'No cloud task found after {max_no_task_retries} retries')
 
             # Reset retry count when task is found
             no_task_retry_count = 0
@@ -142,21 +139,18 @@ class JaazImageProvider(ImageProviderBase):
                 print('🦄 Cloud task completed successfully')
                 return task
             elif status == 'failed':
-                print('🦄 Cloud task failed')
-                return None
+                raise Exception('Cloud task failed')
             elif status == 'processing':
-                # Check if we've exceeded max wait time
-                elapsed = asyncio.get_event_loop().time() - start_time
-                if elapsed > max_wait_time:
-                    print(
-                        f'🦄 Timeout waiting for cloud task completion ({max_wait_time}s)')
-                    return None
-
-                print('🦄 Cloud task still processing, waiting 2 seconds...')
-                await asyncio.sleep(2)
-            else:
-                print(f'🦄 Unknown cloud task status: {status}')
                 return None
+            else:
+                raise Exception(f'Unknown cloud task status: {status}')
+
+        try:
+            return await task_poller.wait(
+                f'jaaz-search:{prompt}', check, kind='jaaz_image', timeout=max_wait_time)
+        except Exception as e:
+            print(f'🦄 {e}')
+            return None
 
     async def _process_cloud_task_result(self, task: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None) -> tuple[str, int, int, str]:
         """
@@ -198,6 +192,7 @@ class JaazImageProvider(ImageProviderBase):
                 f'🦄 Jaaz API request: {url}, model: {data["model"]}, prompt: {data["prompt"]}')
 
             async with session.post(url, headers=headers, json=data) as response:
+                raise_if_rate_limited(response, 'Jaaz image generation')
                 if response.status != 200:
                     error_text = await response.text()
                     error_msg = f"HTTP {response.status}: {error_text}"
@@ -313,6 +308,9 @@ class JaazImageProvider(ImageProviderBase):
             res = await self._make_request(url, headers, data)
             return await self._process_response(res, "Jaaz", metadata)
 
+        except RateLimitedError:
+            # Nothing was submitted, no cloud task to recover, let the scheduler retry
+            raise
         except Exception as e:
             print(f'Error generating image with Jaaz: {e}')
             traceback.print_exc()
@@ -371,6 +369,9 @@ class JaazImageProvider(ImageProviderBase):
             res = await self._make_request(url, headers, data)
             return await self._process_response(res, "Jaaz OpenAI", metadata)
 
+        except RateLimitedError:
+            # Nothing was submitted, no cloud task to recover, let the scheduler retry
+            raise
         except Exception as e:
             print(f'Error generating image with Jaaz OpenAI: {e}')
             traceback.print_exc()
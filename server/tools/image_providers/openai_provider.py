@@ -1,110 +1,172 @@
+import asyncio
+import base64
+import hashlib
 import os
 import traceback
-from typing import Optional, Any
-from openai import OpenAI
+from typing import Optional, Any, Dict, Tuple
+import httpx
+from openai import AsyncOpenAI
 from .image_base_provider import ImageProviderBase
 from ..utils.image_utils import get_image_info_and_save, generate_image_id
 from services.config_service import FILES_DIR
 from services.config_service import config_service
+from utils.http_client import HttpClient
+
+# 单次图片请求的超时（秒），生成通常需要 20-60 秒
+OPENAI_IMAGE_TIMEOUT = float(os.getenv("OPENAI_IMAGE_TIMEOUT", 180))
+OPENAI_IMAGE_CONNECT_TIMEOUT = float(os.getenv("OPENAI_IMAGE_CONNECT_TIMEOUT", 10))
+OPENAI_IMAGE_MAX_RETRIES = int(os.getenv("OPENAI_IMAGE_MAX_RETRIES", 2))
+
+# Map aspect ratio to size
+SIZE_MAP = {
+    "1:1": "1024x1024",
+    "16:9": "1792x1024",
+    "9:16": "1024x1792",
+    "4:3": "1024x768",
+    "3:4": "768x1024"
+}
+
+
+def _data_url_to_file(data_url: str, index: int) -> Tuple[str, bytes, str]:
+    """data:image/png;base64,... -> (filename, bytes, mime_type) for multipart upload"""
+    header, b64_data = data_url.split(',', 1)
+    mime_type = header[len('data:'):].split(';')[0] or 'image/png'
+    extension = mime_type.split('/')[-1]
+    return f'input_{index}.{extension}', base64.b64decode(b64_data), mime_type
 
 
 class OpenAIImageProvider(ImageProviderBase):
     """OpenAI image generation provider implementation"""
 
+    def __init__(self) -> None:
+        # (api key hash, base url) -> (client, the shared httpx client it uses)
+        self._clients: Dict[Tuple[str, str], Tuple[AsyncOpenAI, httpx.AsyncClient]] = {}
+        config_service.add_update_listener(self._clear_clients)
+
+    async def _clear_clients(self) -> None:
+        # The httpx client is shared, dropping the references is enough
+        self._clients.clear()
+
+    def _get_client(self) -> AsyncOpenAI:
+        config = config_service.app_config.get('openai', {})
+        api_key = str(config.get("api_key", ""))
+        base_url = str(config.get("url", ""))  # 可选
+
+        if not api_key:
+            raise ValueError("OpenAI API key is not configured")
+
+        key = (hashlib.sha256(api_key.encode()).hexdigest(), base_url)
+        http_client = HttpClient.get_shared_client()
+        cached = self._clients.get(key)
+        # Rebuild if the shared client was closed or belongs to another event loop
+        if cached is not None and cached[1] is http_client:
+            return cached[0]
+
+        client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url or None,
+            timeout=httpx.Timeout(OPENAI_IMAGE_TIMEOUT, connect=OPENAI_IMAGE_CONNECT_TIMEOUT),
+            max_retries=OPENAI_IMAGE_MAX_RETRIES,
+            http_client=http_client,
+        )
+        self._clients[key] = (client, http_client)
+        return client
+
     async def generate(
         self,
         prompt: str,
         model: str,
         aspect_ratio: str = "1:1",
         input_images: Optional[list[str]] = None,
+        metadata: Optional[dict[str, Any]] = None,
         **kwargs: Any
     ) -> tuple[str, int, int, str]:
         """
         Generate image using OpenAI API
 
         Returns:
-            tuple[str, int, int, str]: (mime_type, width, height, filename)
+            tuple[str, int, int, str]: (mime_type, width, height, filename) of the first image
         """
+        images = await self.generate_images(
+            prompt, model, aspect_ratio, input_images, metadata, **kwargs)
+        return images[0]
 
-        config = config_service.app_config.get('openai', {})
-        self.api_key = str(config.get("api_key", ""))
-        self.base_url = str(config.get("url", ""))  # 可选
-
-        if not self.api_key:
-            raise ValueError("OpenAI API key is not configured")
+    async def generate_images(
+        self,
+        prompt: str,
+        model: str,
+        aspect_ratio: str = "1:1",
+        input_images: Optional[list[str]] = None,
+        metadata: Optional[dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> list[tuple[str, int, int, str]]:
+        """
+        Generate `num_images` images using OpenAI API
 
-        # Create OpenAI client
-        self.client = OpenAI(api_key=self.api_key,
-                             base_url=self.base_url or None)
+        Returns:
+            list[tuple[str, int, int, str]]: (mime_type, width, height, filename) per image
+        """
+        client = self._get_client()
+        num_images = kwargs.get("num_images", 1)
         try:
             # Remove openai/ prefix if present
             model = model.replace('openai/', '')
 
             # Determine if this is an edit operation or generation
             if input_images and len(input_images) > 0:
-                # Image editing mode
-                input_image_path = input_images[0]
-                # For OpenAI, input_image should be the file path
-                full_path = os.path.join(FILES_DIR, input_image_path)
-
-                with open(full_path, 'rb') as image_file:
-                    result = self.client.images.edit(
-                        model=model,
-                        image=image_file,
-                        prompt=prompt,
-                        n=kwargs.get("num_images", 1)
-                    )
+                # Image editing mode, input images are base64 data URLs
+                image_files = [_data_url_to_file(image, i) for i, image in enumerate(input_images)]
+                result = await client.images.edit(
+                    model=model,
+                    image=image_files if len(image_files) > 1 else image_files[0],
+                    prompt=prompt,
+                    n=num_images
+                )
             else:
                 # Image generation mode
-                # Map aspect ratio to size
-                size_map = {
-                    "1:1": "1024x1024",
-                    "16:9": "1792x1024",
-                    "9:16": "1024x1792",
-                    "4:3": "1024x768",
-                    "3:4": "768x1024"
-                }
-                size = size_map.get(aspect_ratio, "1024x1024")
-
-                result = self.client.images.generate(
+                size = SIZE_MAP.get(aspect_ratio, "1024x1024")
+
+                result = await client.images.generate(
                     model=model,
                     prompt=prompt,
-                    n=kwargs.get("num_images", 1),
-                    size=size,
+                    n=num_images,
+                    size=size,  # type: ignore
                 )
 
             # Process the result
             if not result.data or len(result.data) == 0:
                 raise Exception("No image data returned from OpenAI API")
 
-            image_data = result.data[0]
-
-            # Handle different response formats
-            if hasattr(image_data, 'b64_json') and image_data.b64_json:
-                # Base64 response
-                image_b64 = image_data.b64_json
-                image_id = generate_image_id()
-                mime_type, width, height, extension = await get_image_info_and_save(
-                    image_b64, os.path.join(FILES_DIR, f'{image_id}'), is_b64=True
-                )
-            elif hasattr(image_data, 'url') and image_data.url:
-                # URL response
-                image_url = image_data.url
-                image_id = generate_image_id()
-                mime_type, width, height, extension = await get_image_info_and_save(
-                    image_url, os.path.join(FILES_DIR, f'{image_id}')
-                )
-            else:
-                raise Exception("Invalid response format from OpenAI API")
-
-            # Ensure mime_type is not None
-            if mime_type is None:
-                raise Exception('Failed to determine image MIME type')
-
-            filename = f'{image_id}.{extension}'
-            return mime_type, width, height, filename
+            # Decode / download and save all images concurrently
+            return list(await asyncio.gather(*[
+                self._save_image(image_data, metadata) for image_data in result.data
+            ]))
 
         except Exception as e:
             print('Error generating image with OpenAI:', e)
             traceback.print_exc()
             raise e
+
+    @staticmethod
+    async def _save_image(image_data: Any, metadata: Optional[dict[str, Any]]) -> tuple[str, int, int, str]:
+        image_id = generate_image_id()
+        # Handle different response formats
+        if getattr(image_data, 'b64_json', None):
+            # Base64 response
+            mime_type, width, height, extension = await get_image_info_and_save(
+                image_data.b64_json, os.path.join(FILES_DIR, f'{image_id}'), is_b64=True, metadata=metadata
+            )
+        elif getattr(image_data, 'url', None):
+            # URL response
+            mime_type, width, height, extension = await get_image_info_and_save(
+                image_data.url, os.path.join(FILES_DIR, f'{image_id}'), metadata=metadata
+            )
+        else:
+            raise Exception("Invalid response format from OpenAI API")
+
+        # Ensure mime_type is not None
+        if mime_type is None:
+            raise Exception('Failed to determine image MIME type')
+
+        filename = f'{image_id}.{extension}'
+        return mime_type, width, height, filename
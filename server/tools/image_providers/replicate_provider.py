@@ -5,6 +5,7 @@ from .image_base_provider import ImageProviderBase
 from ..utils.image_utils import get_image_info_and_save, generate_image_id
 from services.config_service import FILES_DIR
 from utils.http_client import HttpClient
+from services.generation_scheduler import raise_if_rate_limited
 from services.config_service import config_service
 
 
@@ -39,6 +40,7 @@ class ReplicateImageProvider(ImageProviderBase):
             print(
                 f'🦄 Replicate API request: {url}, model: {data["input"]["prompt"]}')
             async with session.post(url, headers=headers, json=data) as response:
+                raise_if_rate_limited(response, 'Replicate image generation')
                 # Parse JSON data
                 json_data = await response.json()
                 print('🦄 Replicate API response', json_data)
@@ -11,6 +11,7 @@ from ..utils.image_utils import get_image_info_and_save, generate_image_id
 from tools.video_generation_utils import get_image_base64
 from services.config_service import FILES_DIR, config_service
 from utils.http_client import HttpClient
+from services.generation_scheduler import raise_if_rate_limited
 
 
 class VolcesImagesResponse(BaseModel):
@@ -139,6 +140,7 @@ class VolcesProvider(ImageProviderBase):
                     async with session.post(
                         url, headers=headers, json=payload
                     ) as response:
+                        raise_if_rate_limited(response, 'Volces image generation')
                         if response.status != 200:
                             try:
                                 error_data = await response.json()
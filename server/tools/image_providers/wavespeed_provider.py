@@ -1,5 +1,4 @@
 import os
-import asyncio
 import traceback
 from typing import Optional, Any
 from pydantic import BaseModel
@@ -7,6 +6,8 @@ from .image_base_provider import ImageProviderBase
 from ..utils.image_utils import get_image_info_and_save, generate_image_id
 from services.config_service import FILES_DIR, config_service
 from utils.http_client import HttpClient
+from services.generation_scheduler import raise_if_rate_limited
+from services.task_poller import task_poller, TaskPollTimeout
 
 
 class WavespeedResponse(BaseModel):
@@ -69,25 +70,29 @@ class WavespeedProvider(ImageProviderBase):
 
     async def _poll_for_result(self, result_url: str, headers: dict[str, str]) -> str:
         """Poll for image generation result"""
-        async with HttpClient.create_aiohttp() as session:
-            for _ in range(60):  # 最多等60秒
-                await asyncio.sleep(1)
+        async def check() -> Optional[str]:
+            async with HttpClient.create_aiohttp() as session:
                 async with session.get(result_url, headers=headers) as result_resp:
                     result_data = await result_resp.json()
-                    print("WaveSpeed polling result:", result_data)
+            print("WaveSpeed polling result:", result_data)
 
-                    data = result_data.get("data", {})
-                    outputs = data.get("outputs", [])
-                    status = data.get("status")
+            data = result_data.get("data", {})
+            outputs = data.get("outputs", [])
+            status = data.get("status")
 
-                    if status in ("succeeded", "completed") and outputs:
-                        return outputs[0]
+            if status in ("succeeded", "completed") and outputs:
+                return outputs[0]
 
-                    if status == "failed":
-                        raise Exception(
-                            f"WaveSpeed generation failed: {result_data}")
+            if status == "failed":
+                raise Exception(
+                    f"WaveSpeed generation failed: {result_data}")
+            return None
 
-            raise Exception("WaveSpeed image generation timeout")
+        try:
+            # 最多等60秒
+            return await task_poller.wait(f"wavespeed:{result_url}", check, kind='wavespeed_image', timeout=60)
+        except TaskPollTimeout as e:
+            raise Exception("WaveSpeed image generation timeout") from e
 
     async def generate(
         self,
@@ -119,6 +124,7 @@ class WavespeedProvider(ImageProviderBase):
 
             async with HttpClient.create_aiohttp() as session:
                 async with session.post(endpoint, json=payload, headers=headers) as response:
+                    raise_if_rate_limited(response, 'WaveSpeed image generation')
                     response_json = await response.json()
 
                     if response.status != 200 or response_json.get("code") != 200:
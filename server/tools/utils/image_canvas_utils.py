@@ -3,14 +3,13 @@ Canvas-related utilities for image generation
 Handles canvas operations, locking, and notifications
 """
 
-import asyncio
 import random
 import time
-import json
-from contextlib import asynccontextmanager
-from typing import Dict, List, Any, Optional, Union, cast
+from typing import Dict, Any, Optional
 from nanoid import generate
-from services.db_service import db_service
+from services.canvas_cache import canvas_cache
+from services.canvas_lock_manager import canvas_lock_manager
+from services.thumbnail_service import thumbnail_service
 from services.websocket_service import broadcast_session_update
 from services.websocket_service import send_to_websocket
 from utils.canvas import find_next_best_element_position
@@ -20,26 +19,6 @@ def generate_file_id() -> str:
     return 'im_' + generate(size=8)
 
 
-class CanvasLockManager:
-    """Canvas lock manager to prevent concurrent operations causing position overlap"""
-
-    def __init__(self) -> None:
-        self._locks: Dict[str, asyncio.Lock] = {}
-
-    @asynccontextmanager
-    async def lock_canvas(self, canvas_id: str):
-        if canvas_id not in self._locks:
-            self._locks[canvas_id] = asyncio.Lock()
-
-        async with self._locks[canvas_id]:
-            yield
-
-
-# Global lock manager instance
-canvas_lock_manager = CanvasLockManager()
-
-
-
 async def generate_new_image_element(
     canvas_id: str,
     fileid: str,
@@ -48,14 +27,9 @@ async def generate_new_image_element(
 ) -> Dict[str, Any]:
     """Generate new image element for canvas"""
     if canvas_data is None:
-        canvas = await db_service.get_canvas_data(canvas_id)
-        if canvas is None:
-            canvas = {"data": {}}
-        canvas_data = canvas.get("data", {})
-
-
-
-    new_x, new_y = await find_next_best_element_position(canvas_data)
+        new_x, new_y = await canvas_cache.next_element_position(canvas_id)
+    else:
+        new_x, new_y = await find_next_best_element_position(canvas_data)
 
     return {
         "type": "image",
@@ -93,30 +67,18 @@ async def generate_new_image_element(
 
 async def save_image_to_canvas(session_id: str, canvas_id: str, filename: str, mime_type: str, width: int, height: int) -> str:
     """Save image to canvas with proper locking and positioning"""
-    # Use lock to ensure atomicity of the save process
-    async with canvas_lock_manager.lock_canvas(canvas_id):
-        # Fetch canvas data once inside the lock
-        canvas: Optional[Dict[str, Any]] = await db_service.get_canvas_data(canvas_id)
-        if canvas is None:
-            canvas = {'data': {}}
-        canvas_data: Dict[str, Any] = canvas.get('data', {})
-
-        # Ensure 'elements' and 'files' keys exist
-        if 'elements' not in canvas_data:
-            canvas_data['elements'] = []
-        if 'files' not in canvas_data:
-            canvas_data['files'] = {}
-
-        file_id = generate_file_id()
-        url = f'/api/file/{filename}'
-
-        file_data: Dict[str, Any] = {
-            'mimeType': mime_type,
-            'id': file_id,
-            'dataURL': url,
-            'created': int(time.time() * 1000),
-        }
+    file_id = generate_file_id()
+    url = f'/api/file/{filename}'
+
+    file_data: Dict[str, Any] = {
+        'mimeType': mime_type,
+        'id': file_id,
+        'dataURL': url,
+        'created': int(time.time() * 1000),
+    }
 
+    # Only the position computation and append need to be atomic
+    async with canvas_lock_manager.lock_canvas(canvas_id):
         new_image_element: Dict[str, Any] = await generate_new_image_element(
             canvas_id,
             file_id,
@@ -124,28 +86,25 @@ async def save_image_to_canvas(session_id: str, canvas_id: str, filename: str, m
                 'width': width,
                 'height': height,
             },
-            canvas_data
         )
 
-        # Update the canvas data with the new element and file info
-        elements_list = cast(List[Dict[str, Any]], canvas_data['elements'])
-        elements_list.append(new_image_element)
-        canvas_data['files'][file_id] = file_data
+        # Apply in memory, the cache writes the patch back to the database
+        await canvas_cache.append_elements(canvas_id, [new_image_element], {file_id: file_data})
 
-        image_url = f"/api/file/{filename}"
+    image_url = f"/api/file/{filename}"
 
-        # Save the updated canvas data back to the database
-        await db_service.save_canvas_data(canvas_id, json.dumps(canvas_data))
+    # Render the preview width the canvas list / chat ask for before they load it
+    thumbnail_service.precompute(filename)
 
-        # Broadcast image generation message to frontend
-        await broadcast_session_update(session_id, canvas_id, {
-            'type': 'image_generated',
-            'element': new_image_element,
-            'file': file_data,
-            'image_url': image_url,
-        })
+    # Broadcast image generation message to frontend
+    await broadcast_session_update(session_id, canvas_id, {
+        'type': 'image_generated',
+        'element': new_image_element,
+        'file': file_data,
+        'image_url': image_url,
+    })
 
-        return image_url
+    return image_url
 
 
 async def send_image_start_notification(session_id: str, message: str) -> None:
@@ -5,6 +5,7 @@ Contains the main orchestration logic for image generation across different prov
 
 from typing import Optional, Dict, Any
 from common import DEFAULT_PORT
+from services.generation_scheduler import generation_scheduler
 from tools.utils.image_utils import process_input_image
 from ..image_providers.image_base_provider import ImageProviderBase
 
@@ -39,6 +40,7 @@ async def generate_image_with_provider(
     prompt: str,
     aspect_ratio: str = "1:1",
     input_images: Optional[list[str]] = None,
+    num_images: int = 1,
 ) -> str:
     """
     通用图像生成函数，支持不同的模型和提供商
@@ -51,6 +53,7 @@ async def generate_image_with_provider(
         tool_call_id: 工具调用ID
         config: 上下文运行配置，包含canvas_id，session_id，model_info，由langgraph注入
         input_images: 可选的输入参考图像列表
+        num_images: 生成图像数量，支持的提供商一次请求返回多张
 
     Returns:
         str: 生成结果消息
@@ -80,18 +83,33 @@ async def generate_image_with_provider(
         "input_images": input_images or [],
     }
 
-    # Generate image using the selected provider
-    mime_type, width, height, filename = await provider_instance.generate(
-        prompt=prompt,
-        model=model,
-        aspect_ratio=aspect_ratio,
-        input_images=processed_input_images,
-        metadata=metadata,
-    )
-
-    # Save image to canvas
-    image_url = await save_image_to_canvas(
-        session_id, canvas_id, filename, mime_type, width, height
-    )
-
-    return f"image generated successfully ![image_id: {filename}](http://localhost:{DEFAULT_PORT}{image_url})"
+    # Generate image using the selected provider, queued behind its concurrency / rate limits
+    async def _generate() -> list[tuple[str, int, int, str]]:
+        if num_images > 1:
+            return await provider_instance.generate_images(
+                prompt=prompt,
+                model=model,
+                aspect_ratio=aspect_ratio,
+                input_images=processed_input_images,
+                metadata=metadata,
+                num_images=num_images,
+            )
+        return [await provider_instance.generate(
+            prompt=prompt,
+            model=model,
+            aspect_ratio=aspect_ratio,
+            input_images=processed_input_images,
+            metadata=metadata,
+        )]
+
+    images = await generation_scheduler.run(provider, session_id, _generate)
+
+    # Save images to canvas
+    results: list[str] = []
+    for mime_type, width, height, filename in images:
+        image_url = await save_image_to_canvas(
+            session_id, canvas_id, filename, mime_type, width, height
+        )
+        results.append(f"![image_id: {filename}](http://localhost:{DEFAULT_PORT}{image_url})")
+
+    return f"image generated successfully {' '.join(results)}"
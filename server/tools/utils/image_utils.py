@@ -1,13 +1,10 @@
 import os
-import traceback
-from PIL import Image, PngImagePlugin
-from io import BytesIO
-import base64
-import json
 from typing import Any, Optional, Tuple
 from nanoid import generate
 from utils.http_client import HttpClient
+from utils.image_processing import run_image_task, save_generated_image, encode_image_file_base64
 from services.config_service import FILES_DIR
+from services.settings_service import settings_service
 
 
 def generate_image_id() -> str:
@@ -22,20 +19,23 @@ async def get_image_info_and_save(
     metadata: Optional[dict[str, Any]] = None
 ) -> Tuple[str, int, int, str]:
     """
-    Download image from URL or decode base64, convert to PNG and save with metadata
+    Download image from URL or decode base64, convert and save with metadata
+
+    The output format comes from the `image_output_format` setting (PNG by default).
 
     Args:
         url: Image URL or base64 string
         file_path_without_extension: File path without extension
         is_b64: Whether the url is a base64 string
-        metadata: Optional metadata to be saved in PNG info
+        metadata: Optional metadata, saved in PNG info or EXIF ImageDescription
 
     Returns:
-        tuple[str, int, int, str]: (mime_type, width, height, extension) - always PNG
+        tuple[str, int, int, str]: (mime_type, width, height, extension)
     """
     try:
         if is_b64:
-            image_data = base64.b64decode(url)
+            # Decoded inside the image worker process
+            image_data: bytes | str = url
         else:
             # Fetch the image asynchronously
             async with HttpClient.create_aiohttp() as session:
@@ -43,78 +43,14 @@ async def get_image_info_and_save(
                     # Read the image content as bytes
                     image_data = await response.read()
 
-        # Open image to get info
-        image = Image.open(BytesIO(image_data))
-        width, height = image.size
-        
-        # Store original format for debugging
-        original_format = image.format or 'Unknown'
-        print(f"Converting {original_format} image to PNG: {width}x{height}")
-
-        # Handle different color modes properly for PNG conversion
-        if image.mode == 'P':
-            # Palette mode - convert to RGBA to preserve potential transparency
-            if 'transparency' in image.info:
-                image = image.convert('RGBA')
-            else:
-                image = image.convert('RGB')
-        elif image.mode == 'LA':
-            # Grayscale with alpha - convert to RGBA
-            image = image.convert('RGBA')
-        elif image.mode == 'L':
-            # Grayscale - can stay as L or convert to RGB
-            # PNG supports grayscale, so we can keep it
-            pass
-        elif image.mode == 'CMYK':
-            # CMYK mode - convert to RGB
-            image = image.convert('RGB')
-        elif image.mode in ('RGB', 'RGBA'):
-            # Already compatible with PNG
-            pass
-        else:
-            # For any other modes, convert to RGB as a safe fallback
-            print(f"Warning: Unusual color mode {image.mode}, converting to RGB")
-            image = image.convert('RGB')
-
-        # Unified format: always PNG
-        extension = 'png'
-        mime_type = 'image/png'
-
-        # Prepare PNG info for metadata
-        pnginfo = PngImagePlugin.PngInfo()
-        
-        # Add original format info
-        pnginfo.add_text("original_format", original_format)
-        
-        if metadata:
-            for key, value in metadata.items():
-                try:
-                    # Handle different value types
-                    if isinstance(value, (dict, list)):
-                        # Serialize complex types as JSON
-                        text_value = json.dumps(value, ensure_ascii=False)
-                    elif value is None:
-                        text_value = "null"
-                    else:
-                        # Convert to string
-                        text_value = str(value)
-                    
-                    pnginfo.add_text(str(key), text_value)
-                except Exception as e:
-                    print(f"Warning: Failed to add metadata key '{key}': {e}")
-                    traceback.print_stack()
-
-        # Save as PNG with metadata
-        file_path = f"{file_path_without_extension}.{extension}"
-        
-        # Save with optimizations and metadata
-        if metadata or original_format != 'PNG':
-            image.save(file_path, format='PNG', optimize=True, pnginfo=pnginfo)
-        else:
-            image.save(file_path, format='PNG', optimize=True)
-        
-        print(f"Successfully saved as PNG: {file_path}")
-        return mime_type, width, height, extension
+        # Decode / convert / encode off the event loop
+        return await run_image_task(
+            save_generated_image,
+            image_data,
+            file_path_without_extension,
+            metadata,
+            settings_service.get_image_output_format(),
+        )
 
     except Exception as e:
         print(f"Error processing image: {e}")
@@ -153,20 +89,19 @@ async def process_input_image(input_image: str | None) -> str | None:
             print(f"Warning: Image file not found: {full_path}")
             return None
 
-        image = Image.open(full_path)
         ext = os.path.splitext(input_image)[1].lower()
         mime_type_map = {
             '.png': 'image/png',
             '.jpg': 'image/jpeg',
             '.jpeg': 'image/jpeg',
-            '.webp': 'image/webp'
+            '.webp': 'image/webp',
+            '.avif': 'image/avif',
         }
         mime_type = mime_type_map.get(ext, 'image/jpeg')
 
-        with BytesIO() as output:
-            image.save(output, format=str(mime_type.split('/')[1]).upper())
-            compressed_data = output.getvalue()
-            b64_data = base64.b64encode(compressed_data).decode('utf-8')
+        b64_data = await run_image_task(
+            encode_image_file_base64, full_path, str(mime_type.split('/')[1]).upper()
+        )
 
         data_url = f"data:{mime_type};base64,{b64_data}"
         return data_url
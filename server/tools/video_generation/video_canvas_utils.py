@@ -3,18 +3,16 @@ Video canvas utilities module
 Contains functions for video processing, canvas operations, and notifications
 """
 
-import json
 import time
 import os
 import asyncio
-from contextlib import asynccontextmanager
 from typing import Dict, List, Any, Tuple, Optional, Union
 from services.config_service import FILES_DIR
-from services.db_service import db_service
+from services.canvas_cache import canvas_cache
+from services.canvas_lock_manager import canvas_lock_manager
 from services.websocket_service import send_to_websocket, broadcast_session_update  # type: ignore
 from common import DEFAULT_PORT
-from utils.http_client import HttpClient
-import aiofiles
+from utils.downloader import download_to_file
 import mimetypes
 from pymediainfo import MediaInfo
 from nanoid import generate
@@ -22,25 +20,6 @@ import random
 from utils.canvas import find_next_best_element_position
 
 
-class CanvasLockManager:
-    """Canvas lock manager to prevent concurrent operations causing position overlap"""
-
-    def __init__(self) -> None:
-        self._locks: Dict[str, asyncio.Lock] = {}
-
-    @asynccontextmanager
-    async def lock_canvas(self, canvas_id: str):
-        if canvas_id not in self._locks:
-            self._locks[canvas_id] = asyncio.Lock()
-
-        async with self._locks[canvas_id]:
-            yield
-
-
-# Global lock manager instance
-canvas_lock_manager = CanvasLockManager()
-
-
 async def save_video_to_canvas(
     session_id: str,
     canvas_id: str,
@@ -49,6 +28,10 @@ async def save_video_to_canvas(
     """
     Download video, save to files, create canvas element and return data
 
+    Runs in two phases: the video is fetched, probed and stored without any
+    lock, then the canvas lock is taken only to place and append the element,
+    so parallel generations on one canvas download concurrently.
+
     Args:
         session_id: Session ID for notifications
         canvas_id: Canvas ID to add video element
@@ -57,32 +40,12 @@ async def save_video_to_canvas(
     Returns:
         Tuple of (filename, file_data, new_video_element)
     """
-    # Use lock to ensure atomicity of the save process
-    async with canvas_lock_manager.lock_canvas(canvas_id):
-        # Generate unique video ID
-        video_id = generate_video_file_id()
-
-        # Download and save video
-        print(f"🎥 Downloading video from: {video_url}")
-        mime_type, width, height, extension = await get_video_info_and_save(
-            video_url, os.path.join(FILES_DIR, f"{video_id}")
-        )
-        filename = f"{video_id}.{extension}"
-
-        print(f"🎥 Video saved as: {filename}, dimensions: {width}x{height}")
-
-        # Create file data
-        file_id = generate_video_file_id()
-        file_url = f"/api/file/{filename}"
-
-        file_data: Dict[str, Any] = {
-            "mimeType": mime_type,
-            "id": file_id,
-            "dataURL": file_url,
-            "created": int(time.time() * 1000),
-        }
+    # Phase 1: fetch / probe / store, unlocked
+    filename, file_data, width, height = await store_video_asset(video_url)
 
-        # Create new video element for canvas
+    # Phase 2: place and commit the element under the canvas lock
+    file_id = file_data["id"]
+    async with canvas_lock_manager.lock_canvas(canvas_id):
         new_video_element: Dict[str, Any] = await generate_new_video_element(
             canvas_id,
             file_id,
@@ -92,25 +55,42 @@ async def save_video_to_canvas(
             },
         )
 
-        # Update canvas data
-        canvas_data: Optional[Dict[str, Any]] = await db_service.get_canvas_data(canvas_id)
-        if canvas_data is None:
-            canvas_data = {}
-        if "data" not in canvas_data:
-            canvas_data["data"] = {}
-        if "elements" not in canvas_data["data"]:
-            canvas_data["data"]["elements"] = []
-        if "files" not in canvas_data["data"]:
-            canvas_data["data"]["files"] = {}
+        # Apply in memory, the cache writes the patch back to the database
+        await canvas_cache.append_elements(canvas_id, [new_video_element], {file_id: file_data})
+
+    return filename, file_data, new_video_element
 
-        canvas_data["data"]["elements"].append(
-            new_video_element)  # type: ignore
-        canvas_data["data"]["files"][file_id] = file_data
 
-        # Save updated canvas data
-        await db_service.save_canvas_data(canvas_id, json.dumps(canvas_data["data"]))
+async def store_video_asset(video_url: str) -> Tuple[str, Dict[str, Any], int, int]:
+    """
+    Download a video into FILES_DIR and probe its dimensions
 
-        return filename, file_data, new_video_element
+    Returns:
+        Tuple of (filename, file_data, width, height)
+    """
+    # Generate unique video ID
+    video_id = generate_video_file_id()
+
+    # Download and save video
+    print(f"🎥 Downloading video from: {video_url}")
+    mime_type, width, height, extension = await get_video_info_and_save(
+        video_url, os.path.join(FILES_DIR, f"{video_id}")
+    )
+    filename = f"{video_id}.{extension}"
+
+    print(f"🎥 Video saved as: {filename}, dimensions: {width}x{height}")
+
+    # Create file data
+    file_id = generate_video_file_id()
+    file_url = f"/api/file/{filename}"
+
+    file_data: Dict[str, Any] = {
+        "mimeType": mime_type,
+        "id": file_id,
+        "dataURL": file_url,
+        "created": int(time.time() * 1000),
+    }
+    return filename, file_data, width, height
 
 
 async def send_video_start_notification(session_id: str, message: str) -> None:
@@ -207,19 +187,14 @@ def generate_video_file_id() -> str:
 async def get_video_info_and_save(
     url: str, file_path_without_extension: str
 ) -> Tuple[str, int, int, str]:
-    # Fetch the video asynchronously
-    async with HttpClient.create_aiohttp() as session:
-        async with session.get(url) as response:
-            video_content = await response.read()
-
-    # Save to temporary mp4 file first
+    # Stream the video to disk instead of buffering it in memory
     temp_path = f"{file_path_without_extension}.mp4"
-    async with aiofiles.open(temp_path, "wb") as out_file:
-        await out_file.write(video_content)
+    await download_to_file(url, temp_path)
     print("🎥 Video saved to", temp_path)
 
     try:
-        media_info = MediaInfo.parse(temp_path)  # type: ignore
+        # MediaInfo.parse is blocking, keep it off the event loop
+        media_info = await asyncio.to_thread(MediaInfo.parse, temp_path)  # type: ignore
         width: int = 0
         height: int = 0
 
@@ -253,12 +228,9 @@ async def generate_new_video_element(
 ) -> Dict[str, Any]:
     """Generate new video element for canvas"""
     if canvas_data is None:
-        canvas = await db_service.get_canvas_data(canvas_id)
-        if canvas is None:
-            canvas = {"data": {}}
-        canvas_data = canvas.get("data", {})
-
-    new_x, new_y = await find_next_best_element_position(canvas_data)
+        new_x, new_y = await canvas_cache.next_element_position(canvas_id)
+    else:
+        new_x, new_y = await find_next_best_element_position(canvas_data)
 
     return {
         "type": "video",
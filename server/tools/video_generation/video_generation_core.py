@@ -6,6 +6,7 @@ Contains the main orchestration logic for video generation across different prov
 import traceback
 from typing import List, cast, Optional, Any
 from models.config_model import ModelInfo
+from services.generation_scheduler import generation_scheduler
 from ..video_providers.video_base_provider import get_default_provider, VideoProviderBase
 # Import all providers to ensure automatic registration (don't delete these imports)
 from ..video_providers.volces_provider import VolcesVideoProvider  # type: ignore
@@ -88,16 +89,20 @@ async def generate_video_with_provider(
             # For now, just pass them as is
             processed_input_images = input_images
 
-        # Generate video using the selected provider
-        video_url = await provider_instance.generate(
-            prompt=prompt,
-            model=model,
-            resolution=resolution,
-            duration=duration,
-            aspect_ratio=aspect_ratio,
-            input_images=processed_input_images,
-            camera_fixed=camera_fixed,
-            **kwargs
+        # Generate video using the selected provider, queued behind its concurrency / rate limits
+        video_url = await generation_scheduler.run(
+            provider_name,
+            session_id,
+            lambda: provider_instance.generate(
+                prompt=prompt,
+                model=model,
+                resolution=resolution,
+                duration=duration,
+                aspect_ratio=aspect_ratio,
+                input_images=processed_input_images,
+                camera_fixed=camera_fixed,
+                **kwargs
+            ),
         )
 
         # Process video result (save, update canvas, notify)
@@ -1,11 +1,16 @@
 import json
+import os
 import traceback
-import asyncio
 from typing import Optional, Dict, Any, List
 
 from .video_base_provider import VideoProviderBase
 from utils.http_client import HttpClient
 from services.config_service import config_service
+from services.task_poller import task_poller
+from services.generation_scheduler import raise_if_rate_limited
+
+# 视频生成最长等待时间（秒）
+VOLCES_VIDEO_TIMEOUT = float(os.getenv("VOLCES_VIDEO_TIMEOUT", 900))
 
 
 class VolcesVideoProvider(VideoProviderBase, provider_name="volces"):
@@ -87,36 +92,35 @@ class VolcesVideoProvider(VideoProviderBase, provider_name="volces"):
 
         return payload
 
-    async def _poll_task_status(self, task_id: str, headers: Dict[str, str]) -> str:
-        """Poll task status until completion"""
+    async def _poll_task_status(self, task_id: str, headers: Dict[str, str], model: Optional[str] = None) -> str:
+        """Poll task status until completion, on the shared task poller"""
         polling_url = f"{self.base_url}/contents/generations/tasks/{task_id}"
-        status = "submitted"
-
-        async with HttpClient.create_aiohttp() as session:
-            while status not in ("succeeded", "failed", "cancelled"):
-                print(
-                    f"🎥 Polling Volces generation {task_id}, current status: {status} ...")
-                await asyncio.sleep(3)  # Wait 3 seconds between polls
 
+        async def check() -> Optional[str]:
+            async with HttpClient.create_aiohttp() as session:
                 async with session.get(polling_url, headers=headers) as poll_response:
                     poll_res = await poll_response.json()
-                    status = poll_res.get("status", None)
-
-                    if status == "succeeded":
-                        output = poll_res.get(
-                            "content", {}).get("video_url", None)
-                        if output and isinstance(output, str):
-                            return output
-                        else:
-                            raise Exception(
-                                "No video URL found in successful response")
-                    elif status in ("failed", "cancelled"):
-                        detail_error = poll_res.get(
-                            "detail", f"Task failed with status: {status}")
-                        raise Exception(
-                            f"Volces video generation failed: {detail_error}")
+            status = poll_res.get("status", None)
+            print(
+                f"🎥 Polling Volces generation {task_id}, current status: {status} ...")
+
+            if status == "succeeded":
+                output = poll_res.get(
+                    "content", {}).get("video_url", None)
+                if output and isinstance(output, str):
+                    return output
+                else:
+                    raise Exception(
+                        "No video URL found in successful response")
+            elif status in ("failed", "cancelled"):
+                detail_error = poll_res.get(
+                    "detail", f"Task failed with status: {status}")
+                raise Exception(
+                    f"Volces video generation failed: {detail_error}")
+            return None
 
-        raise Exception(f"Task polling failed with final status: {status}")
+        return await task_poller.wait(
+            f"volces:{task_id}", check, kind=f"volces_video:{model or self.model_name}", timeout=VOLCES_VIDEO_TIMEOUT)
 
     async def generate(
         self,
@@ -161,6 +165,7 @@ class VolcesVideoProvider(VideoProviderBase, provider_name="volces"):
             # Make API request to create task
             async with HttpClient.create_aiohttp() as session:
                 async with session.post(api_url, headers=headers, json=payload) as response:
+                    raise_if_rate_limited(response, 'Volces video generation')
                     if response.status != 200:
                         try:
                             error_data = await response.json()
@@ -183,7 +188,7 @@ class VolcesVideoProvider(VideoProviderBase, provider_name="volces"):
                     f"🎥 Volces video generation task created, task_id: {task_id}")
 
             # Poll for task completion
-            video_url = await self._poll_task_status(task_id, headers)
+            video_url = await self._poll_task_status(task_id, headers, model)
             print(
                 f"🎥 Volces video generation completed, video URL: {video_url}")
 
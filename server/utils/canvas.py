@@ -1,58 +1,136 @@
-from typing import Optional, Dict, Any, Union
-from services.db_service import db_service
+import heapq
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Tuple
+
+MEDIA_ELEMENT_TYPES = ("image", "embeddable", "video")
+
+
+def is_media_element(element: Dict[str, Any]) -> bool:
+    return element.get("type") in MEDIA_ELEMENT_TYPES and not element.get("isDeleted")
+
+
+class _Row:
+    __slots__ = ("seq", "top", "bottom", "count", "sum_y", "rightmost", "version")
+
+    def __init__(self, seq: int, element: Dict[str, Any]) -> None:
+        y = element.get("y", 0)
+        self.seq = seq
+        self.top = y
+        self.bottom = y + element.get("height", 0)
+        self.count = 1
+        self.sum_y = y
+        self.rightmost = element
+        self.version = 0
+
+    @property
+    def average_y(self) -> float:
+        return self.sum_y / self.count
+
+
+class ElementRowIndex:
+    """
+    Row bucket index of the media elements on a canvas.
+
+    Elements that vertically overlap are grouped into rows. Rows are kept
+    sorted by their top edge, so placing a new element only looks at rows
+    whose span can reach it (binary search + the tallest row height) instead
+    of scanning every element, and the bottom-most row is tracked with a heap.
+    Built once per canvas and then updated incrementally with `add`.
+    """
+
+    def __init__(self, elements: Iterable[Dict[str, Any]] = ()) -> None:
+        self._tops: List[float] = []
+        self._rows: List[_Row] = []
+        self._max_row_height: float = 0
+        # (-average_y, -seq, version, row), stale entries are skipped lazily
+        self._heap: List[Tuple[float, int, int, _Row]] = []
+        self._next_seq = 0
+
+        media_elements = [e for e in elements if is_media_element(e)]
+        media_elements.sort(key=lambda e: (e.get("y", 0), e.get("x", 0)))
+        for element in media_elements:
+            self.add(element)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _find_row(self, y: float, bottom: float) -> int:
+        """Index of the top-most row vertically overlapping [y, bottom), -1 if none"""
+        start = bisect_right(self._tops, y - self._max_row_height)
+        end = bisect_left(self._tops, bottom)
+        for i in range(start, end):
+            row = self._rows[i]
+            if max(y, row.top) < min(bottom, row.bottom):
+                return i
+        return -1
+
+    def _push(self, row: _Row) -> None:
+        row.version += 1
+        heapq.heappush(self._heap, (-row.average_y, -row.seq, row.version, row))
+
+    def add(self, element: Dict[str, Any]) -> None:
+        """Add a media element (non-media and deleted elements are ignored)"""
+        if not is_media_element(element):
+            return
+        y = element.get("y", 0)
+        bottom = y + element.get("height", 0)
+
+        i = self._find_row(y, bottom)
+        if i < 0:
+            row = _Row(self._next_seq, element)
+            self._next_seq += 1
+            i = bisect_right(self._tops, row.top)
+            self._tops.insert(i, row.top)
+            self._rows.insert(i, row)
+        else:
+            row = self._rows[i]
+            row.count += 1
+            row.sum_y += y
+            row.bottom = max(row.bottom, bottom)
+            if element.get("x", 0) >= row.rightmost.get("x", 0):
+                row.rightmost = element
+            if y < row.top:
+                # Keep rows sorted by their top edge
+                del self._tops[i]
+                del self._rows[i]
+                row.top = y
+                j = bisect_right(self._tops, y)
+                self._tops.insert(j, y)
+                self._rows.insert(j, row)
+
+        self._max_row_height = max(self._max_row_height, row.bottom - row.top)
+        self._push(row)
+
+    def _last_row(self) -> _Row:
+        while True:
+            _, _, version, row = self._heap[0]
+            if version == row.version:
+                return row
+            heapq.heappop(self._heap)
+
+    def next_position(self, max_num_per_row: int = 4, spacing: int = 20) -> Tuple[float, float]:
+        if not self._rows:
+            return 0, 0
+
+        last_row = self._last_row()
+        if last_row.count < max_num_per_row:
+            # Add to the last row, aligned with its top
+            rightmost_element = last_row.rightmost
+            new_x = rightmost_element.get("x", 0) + rightmost_element.get("width", 0) + spacing
+            new_y = last_row.top
+        else:
+            # Start a new row below the entire last row
+            new_x = 0
+            new_y = last_row.bottom + spacing
+
+        return new_x, new_y
+
 
 async def find_next_best_element_position(canvas_data, max_num_per_row=4, spacing=20):
     """
     Calculates the next best position for a new element on the canvas.
-    This final version uses a robust row detection algorithm to handle complex layouts.
+    Builds a one-off ElementRowIndex; long-lived canvases should keep an
+    index around and call `next_position` on it instead.
     """
     elements = canvas_data.get("elements", [])
-    
-    media_elements = [
-        e for e in elements 
-        if e.get("type") in ["image", "embeddable", "video"] and not e.get("isDeleted")
-    ]
-
-    if not media_elements:
-        return 0, 0
-
-    # Sort elements by their top-left corner
-    media_elements.sort(key=lambda e: (e.get("y", 0), e.get("x", 0)))
-
-    # Group elements into rows based on vertical overlap
-    rows = []
-    for element in media_elements:
-        y, height = element.get("y", 0), element.get("height", 0)
-        placed = False
-        for row in rows:
-            # Check if the element vertically overlaps with any element in the row
-            if any(max(y, r.get("y", 0)) < min(y + height, r.get("y", 0) + r.get("height", 0)) for r in row):
-                row.append(element)
-                placed = True
-                break
-        if not placed:
-            rows.append([element])
-
-    # Sort rows by their average y-coordinate
-    rows.sort(key=lambda row: sum(e.get("y", 0) for e in row) / len(row))
-
-    if not rows:
-        return 0, 0
-
-    last_row = rows[-1]
-    last_row.sort(key=lambda e: e.get("x", 0))
-
-    if len(last_row) < max_num_per_row:
-        # Add to the last row
-        rightmost_element = last_row[-1]
-        new_x = rightmost_element.get("x", 0) + rightmost_element.get("width", 0) + spacing
-        # Align with the top of the last row for consistency
-        new_y = min(e.get("y", 0) for e in last_row)
-    else:
-        # Start a new row
-        new_x = 0
-        # Position below the entire last row
-        bottom_of_last_row = max(e.get("y", 0) + e.get("height", 0) for e in last_row)
-        new_y = bottom_of_last_row + spacing
-
-    return new_x, new_y
\ No newline at end of file
+    return ElementRowIndex(elements).next_position(max_num_per_row, spacing)
@@ -0,0 +1,133 @@
+"""
+Streaming file downloader
+
+Downloads large generated files (videos etc.) without reading the whole
+body into memory with `await response.read()`:
+- chunks are written to a temporary `.part` file, atomically renamed to the
+  destination once complete
+- an interrupted download resumes from the written offset with an HTTP Range
+  request (restarting from scratch if the server ignores it)
+- Content-Length and an optional sha256 are verified
+- concurrent downloads are limited globally (DOWNLOAD_CONCURRENCY env var)
+
+Usage:
+    sha256 = await download_to_file(url, "/path/to/file.mp4")
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+from typing import Optional
+
+import aiofiles
+import aiohttp
+
+from utils.http_client import HttpClient
+
+DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", 4))
+DOWNLOAD_CHUNK_SIZE = 1 << 16
+DOWNLOAD_MAX_RETRIES = 3
+
+_download_semaphore: Optional[asyncio.Semaphore] = None
+
+
+class DownloadError(Exception):
+    """Download failed or the downloaded file didn't verify"""
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _download_semaphore
+    if _download_semaphore is None:
+        _download_semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+    return _download_semaphore
+
+
+def _total_size(response: aiohttp.ClientResponse, offset: int) -> Optional[int]:
+    """Full size of the remote file, from Content-Range or Content-Length"""
+    content_range = response.headers.get("Content-Range")
+    if content_range:
+        match = re.match(r"bytes \d+-\d+/(\d+)", content_range)
+        if match:
+            return int(match.group(1))
+    if response.content_length is not None:
+        return offset + response.content_length
+    return None
+
+
+async def download_to_file(
+    url: str,
+    dest_path: str,
+    expected_sha256: Optional[str] = None,
+    max_retries: int = DOWNLOAD_MAX_RETRIES,
+) -> str:
+    """Stream `url` into `dest_path`, returns the sha256 hex digest of the file"""
+    part_path = f"{dest_path}.part"
+    hasher = hashlib.sha256()
+    offset = 0
+    total_size: Optional[int] = None
+    last_error: Optional[Exception] = None
+    completed = False
+    renamed = False
+
+    try:
+        async with _get_semaphore():
+            async with HttpClient.create_aiohttp() as session:
+                for attempt in range(max_retries + 1):
+                    headers = {"Range": f"bytes={offset}-"} if offset > 0 else {}
+                    try:
+                        async with session.get(url, headers=headers) as response:
+                            if offset > 0 and response.status == 200:
+                                # Server ignored the Range header, start over
+                                offset = 0
+                                hasher = hashlib.sha256()
+                            response.raise_for_status()
+                            total_size = _total_size(response, offset)
+
+                            mode = "ab" if offset > 0 else "wb"
+                            async with aiofiles.open(part_path, mode) as out_file:
+                                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                                    await out_file.write(chunk)
+                                    hasher.update(chunk)
+                                    offset += len(chunk)
+
+                        if total_size is not None and offset != total_size:
+                            raise DownloadError(
+                                f"Incomplete download: got {offset} of {total_size} bytes")
+                        completed = True
+                        break
+                    except (aiohttp.ClientError, asyncio.TimeoutError, DownloadError) as e:
+                        last_error = e
+                        if isinstance(e, aiohttp.ClientResponseError) and 400 <= e.status < 500 and e.status != 416:
+                            break
+                        if isinstance(e, aiohttp.ClientResponseError) and e.status == 416:
+                            # Range not satisfiable, the partial file is unusable
+                            offset = 0
+                            hasher = hashlib.sha256()
+                        print(f"⚠️ Download attempt {attempt + 1} failed at {offset} bytes: {e}")
+                        if attempt < max_retries:
+                            await asyncio.sleep(0.5 * 2 ** attempt)
+
+                if not completed:
+                    raise DownloadError(f"Failed to download {url}: {last_error}")
+
+        digest = hasher.hexdigest()
+        if expected_sha256 and digest.lower() != expected_sha256.lower():
+            raise DownloadError(
+                f"Checksum mismatch for {url}: expected {expected_sha256}, got {digest}")
+
+        # Atomic rename so readers never see a partially written file
+        os.replace(part_path, dest_path)
+        renamed = True
+        return digest
+    finally:
+        # Failed, cancelled or unverified: don't leave the partial file behind
+        if not renamed:
+            _remove_quietly(part_path)
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
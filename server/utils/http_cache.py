@@ -0,0 +1,74 @@
+"""
+HTTP caching for immutable files
+
+Generated files in FILES_DIR (and their derivatives) are named with nanoids
+and never rewritten, and Vite emits content-hashed file names under
+react/dist/assets, so both can be cached by the browser forever:
+
+- strong ETag derived from the file name and size (mtime is not used, the
+  thumbnail cache touches files to track LRU order)
+- `Cache-Control: public, max-age=31536000, immutable`
+- `If-None-Match` answered with 304 and no body
+- Range / If-Range requests are handled by Starlette's FileResponse, so the
+  video player can scrub without downloading the whole file
+"""
+
+import hashlib
+import os
+import re
+from typing import Optional
+
+from fastapi import Request
+from fastapi.staticfiles import StaticFiles
+from starlette.responses import FileResponse, Response
+from starlette.types import Scope
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Vite build output: name-[hash].ext, e.g. index-BdH3k2Xa.js
+HASHED_ASSET_PATTERN = re.compile(r"-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$")
+
+
+def immutable_etag(file_path: str, size: int) -> str:
+    etag_base = f"{os.path.basename(file_path)}-{size}"
+    return f'"{hashlib.md5(etag_base.encode(), usedforsecurity=False).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Compare ignoring the weak validator prefix, as required for If-None-Match
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+def immutable_file_response(request: Request, file_path: str, media_type: Optional[str] = None) -> Response:
+    """Serve a file that never changes under its name, with 304 and Range support"""
+    stat_result = os.stat(file_path)
+    etag = immutable_etag(file_path, stat_result.st_size)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(file_path, media_type=media_type, headers=headers, stat_result=stat_result)
+
+
+class HashedAssetStaticFiles(StaticFiles):
+    """
+    StaticFiles for a Vite build: content-hashed files are cached as
+    immutable, anything else is revalidated with its ETag on every load.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 206, 304):
+            if HASHED_ASSET_PATTERN.search(path):
+                response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            else:
+                response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+        return response
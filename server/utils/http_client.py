@@ -7,6 +7,12 @@ HTTP 客户端工厂和管理器
 - 同步和异步客户端支持
 - 支持代理环境变量 (trust_env=True)
 
+异步客户端是应用级共享的：`create()` / `create_aiohttp()` 返回按
+(事件循环, 配置) 缓存的长连接客户端，退出上下文时不会关闭，连接在多次请求之间
+复用（keepalive、按 host 的连接数限制、aiohttp DNS 缓存，安装 h2 时 httpx 启用
+HTTP/2），避免每次轮询/下载都重新进行 TCP + TLS 握手。
+FastAPI lifespan 关闭时调用 `await HttpClient.close_all()` 释放连接。
+
 使用指南：
 1. httpx 客户端：
    async with HttpClient.create() as client:
@@ -22,18 +28,38 @@ HTTP 客户端工厂和管理器
        response = client.get("https://api.example.com/data")
 """
 
+import asyncio
+import importlib.util
+import os
 import ssl
 import certifi
 import httpx
-from typing import Optional, Dict, Any, AsyncGenerator, Generator
+from types import SimpleNamespace
+from typing import Optional, Dict, Any, AsyncGenerator, Generator, Tuple
 from contextlib import asynccontextmanager, contextmanager
 import aiohttp
 
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 200))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", 50))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", 30))
+HTTP_DNS_CACHE_SECONDS = int(os.getenv("HTTP_DNS_CACHE_SECONDS", 300))
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
+
 
 class HttpClient:
     """HTTP 客户端工厂和管理器"""
 
     _ssl_context: Optional[ssl.SSLContext] = None
+    # (loop id, config key) -> (loop, client)
+    _httpx_clients: Dict[Tuple[int, str], Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+    _aiohttp_sessions: Dict[Tuple[int, str], Tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]] = {}
+    _connection_stats = {
+        'connections_created': 0,
+        'connections_reused': 0,
+        'dns_cache_hits': 0,
+        'dns_cache_misses': 0,
+    }
 
     @classmethod
     def _get_ssl_context(cls) -> ssl.SSLContext:
@@ -55,8 +81,11 @@ class HttpClient:
             'timeout': 300,
             'follow_redirects': True,
             'limits': httpx.Limits(
-                max_keepalive_connections=0, max_connections=200, keepalive_expiry=30
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS_PER_HOST,
+                max_connections=HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
             ),
+            'http2': HTTP2_ENABLED,
             **kwargs,
         }
 
@@ -70,17 +99,109 @@ class HttpClient:
         config = {
             'connector': aiohttp.TCPConnector(
                 ssl=cls._get_ssl_context(),
-                limit=200,
-                limit_per_host=50,
-                keepalive_timeout=0,
+                limit=HTTP_MAX_CONNECTIONS,
+                limit_per_host=HTTP_MAX_CONNECTIONS_PER_HOST,
+                keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+                use_dns_cache=True,
+                ttl_dns_cache=HTTP_DNS_CACHE_SECONDS,
             ),
             'timeout': aiohttp.ClientTimeout(total=300),
             'trust_env': trust_env,  # 启用环境变量代理支持
+            'trace_configs': [cls._get_trace_config()],
             **kwargs,
         }
 
         return config
 
+    @classmethod
+    def _get_trace_config(cls) -> aiohttp.TraceConfig:
+        """统计新建/复用的连接数（新建连接即一次 TCP + TLS 握手）"""
+        stats = cls._connection_stats
+
+        async def on_connection_create_end(session: Any, ctx: SimpleNamespace, params: Any) -> None:
+            stats['connections_created'] += 1
+
+        async def on_connection_reuseconn(session: Any, ctx: SimpleNamespace, params: Any) -> None:
+            stats['connections_reused'] += 1
+
+        async def on_dns_cache_hit(session: Any, ctx: SimpleNamespace, params: Any) -> None:
+            stats['dns_cache_hits'] += 1
+
+        async def on_dns_cache_miss(session: Any, ctx: SimpleNamespace, params: Any) -> None:
+            stats['dns_cache_misses'] += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    @staticmethod
+    def _registry_key(loop: asyncio.AbstractEventLoop, **kwargs: Any) -> Tuple[int, str]:
+        return id(loop), repr(sorted(kwargs.items()))
+
+    @staticmethod
+    def _prune_closed_loops(registry: Dict[Tuple[int, str], Tuple[asyncio.AbstractEventLoop, Any]]) -> None:
+        # Clients are bound to the loop that created them, drop ones whose loop is gone
+        for key, (loop, _) in list(registry.items()):
+            if loop.is_closed():
+                del registry[key]
+
+    # ========== 共享客户端 ==========
+
+    @classmethod
+    def get_shared_client(cls, **kwargs: Any) -> httpx.AsyncClient:
+        """获取共享的 httpx 异步客户端（不要手动关闭）"""
+        loop = asyncio.get_running_loop()
+        key = cls._registry_key(loop, **kwargs)
+        entry = cls._httpx_clients.get(key)
+        if entry is None or entry[1].is_closed:
+            cls._prune_closed_loops(cls._httpx_clients)
+            client = httpx.AsyncClient(**cls._get_client_config(**kwargs))
+            cls._httpx_clients[key] = (loop, client)
+            return client
+        return entry[1]
+
+    @classmethod
+    def get_shared_aiohttp_session(cls, trust_env: bool = True, **kwargs: Any) -> 'aiohttp.ClientSession':
+        """获取共享的 aiohttp 会话（不要手动关闭）"""
+        loop = asyncio.get_running_loop()
+        key = cls._registry_key(loop, trust_env=trust_env, **kwargs)
+        entry = cls._aiohttp_sessions.get(key)
+        if entry is None or entry[1].closed:
+            cls._prune_closed_loops(cls._aiohttp_sessions)
+            session = aiohttp.ClientSession(**cls._get_aiohttp_config(trust_env=trust_env, **kwargs))
+            cls._aiohttp_sessions[key] = (loop, session)
+            return session
+        return entry[1]
+
+    @classmethod
+    async def close_all(cls) -> None:
+        """关闭当前事件循环上的所有共享客户端（在 FastAPI lifespan 关闭时调用）"""
+        loop = asyncio.get_running_loop()
+        for registry in (cls._httpx_clients, cls._aiohttp_sessions):
+            for key, (client_loop, client) in list(registry.items()):
+                if client_loop is not loop:
+                    continue
+                del registry[key]
+                try:
+                    if isinstance(client, httpx.AsyncClient):
+                        await client.aclose()
+                    else:
+                        await client.close()
+                except Exception as e:
+                    print(f"⚠️ Error closing HTTP client: {e}")
+
+    @classmethod
+    def get_metrics(cls) -> Dict[str, Any]:
+        return {
+            **cls._connection_stats,
+            'httpx_clients': len(cls._httpx_clients),
+            'aiohttp_sessions': len(cls._aiohttp_sessions),
+            'http2': HTTP2_ENABLED,
+        }
+
     # ========== 工厂方法 ==========
 
     @classmethod
@@ -88,13 +209,8 @@ class HttpClient:
     async def create(
         cls, url: Optional[str] = None, **kwargs: Any
     ) -> AsyncGenerator[httpx.AsyncClient, None]:
-        """创建异步客户端上下文管理器"""
-        config = cls._get_client_config(**kwargs)
-        client = httpx.AsyncClient(**config)
-        try:
-            yield client
-        finally:
-            await client.aclose()
+        """获取共享异步客户端的上下文管理器（退出时不关闭，连接保持复用）"""
+        yield cls.get_shared_client(**kwargs)
 
     @classmethod
     @contextmanager
@@ -127,18 +243,13 @@ class HttpClient:
     async def create_aiohttp(
         cls, trust_env: bool = True, **kwargs: Any
     ) -> AsyncGenerator['aiohttp.ClientSession', None]:
-        """创建 aiohttp 客户端上下文管理器
+        """获取共享 aiohttp 会话的上下文管理器（退出时不关闭，连接保持复用）
 
         Args:
             trust_env: 是否信任环境变量代理设置 (HTTP_PROXY, HTTPS_PROXY, etc.)
             **kwargs: 其他 aiohttp.ClientSession 参数
         """
-        config = cls._get_aiohttp_config(trust_env=trust_env, **kwargs)
-        session = aiohttp.ClientSession(**config)
-        try:
-            yield session
-        finally:
-            await session.close()
+        yield cls.get_shared_aiohttp_session(trust_env=trust_env, **kwargs)
 
     @classmethod
     def create_aiohttp_client(
@@ -0,0 +1,348 @@
+"""
+图片处理进程池
+
+PIL 的解码、颜色转换和 PNG optimize 编码都是 CPU 密集的同步操作，直接在协程里执行
+会阻塞整个事件循环（所有 websocket 流都会卡住）。本模块把这些工作放到独立的进程池里执行：
+
+- IMAGE_PROCESS_WORKERS 环境变量控制进程数，设为 0 时退化为线程池执行
+- 任务函数必须是模块级的纯函数（参数/返回值可 pickle）
+- 子进程用 spawn 启动（不 fork 带着数据库 / HTTP 线程锁的服务进程），每个子进程
+  会重新导入本模块，所以这里只能导入标准库和 PIL，不能导入 services.*
+- 进程池在 FastAPI lifespan 启动时创建，在关闭时销毁
+
+使用：
+    result = await run_image_task(save_generated_image, image_bytes, path_without_ext, metadata, 'png')
+"""
+
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import traceback
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar, Union
+
+from PIL import Image, PngImagePlugin, features
+
+# 生成图片的输出格式（settings.json 中的 image_output_format）
+# 非 PNG 格式的元数据以 JSON 写入 EXIF ImageDescription
+IMAGE_OUTPUT_FORMATS: Dict[str, Dict[str, Any]] = {
+    # PNG optimize，体积小但编码慢（默认，保持原有行为）
+    'png': {'pil_format': 'PNG', 'extension': 'png', 'mime_type': 'image/png', 'options': {'optimize': True}},
+    # PNG 低压缩级别，编码快，体积较大
+    'png_fast': {'pil_format': 'PNG', 'extension': 'png', 'mime_type': 'image/png', 'options': {'compress_level': 1}},
+    # 无损 WebP
+    'webp': {'pil_format': 'WEBP', 'extension': 'webp', 'mime_type': 'image/webp', 'options': {'lossless': True, 'method': 4}},
+    # 高质量 JPEG（不支持透明通道）
+    'jpeg': {'pil_format': 'JPEG', 'extension': 'jpg', 'mime_type': 'image/jpeg', 'options': {'quality': 95}},
+    # 高质量 AVIF（需要 Pillow 支持 AVIF 编码）
+    'avif': {'pil_format': 'AVIF', 'extension': 'avif', 'mime_type': 'image/avif', 'options': {'quality': 90}},
+}
+DEFAULT_IMAGE_OUTPUT_FORMAT = 'png'
+
+# EXIF tag: ImageDescription
+_EXIF_IMAGE_DESCRIPTION = 0x010E
+
+IMAGE_PROCESS_WORKERS = int(
+    os.getenv("IMAGE_PROCESS_WORKERS", min(4, os.cpu_count() or 1)))
+
+T = TypeVar("T")
+
+_executor: Optional[Executor] = None
+
+
+def _get_executor() -> Optional[Executor]:
+    global _executor
+    if IMAGE_PROCESS_WORKERS <= 0:
+        return None  # default thread pool
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=IMAGE_PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def start_image_executor() -> None:
+    """Create the pool and start its workers at startup rather than on the first image"""
+    executor = _get_executor()
+    if executor is not None:
+        # Spawned pools start all their workers on the first submit
+        executor.submit(os.getpid)
+
+
+async def run_image_task(func: Callable[..., T], *args: Any) -> T:
+    """Run an image processing function off the event loop"""
+    global _executor
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    try:
+        return await loop.run_in_executor(executor, func, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM on a huge image), start a fresh pool and retry once.
+        # Concurrent failures of the same pool replace it only once
+        if executor is not None and _executor is executor:
+            print("⚠️ Image process pool broken, restarting")
+            _executor = None
+            # Reap the remaining workers and fail what is still queued on the broken pool
+            executor.shutdown(wait=False, cancel_futures=True)
+        return await loop.run_in_executor(_get_executor(), func, *args)
+
+
+def shutdown_image_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+# ========== 进程内执行的任务函数 ==========
+
+def _normalize_mode(image: Image.Image) -> Image.Image:
+    """Convert color modes PNG can't store (or stores badly) to RGB/RGBA"""
+    if image.mode == 'P':
+        # Palette mode - convert to RGBA to preserve potential transparency
+        if 'transparency' in image.info:
+            return image.convert('RGBA')
+        return image.convert('RGB')
+    if image.mode == 'LA':
+        # Grayscale with alpha - convert to RGBA
+        return image.convert('RGBA')
+    if image.mode == 'CMYK':
+        return image.convert('RGB')
+    if image.mode in ('L', 'RGB', 'RGBA'):
+        # Already compatible with PNG
+        return image
+    # For any other modes, convert to RGB as a safe fallback
+    print(f"Warning: Unusual color mode {image.mode}, converting to RGB")
+    return image.convert('RGB')
+
+
+def _metadata_to_text(metadata: Dict[str, Any]) -> Dict[str, str]:
+    texts: Dict[str, str] = {}
+    for key, value in metadata.items():
+        try:
+            if isinstance(value, (dict, list)):
+                # Serialize complex types as JSON
+                texts[str(key)] = json.dumps(value, ensure_ascii=False)
+            elif value is None:
+                texts[str(key)] = "null"
+            else:
+                texts[str(key)] = str(value)
+        except Exception as e:
+            print(f"Warning: Failed to add metadata key '{key}': {e}")
+            traceback.print_stack()
+    return texts
+
+
+def resolve_output_format(output_format: Optional[str]) -> str:
+    """Fall back to PNG for unknown formats or ones this Pillow build can't encode"""
+    if output_format not in IMAGE_OUTPUT_FORMATS:
+        return DEFAULT_IMAGE_OUTPUT_FORMAT
+    pil_format = IMAGE_OUTPUT_FORMATS[output_format]['pil_format']
+    if pil_format == 'WEBP' and not features.check('webp'):
+        return DEFAULT_IMAGE_OUTPUT_FORMAT
+    if pil_format == 'AVIF':
+        Image.init()
+        if 'AVIF' not in Image.SAVE:
+            return DEFAULT_IMAGE_OUTPUT_FORMAT
+    return output_format
+
+
+def save_generated_image(
+    image_data: Union[bytes, str],
+    file_path_without_extension: str,
+    metadata: Optional[Dict[str, Any]] = None,
+    output_format: str = DEFAULT_IMAGE_OUTPUT_FORMAT,
+) -> Tuple[str, int, int, str]:
+    """
+    Decode image bytes (or a base64 string), convert and save in `output_format` with metadata
+
+    Returns:
+        tuple[str, int, int, str]: (mime_type, width, height, extension)
+    """
+    if isinstance(image_data, str):
+        image_data = base64.b64decode(image_data)
+
+    image = Image.open(BytesIO(image_data))
+    width, height = image.size
+
+    output_format = resolve_output_format(output_format)
+    spec = IMAGE_OUTPUT_FORMATS[output_format]
+    pil_format = spec['pil_format']
+
+    # Store original format for debugging
+    original_format = image.format or 'Unknown'
+    print(f"Converting {original_format} image to {output_format}: {width}x{height}")
+
+    image = _normalize_mode(image)
+    if pil_format == 'JPEG' and image.mode == 'RGBA':
+        # JPEG has no alpha channel, flatten onto white
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        image = background
+
+    extension = spec['extension']
+    mime_type = spec['mime_type']
+    file_path = f"{file_path_without_extension}.{extension}"
+    save_options: Dict[str, Any] = dict(spec['options'])
+
+    if metadata or original_format != pil_format:
+        texts = {"original_format": original_format, **_metadata_to_text(metadata or {})}
+        if pil_format == 'PNG':
+            pnginfo = PngImagePlugin.PngInfo()
+            for key, text in texts.items():
+                pnginfo.add_text(key, text)
+            save_options['pnginfo'] = pnginfo
+        else:
+            exif = Image.Exif()
+            exif[_EXIF_IMAGE_DESCRIPTION] = json.dumps(texts)
+            save_options['exif'] = exif.tobytes()
+
+    image.save(file_path, format=pil_format, **save_options)
+
+    print(f"Successfully saved as {output_format}: {file_path}")
+    return mime_type, width, height, extension
+
+
+def compress_image(img: Image.Image, max_size_mb: float) -> bytes:
+    """
+    Compress an image to be under the specified size limit.
+    """
+    # Start with high quality
+    quality = 95
+
+    while quality > 10:
+        buffer = BytesIO()
+        img.save(buffer, format='JPEG', quality=quality, optimize=True)
+
+        size_mb = len(buffer.getvalue()) / (1024 * 1024)
+        if size_mb <= max_size_mb:
+            return buffer.getvalue()
+
+        # Reduce quality for next iteration
+        quality -= 10
+
+    # If still too large, try reducing dimensions
+    original_width, original_height = img.size
+    scale_factor = 0.8
+    resized_img = img
+
+    while scale_factor > 0.3:
+        new_width = int(original_width * scale_factor)
+        new_height = int(original_height * scale_factor)
+        resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+        # Try with moderate quality
+        buffer = BytesIO()
+        resized_img.save(buffer, format='JPEG', quality=70, optimize=True)
+
+        size_mb = len(buffer.getvalue()) / (1024 * 1024)
+        if size_mb <= max_size_mb:
+            return buffer.getvalue()
+
+        scale_factor -= 0.1
+
+    # Last resort: very low quality
+    buffer = BytesIO()
+    resized_img.save(buffer, format='JPEG', quality=30, optimize=True)
+    return buffer.getvalue()
+
+
+def save_uploaded_image(
+    content: bytes,
+    file_path_without_extension: str,
+    extension: str,
+    max_size_mb: float,
+) -> Tuple[int, int, str]:
+    """
+    Save an uploaded image, compressing it to JPEG if it is over `max_size_mb`
+
+    Returns:
+        tuple[int, int, str]: (width, height, extension)
+    """
+    original_size_mb = len(content) / (1024 * 1024)
+
+    with Image.open(BytesIO(content)) as img:
+        width, height = img.size
+
+        if original_size_mb <= max_size_mb:
+            save_format = 'JPEG' if extension.lower() in ['jpg', 'jpeg'] else extension.upper()
+            if save_format == 'JPEG':
+                img = img.convert('RGB')
+            img.save(f'{file_path_without_extension}.{extension}', format=save_format)
+            return width, height, extension
+
+        print(f'🦄 Image size ({original_size_mb:.2f}MB) exceeds limit ({max_size_mb}MB), compressing...')
+
+        # Convert to RGB if necessary (for JPEG compression)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # Create a white background for transparent images
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        compressed_content = compress_image(img, max_size_mb)
+
+    # Force JPEG for compressed images
+    extension = 'jpg'
+    with Image.open(BytesIO(compressed_content)) as compressed_img:
+        width, height = compressed_img.size
+        compressed_img.save(f'{file_path_without_extension}.{extension}', format='JPEG', quality=95, optimize=True)
+
+    final_size_mb = len(compressed_content) / (1024 * 1024)
+    print(f'🦄 Compressed from {original_size_mb:.2f}MB to {final_size_mb:.2f}MB')
+    return width, height, extension
+
+
+def encode_image_file_base64(file_path: str, save_format: str) -> str:
+    """Re-encode an image file and return it as base64"""
+    with Image.open(file_path) as image, BytesIO() as output:
+        image.save(output, format=save_format)
+        return base64.b64encode(output.getvalue()).decode('utf-8')
+
+
+def save_image_derivative(
+    source_path: str,
+    dest_path: str,
+    width: int,
+    output_format: str,
+) -> Tuple[int, int]:
+    """
+    Save a downscaled copy of `source_path` at most `width` pixels wide
+
+    Written to a temporary file and renamed, so concurrent readers never see
+    a partial derivative.
+
+    Returns:
+        tuple[int, int]: (width, height) of the derivative
+    """
+    spec = IMAGE_OUTPUT_FORMATS[resolve_output_format(output_format)]
+    pil_format = spec['pil_format']
+
+    with Image.open(source_path) as image:
+        if image.width > width:
+            # thumbnail() keeps the aspect ratio and lets JPEG decode at reduced scale
+            image.thumbnail((width, image.height), Image.Resampling.LANCZOS)
+        image = _normalize_mode(image)
+        if pil_format == 'JPEG' and image.mode == 'RGBA':
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.split()[-1])
+            image = background
+
+        options: Dict[str, Any] = dict(spec['options'])
+        if pil_format in ('WEBP', 'AVIF'):
+            # Thumbnails don't need to be lossless
+            options = {'quality': 80}
+        elif pil_format == 'PNG':
+            options = {'compress_level': 6}
+
+        tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+        image.save(tmp_path, format=pil_format, **options)
+        os.replace(tmp_path, dest_path)
+        return image.size